@@ -0,0 +1,398 @@
+# pyright: basic
+"""
+Benchmarks of the evaluator, the demand generation, the solvers and the
+solution export on synthetic fleets of 1k, 10k and 100k servers.
+
+    python bench.py --out bench.json
+    python bench.py --baseline bench_baseline.json
+
+bench_baseline.json is a run of every benchmark on one CPU, to compare with
+on similar machines.
+
+The startup benchmarks time the import of the modules that the scripts and
+their worker processes start with, each in a fresh interpreter.
+
+Every benchmark is timed `--repeat` times and reported with its best and
+median wall time. The results are written as json with `--out`, and with
+`--baseline` they are compared with the results of an earlier run: a
+benchmark whose best time is more than `--tolerance` slower than in the
+baseline is a regression, and the script exits with status 1.
+"""
+
+import argparse
+import contextlib
+import json
+import math
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+import constants
+from cohorts import expand_cohorts
+from evaluation import (
+    evaluation_function,
+    fleet_data_preparation,
+    get_actual_demand,
+    get_known,
+)
+from generate import generate_solution
+from solver import sat
+from solver.models import Action, ServerGeneration, SolutionEntry
+from utils import load_problem_data
+
+TIERS = [1_000, 10_000, 100_000]
+
+# Modules whose import is timed in a fresh interpreter, "" times the
+# interpreter alone
+STARTUP_MODULES = [
+    "",
+    "evaluation",
+    "fast_evaluation",
+    "constants",
+    "utils",
+    "solver.sat",
+    "solver.lp",
+    "myevaluation",
+    "mysolution",
+]
+
+# The largest server generation, a lane of slots fits any server
+LANE_SLOTS = 4
+
+
+def synthetic_cohorts(
+    n: int,
+    servers: pd.DataFrame,
+    datacenters: pd.DataFrame,
+    seed: int = 0,
+    move_fraction: float = 0.1,
+) -> pd.DataFrame:
+    """
+    A fleet of `n` servers in the cohort form of `cohorts`, which never
+    breaks the slots capacity of a datacenter.
+
+    The datacenters are split into lanes of `LANE_SLOTS` slots that hold one
+    server at a time, and the horizon into at least 4 intervals. Each server
+    is bought at the start of an interval in a lane, with a generation
+    released by then, and dismissed at the end of it. Pairs of lanes in
+    different datacenters swap their servers halfway through an interval
+    with probability `move_fraction`.
+    """
+    rng = np.random.default_rng(seed)
+    time_steps = get_known("time_steps")
+    dc_list = datacenters["datacenter_id"].to_numpy()
+    lanes = datacenters["slots_capacity"].to_numpy() // LANE_SLOTS
+    lane_dc = rng.permutation(np.repeat(np.arange(len(dc_list)), lanes))
+    k = max(math.ceil(n / lane_dc.size), 4)
+    if k > time_steps:
+        raise ValueError(f"At most {lane_dc.size * time_steps} servers fit.")
+    bounds = np.linspace(1, time_steps + 1, k + 1).astype(int)
+
+    # One row per server: its lane and its interval
+    i = np.arange(n)
+    lane, j = i // k, i % k
+    start, end = bounds[j], bounds[j + 1] - 1
+
+    # Generations released at the start of the interval, the same for both
+    # lanes of a pair
+    windows = servers["release_time"].map(json.loads)
+    released = np.array(
+        [[w[0] <= ts <= w[1] for w in windows] for ts in range(time_steps + 1)]
+    )
+    choice = rng.random((lane_dc.size, k))[lane - lane % 2, j]
+    options = released[start]
+    nth = (choice * options.sum(axis=1)).astype(int)
+    generation = (options.cumsum(axis=1) > nth[:, None]).argmax(axis=1)
+
+    # Swaps, where both lanes of the pair have a server in that interval
+    pair = lane ^ 1
+    swaps = rng.random(lane_dc.size // 2) < move_fraction
+    swapped = (
+        (pair * k + j < n)
+        & (pair < lane_dc.size)
+        & swaps[np.minimum(lane // 2, swaps.size - 1)]
+        & (lane_dc[lane] != lane_dc[np.minimum(pair, lane_dc.size - 1)])
+        & (end - start >= 1)
+    )
+    middle = (start + end + 1) // 2
+    dc = lane_dc[lane]
+    final_dc = np.where(swapped, lane_dc[np.minimum(pair, lane_dc.size - 1)], dc)
+
+    sg_list = servers["server_generation"].to_numpy()
+    rows = [
+        pd.DataFrame(
+            {
+                "time_step": start,
+                "datacenter_id": dc_list[dc],
+                "server_generation": sg_list[generation],
+                "action": "buy",
+                "from_datacenter_id": None,
+                "bought_time_step": None,
+            }
+        ),
+        pd.DataFrame(
+            {
+                "time_step": middle[swapped],
+                "datacenter_id": dc_list[final_dc[swapped]],
+                "server_generation": sg_list[generation[swapped]],
+                "action": "move",
+                "from_datacenter_id": dc_list[dc[swapped]],
+                "bought_time_step": start[swapped],
+            }
+        ),
+        pd.DataFrame(
+            {
+                "time_step": end[end < time_steps] + 1,
+                "datacenter_id": dc_list[final_dc[end < time_steps]],
+                "server_generation": sg_list[generation[end < time_steps]],
+                "action": "dismiss",
+                "from_datacenter_id": None,
+                "bought_time_step": start[end < time_steps],
+            }
+        ),
+    ]
+    keys = get_known("cohort_columns")[:4] + ["from_datacenter_id", "bought_time_step"]
+    cohorts = (
+        pd.concat(rows, ignore_index=True)
+        .groupby(keys, dropna=False, sort=False)
+        .size()
+        .rename("count")
+        .reset_index()
+    )
+    cohorts = cohorts.sort_values("time_step", kind="stable", ignore_index=True)
+    return cohorts[get_known("cohort_columns") + keys[4:]]
+
+
+def synthetic_pricing(
+    selling_prices: pd.DataFrame, seed: int = 0, every: int = 12
+) -> pd.DataFrame:
+    """Base prices changed by up to 10% every `every` time-steps."""
+    rng = np.random.default_rng(seed)
+    pricing = pd.concat(
+        [
+            selling_prices.assign(time_step=ts)
+            for ts in range(1, get_known("time_steps") + 1, every)
+        ],
+        ignore_index=True,
+    )
+    pricing["price"] = pricing["selling_price"] * rng.uniform(0.9, 1.1, len(pricing))
+    return pricing[["time_step", "latency_sensitivity", "server_generation", "price"]]
+
+
+def cohorts_to_entries(cohorts: pd.DataFrame) -> list[SolutionEntry]:
+    return [
+        SolutionEntry(
+            int(row.time_step),
+            row.datacenter_id,
+            ServerGeneration(row.server_generation),
+            Action(row.action),
+            int(row.count),
+            None if pd.isna(row.from_datacenter_id) else row.from_datacenter_id,
+            None if pd.isna(row.bought_time_step) else int(row.bought_time_step),
+        )
+        for row in cohorts.itertuples(index=False)
+    ]
+
+
+def get_benchmarks(args):
+    """(name, tier, setup) of every benchmark, `setup` returns what is timed."""
+    data = load_problem_data()
+    demand, datacenters, servers, selling_prices, elasticity = data
+    pricing = synthetic_pricing(selling_prices)
+    model_servers = constants.get_servers()
+    benchmarks = []
+
+    def evaluate(fleet, engine):
+        def run():
+            score = evaluation_function(
+                fleet.copy(),
+                pricing.copy(),
+                *(d.copy() for d in data),
+                seed=args.seed,
+                engine=engine,
+            )
+            if score is None:
+                raise RuntimeError("The synthetic fleet could not be evaluated.")
+
+        return run
+
+    def startup(module):
+        command = [sys.executable, "-c", f"import {module}" if module else "pass"]
+        return lambda: subprocess.run(command, check=True)
+
+    benchmarks += [
+        (f"startup[{module or 'python'}]", None, lambda module=module: startup(module))
+        for module in STARTUP_MODULES
+    ]
+    benchmarks.append(
+        ("get_actual_demand", None, lambda: lambda: get_actual_demand(demand))
+    )
+    for tier in args.tiers:
+        cohorts = synthetic_cohorts(tier, servers, datacenters, args.seed)
+        fleet = expand_cohorts(cohorts, servers)
+        entries = cohorts_to_entries(cohorts)
+        benchmarks += [
+            (
+                "fleet_data_preparation",
+                tier,
+                lambda fleet=fleet: lambda: fleet_data_preparation(
+                    fleet.copy(), servers, datacenters, selling_prices
+                ),
+            ),
+            (
+                "evaluation_function[array]",
+                tier,
+                lambda fleet=fleet: evaluate(fleet, "array"),
+            ),
+            (
+                "evaluation_function[cohorts]",
+                tier,
+                lambda c=cohorts: evaluate(c, "array"),
+            ),
+            (
+                "generate_solution",
+                tier,
+                lambda entries=entries: lambda: generate_solution(
+                    entries, model_servers
+                ),
+            ),
+        ]
+        if tier <= args.dataframe_max:
+            benchmarks.append(
+                (
+                    "evaluation_function[dataframe]",
+                    tier,
+                    lambda fleet=fleet: evaluate(fleet, "dataframe"),
+                )
+            )
+
+    def get_problem():
+        np.random.seed(args.seed)
+        return (
+            constants.get_demand(),
+            constants.get_datacenters(),
+            constants.get_selling_prices(),
+            constants.get_servers(),
+            constants.get_elasticity(),
+        )
+
+    def build():
+        problem = sat.get_problem(*get_problem())
+        return lambda: sat.build_supply_model(problem, horizon=args.horizon)
+
+    def solve():
+        problem = get_problem()
+        # The model is built once per process, see build for its time
+        sat.get_supply_model(sat.get_problem(*problem), horizon=args.horizon)
+        return lambda: sat.solve_supply(
+            *problem, time_limit=args.time_limit, horizon=args.horizon
+        )
+
+    def heuristic():
+        from heuristics import Solver
+
+        np.random.seed(args.seed)
+        solver = Solver(
+            [],
+            constants.get_demand(),
+            constants.get_servers(),
+            constants.get_datacenters(),
+            constants.get_selling_prices(),
+        )
+        return solver.heuristic_solve
+
+    benchmarks += [
+        (f"build_supply_model[horizon={args.horizon}]", None, build),
+        (f"solve_supply[horizon={args.horizon}]", None, solve),
+        ("heuristic_solve", None, heuristic),
+    ]
+    return benchmarks
+
+
+def run_benchmark(setup, repeat: int, seed: int) -> dict:
+    np.random.seed(seed)
+    run = setup()
+    times = []
+    for _ in range(repeat):
+        np.random.seed(seed)
+        # The solvers and the evaluator print their progress
+        with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+            start = time.perf_counter()
+            run()
+            times.append(time.perf_counter() - start)
+    return {"best": min(times), "median": statistics.median(times), "times": times}
+
+
+def compare(results: list[dict], baseline: list[dict], tolerance: float):
+    """The results whose best time regressed by more than `tolerance`."""
+    previous = {(r["name"], r["tier"]): r["best"] for r in baseline}
+    regressions = []
+    for r in results:
+        before = previous.get((r["name"], r["tier"]))
+        r["baseline"] = before
+        if before is not None and r["best"] > before * (1 + tolerance):
+            regressions.append(r)
+    return regressions
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--tiers", type=int, nargs="+", default=TIERS)
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--seed", type=int, default=2381)
+    parser.add_argument("--only", nargs="+", help="names of the benchmarks to run")
+    parser.add_argument(
+        "--dataframe-max",
+        type=int,
+        default=1_000,
+        help="largest tier to run the dataframe engine on",
+    )
+    parser.add_argument("--horizon", type=int, default=12)
+    parser.add_argument("--time-limit", type=float, default=60)
+    parser.add_argument("--out", help="json file for the results")
+    parser.add_argument("--baseline", help="json file of an earlier run")
+    parser.add_argument("--tolerance", type=float, default=0.2)
+    args = parser.parse_args()
+
+    results = []
+    for name, tier, setup in get_benchmarks(args):
+        if args.only and not any(name.startswith(o) for o in args.only):
+            continue
+        result = {
+            "name": name,
+            "tier": tier,
+            **run_benchmark(setup, args.repeat, args.seed),
+        }
+        results.append(result)
+        print(
+            f"{name:<36} {tier or '':>8} {result['best']:10.3f}s {result['median']:10.3f}s"
+        )
+
+    regressions = []
+    if args.baseline:
+        with open(args.baseline) as f:
+            regressions = compare(results, json.load(f)["results"], args.tolerance)
+        for r in regressions:
+            print(
+                f"Regression: {r['name']} {r['tier'] or ''} "
+                f"{r['best']:.3f}s against {r['baseline']:.3f}s"
+            )
+    if args.out:
+        with open(args.out, "w") as f:
+            json.dump(
+                {
+                    "python": platform.python_version(),
+                    "machine": platform.machine(),
+                    "cpus": os.cpu_count(),
+                    "results": results,
+                },
+                f,
+                indent=2,
+            )
+    sys.exit(1 if regressions else 0)
@@ -0,0 +1,262 @@
+"""
+Compact (cohort) form of a fleet.
+
+Instead of one row per server id, a cohort row says how many servers of a
+generation are bought, moved or dismissed in a datacenter at a time-step:
+
+    time_step, datacenter_id, server_generation, action, count
+
+Moves also need the datacenter the servers leave, in a `from_datacenter_id`
+column. Dismissals take the oldest servers of the (datacenter, generation)
+pair that are still alive at that time-step and moves take the youngest ones,
+which have the most life left. Dismissing or moving more servers than there
+are takes all of them. An optional `bought_time_step` column restricts a
+dismissal or a move to the servers bought at that time-step. Servers bought
+or moved in at a time-step are left out of the dismissals and moves of that
+time-step.
+
+The evaluator works on batches of identical servers built from the cohorts,
+so its cost scales with the number of cohorts. `expand_cohorts` turns them
+into the one-row-per-server format for the final export.
+"""
+
+import json
+from collections import defaultdict
+from collections.abc import Callable
+from dataclasses import dataclass, field
+
+import numpy as np
+import pandas as pd
+
+from evaluation import get_known, validate_fleet
+from solver.models import Server, ServerGeneration
+
+
+@dataclass(frozen=True)
+class Batch:
+    """
+    `count` servers of a generation bought at `buy` in a datacenter and alive
+    until `end` (included). Every move is a (time_step, datacenter) pair.
+    Generations and datacenters are indices in the order of `get_known`.
+    """
+
+    generation: int
+    datacenter: int
+    buy: int
+    end: int
+    count: int
+    moves: tuple[tuple[int, int], ...] = ()
+
+    def segments(self) -> list[tuple[int, int, int]]:
+        """(start, end, datacenter) of every run of time-steps in one datacenter."""
+        starts = [(self.buy, self.datacenter)] + list(self.moves)
+        ends = [start - 1 for start, _ in self.moves] + [self.end]
+        return [(s, e, dc) for (s, dc), e in zip(starts, ends)]
+
+
+@dataclass
+class _OpenBatch:
+    generation: int
+    datacenter: int
+    buy: int
+    count: int
+    moves: list[tuple[int, int]] = field(default_factory=list)
+
+    def close(self, end: int, count: int) -> Batch:
+        return Batch(
+            self.generation, self.datacenter, self.buy, end, count, tuple(self.moves)
+        )
+
+
+def is_cohort_fleet(fleet: pd.DataFrame) -> bool:
+    return "count" in fleet.columns and "server_id" not in fleet.columns
+
+
+def get_server_frame(servers: pd.DataFrame | list[Server]) -> pd.DataFrame:
+    """The columns of the servers csv that cohorts need."""
+    if isinstance(servers, pd.DataFrame):
+        return servers
+    return pd.DataFrame(
+        [
+            {
+                "server_generation": ServerGeneration(server.server_generation).value,
+                "release_time": json.dumps(server.release_time),
+                "life_expectancy": server.life_expectancy,
+            }
+            for server in servers
+        ]
+    )
+
+
+def get_life_expectancy(servers: pd.DataFrame | list[Server]) -> np.ndarray:
+    """Life expectancy by generation index."""
+    s = get_server_frame(servers).set_index("server_generation")["life_expectancy"]
+    return s.loc[get_known("server_generation")].to_numpy()
+
+
+def cohort_data_preparation(
+    cohorts: pd.DataFrame,
+    servers: pd.DataFrame | list[Server],
+    violations: Callable[[dict[str, int]], None] | None = None,
+) -> pd.DataFrame:
+    # Same checks as evaluation.fleet_data_preparation but duplicate ids and
+    # orphan actions
+    columns = get_known("cohort_columns")
+    for column in ["from_datacenter_id", "bought_time_step"]:
+        if column in cohorts.columns:
+            columns = columns + [column]
+    try:
+        cohorts = cohorts[columns]
+    except Exception:
+        raise (ValueError("Please check the solution format."))
+    cohorts, summary = validate_fleet(cohorts, get_server_frame(servers))
+    if violations is not None:
+        violations(summary)
+    moves = cohorts["action"] == "move"
+    if moves.any() and (
+        "from_datacenter_id" not in cohorts.columns
+        or not cohorts.loc[moves, "from_datacenter_id"]
+        .isin(get_known("datacenter_id"))
+        .all()
+    ):
+        raise (ValueError("Moves need a known from_datacenter_id."))
+    cohorts = cohorts[cohorts["count"] > 0]
+    return cohorts.reset_index(drop=True, inplace=False)
+
+
+def cohorts_to_batches(
+    cohorts: pd.DataFrame,
+    servers: pd.DataFrame | list[Server],
+    time_steps: int = get_known("time_steps"),
+) -> list[Batch]:
+    life_expectancy = get_life_expectancy(servers)
+    sg_index = {sg: i for i, sg in enumerate(get_known("server_generation"))}
+    dc_index = {dc: i for i, dc in enumerate(get_known("datacenter_id"))}
+
+    cohorts = cohorts[
+        (cohorts["time_step"] >= 1) & (cohorts["time_step"] <= time_steps)
+    ]
+    cohorts = cohorts.sort_values("time_step", kind="stable")
+    for column in ["from_datacenter_id", "bought_time_step"]:
+        if column not in cohorts.columns:
+            cohorts = cohorts.assign(**{column: None})
+
+    # (datacenter, generation) -> batches still in the fleet, oldest first
+    fleet: defaultdict[tuple[int, int], list[_OpenBatch]] = defaultdict(list)
+    closed: list[Batch] = []
+
+    def take(
+        dc: int,
+        g: int,
+        ts: int,
+        count: int,
+        youngest: bool = False,
+        bought: int | None = None,
+    ) -> list[_OpenBatch]:
+        # Removes the `count` oldest (or youngest) servers alive at ts, only
+        # out of those bought at `bought` if it is set
+        queue = fleet[(dc, g)]
+        while queue and queue[0].buy + life_expectancy[g] - 1 < ts:
+            b = queue.pop(0)
+            closed.append(b.close(b.buy + life_expectancy[g] - 1, b.count))
+        taken: list[_OpenBatch] = []
+        for b in reversed(queue) if youngest else queue:
+            if count == 0:
+                break
+            # Servers bought or moved in at ts stay where they are until ts + 1
+            if b.buy >= ts or (b.moves and b.moves[-1][0] >= ts):
+                continue
+            if bought is not None and b.buy != bought:
+                continue
+            n = min(b.count, count)
+            taken.append(_OpenBatch(g, b.datacenter, b.buy, n, list(b.moves)))
+            b.count -= n
+            count -= n
+        queue[:] = [b for b in queue if b.count > 0]
+        return taken
+
+    for ts, dc, sg, action, count, from_dc, bought in cohorts[
+        get_known("cohort_columns") + ["from_datacenter_id", "bought_time_step"]
+    ].itertuples(index=False):
+        g = sg_index[sg]
+        bought = None if pd.isna(bought) else int(bought)
+        if action == "buy":
+            fleet[(dc_index[dc], g)].append(_OpenBatch(g, dc_index[dc], ts, count))
+        elif action == "dismiss":
+            closed += [
+                b.close(ts - 1, b.count)
+                for b in take(dc_index[dc], g, ts, count, bought=bought)
+            ]
+        elif action == "move":
+            for b in take(dc_index[from_dc], g, ts, count, True, bought):
+                b.moves.append((ts, dc_index[dc]))
+                queue = fleet[(dc_index[dc], g)]
+                queue.append(b)
+                queue.sort(key=lambda x: x.buy)
+
+    for (_, g), queue in fleet.items():
+        for b in queue:
+            end = min(b.buy + life_expectancy[g] - 1, time_steps)
+            # Moves after the end of the server's life are never charged
+            b.moves = [(ts, dc) for ts, dc in b.moves if ts <= end]
+            closed.append(b.close(end, b.count))
+    return [b for b in closed if b.count > 0]
+
+
+def batches_to_fleet(
+    batches: list[Batch],
+    servers: pd.DataFrame | list[Server],
+    time_steps: int = get_known("time_steps"),
+) -> pd.DataFrame:
+    """Expands batches to one row per server id and action."""
+    life_expectancy = get_life_expectancy(servers)
+    sg_list = np.array(get_known("server_generation"), dtype=object)
+    dc_list = np.array(get_known("datacenter_id"), dtype=object)
+    count = np.array([b.count for b in batches], dtype=np.int64)
+    first_id = np.concatenate([[0], np.cumsum(count)[:-1]])
+
+    def rows(batch_index, ts, dc, action):
+        # One row per server of every batch in batch_index
+        batch_index = np.asarray(batch_index, dtype=np.int64)
+        n = count[batch_index]
+        offset = np.arange(n.sum()) - np.repeat(np.cumsum(n) - n, n)
+        generation = np.array(
+            [batches[i].generation for i in batch_index], dtype=np.int64
+        )
+        return pd.DataFrame(
+            {
+                "time_step": np.repeat(np.asarray(ts, dtype=np.int64), n),
+                "datacenter_id": dc_list[np.repeat(np.asarray(dc, dtype=np.int64), n)],
+                "server_generation": sg_list[np.repeat(generation, n)],
+                "server_id": np.repeat(first_id[batch_index], n) + offset,
+                "action": action,
+            }
+        )
+
+    everything = range(len(batches))
+    buys = rows(
+        everything, [b.buy for b in batches], [b.datacenter for b in batches], "buy"
+    )
+    moved = [(i, ts, dc) for i, b in enumerate(batches) for ts, dc in b.moves]
+    moves = rows(*(np.array(moved, dtype=np.int64).reshape(-1, 3).T), "move")
+    dismissed = [
+        (i, b.end + 1, b.segments()[-1][2])
+        for i, b in enumerate(batches)
+        if b.end < min(b.buy + life_expectancy[b.generation] - 1, time_steps)
+    ]
+    dismisses = rows(*(np.array(dismissed, dtype=np.int64).reshape(-1, 3).T), "dismiss")
+    fleet = pd.concat([buys, moves, dismisses], ignore_index=True)
+    return fleet.sort_values("time_step", kind="stable", ignore_index=True)
+
+
+def expand_cohorts(
+    cohorts: pd.DataFrame,
+    servers: pd.DataFrame | list[Server],
+    time_steps: int = get_known("time_steps"),
+    violations: Callable[[dict[str, int]], None] | None = None,
+) -> pd.DataFrame:
+    """Turns a fleet in cohort form into one row per server id and action."""
+    cohorts = cohort_data_preparation(cohorts, servers, violations)
+    return batches_to_fleet(
+        cohorts_to_batches(cohorts, servers, time_steps), servers, time_steps
+    )
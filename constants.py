@@ -1,66 +1,55 @@
 # pyright: basic
 
 
-import pandas as pd
+import numpy as np
 
-from evaluation import get_actual_demand
+import problem_data
+from evaluation import get_actual_demand_array, get_known
 from solver.models import (
     Datacenter,
     Demand,
     Elasticity,
     SellingPrices,
-    Sensitivity,
     Server,
-    ServerGeneration,
 )
 
 
 def get_datacenters() -> list[Datacenter]:
-    datacenters = pd.read_csv("data/datacenters.csv")
-
-    return [
-        Datacenter(**dc).setup()  # pyright: ignore[]
-        for _, dc in datacenters.iterrows()
-    ]
+    return problem_data.get_datacenters()
 
 
 def get_servers() -> list[Server]:
-    servers = pd.read_csv("data/servers.csv")
-
-    return [
-        Server(**server).setup()  # pyright: ignore[reportArgumentType]
-        for _, server in servers.iterrows()
-    ]
+    return problem_data.get_servers()
 
 
 def get_selling_prices() -> list[SellingPrices]:
-    selling_prices = pd.read_csv("data/selling_prices.csv")
-
-    p = [
-        SellingPrices(**sp).setup()  # pyright: ignore[]
-        for _, sp in selling_prices.iterrows()
-    ]
-    return p
+    return problem_data.get_selling_prices()
 
 
 def get_demand() -> list[Demand]:
-    parsed: list[Demand] = []
-
-    for _, row in get_actual_demand(pd.read_csv("./data/demand.csv")).iterrows():
-        parsed.append(
-            Demand(
-                row.time_step, row.server_generation, row.high, row.medium, row.low
-            ).setup()  # pyright: ignore[reportUnknownArgumentType]
-        )
-
-    return parsed
+    return demand_array_to_demands(
+        get_actual_demand_array(problem_data.load_data().demand)
+    )
+
+
+def demand_array_to_demands(actual_demand: np.ndarray) -> list[Demand]:
+    """
+    Adapts an actual demand array indexed by [time_step, server_generation,
+    latency_sensitivity] to Demand objects, skipping the time-steps without
+    demand for a generation like evaluation.get_actual_demand does.
+    """
+    sg_list = get_known("server_generation")
+    ts, sg = np.nonzero(actual_demand.sum(axis=2) > 0)
+    return [
+        Demand(
+            t, sg_list[g], *actual_demand[t, g].tolist()
+        ).setup()  # pyright: ignore[reportArgumentType]
+        for t, g in zip(ts.tolist(), sg.tolist())
+    ]
 
 
 def get_elasticity() -> list[Elasticity]:
-    return [
-        Elasticity(**p).setup()  # pyright: ignore[]
-        for _, p in pd.read_csv("data/price_elasticity_of_demand.csv").iterrows()
-    ]
+    return problem_data.get_elasticity()
 
 
 if __name__ == "__main__":
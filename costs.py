@@ -0,0 +1,132 @@
+"""
+Closed-form cost tables per (server generation, datacenter, age).
+
+Generations follow the order of `ServerGeneration` and datacenters are sorted
+by id, which is the order of `evaluation.get_known`. Ages are 1-based so that
+the tables can be indexed directly by a server's lifespan; index 0 and every
+age past a generation's life expectancy hold zero cost.
+"""
+
+from dataclasses import dataclass
+
+import numpy as np
+import pandas as pd
+
+from solver.models import Datacenter, Server, ServerGeneration
+
+SERVER_FIELDS = [
+    "purchase_price",
+    "energy_consumption",
+    "life_expectancy",
+    "cost_of_moving",
+    "average_maintenance_fee",
+]
+
+
+@dataclass
+class CostTables:
+    generations: list[str]
+    datacenters: list[str]
+    purchase_price: np.ndarray  # [generation]
+    cost_of_moving: np.ndarray  # [generation]
+    life_expectancy: np.ndarray  # [generation]
+    energy: np.ndarray  # [generation, datacenter]
+    maintenance: np.ndarray  # [generation, age]
+    step: np.ndarray  # [generation, datacenter, age]
+    cumulative: np.ndarray  # [generation, datacenter, age]
+
+    @property
+    def cumulative_maintenance(self) -> np.ndarray:
+        return np.cumsum(self.maintenance, axis=1)
+
+    @property
+    def average_maintenance(self) -> np.ndarray:
+        """Maintenance cost per time-step averaged over a full life."""
+        g = np.arange(len(self.generations))
+        return (
+            self.cumulative_maintenance[g, self.life_expectancy] / self.life_expectancy
+        )
+
+    def interval_cost(self, generation, datacenter, first_age, last_age, moved=False):
+        """
+        Cost of a server from `first_age` to `last_age` (both included),
+        including its purchase when `first_age` is 1 and one move when
+        `moved` is set. Arguments may be integers or index arrays.
+        """
+        first_age = np.maximum(first_age, 1)
+        cost = (
+            self.cumulative[generation, datacenter, last_age]
+            - self.cumulative[generation, datacenter, first_age - 1]
+        )
+        return cost + np.where(moved, self.cost_of_moving[generation], 0)
+
+    def lifetime_cost(self, generation, datacenter):
+        return self.cumulative[generation, datacenter, self.life_expectancy[generation]]
+
+
+def _server_attributes(servers: pd.DataFrame | list[Server]) -> dict[str, np.ndarray]:
+    generations = [sg.value for sg in ServerGeneration]
+    if isinstance(servers, pd.DataFrame):
+        s = servers.set_index("server_generation").loc[generations]
+        return {f: s[f].to_numpy() for f in SERVER_FIELDS}
+    sg_map = {
+        ServerGeneration(server.server_generation).value: server for server in servers
+    }
+    return {
+        f: np.array([getattr(sg_map[sg], f) for sg in generations])
+        for f in SERVER_FIELDS
+    }
+
+
+def _datacenter_attributes(
+    datacenters: pd.DataFrame | list[Datacenter],
+) -> tuple[list[str], np.ndarray]:
+    if isinstance(datacenters, pd.DataFrame):
+        d = datacenters.sort_values("datacenter_id")
+        return d["datacenter_id"].tolist(), d["cost_of_energy"].to_numpy()
+    d = sorted(datacenters, key=lambda dc: dc.datacenter_id)
+    return [dc.datacenter_id for dc in d], np.array([dc.cost_of_energy for dc in d])
+
+
+def get_maintenance_table(
+    average_maintenance_fee: np.ndarray, life_expectancy: np.ndarray
+) -> np.ndarray:
+    xhat = life_expectancy[:, None]
+    x = np.arange(life_expectancy.max() + 1, dtype=float)[None, :]
+    with np.errstate(divide="ignore", invalid="ignore"):
+        r = (1.5 * x) / xhat
+        table = average_maintenance_fee[:, None] * (1 + r * np.log2(r))
+    return np.where((x >= 1) & (x <= xhat), table, 0)
+
+
+def get_cost_tables(
+    servers: pd.DataFrame | list[Server],
+    datacenters: pd.DataFrame | list[Datacenter],
+) -> CostTables:
+    """
+    Builds the tables from the problem data DataFrames (csv units) or from
+    the `solver.models` dataclasses (scaled units, see `models.scale`).
+    """
+    s = _server_attributes(servers)
+    datacenter_ids, cost_of_energy = _datacenter_attributes(datacenters)
+    life_expectancy = s["life_expectancy"].astype(int)
+
+    energy = s["energy_consumption"][:, None] * cost_of_energy[None, :]
+    maintenance = get_maintenance_table(s["average_maintenance_fee"], life_expectancy)
+    ages = np.arange(maintenance.shape[1])
+    alive = (ages >= 1)[None, :] & (ages[None, :] <= life_expectancy[:, None])
+
+    step = energy[:, :, None] * alive[:, None, :] + maintenance[:, None, :]
+    step[:, :, 1] += s["purchase_price"][:, None]
+
+    return CostTables(
+        generations=[sg.value for sg in ServerGeneration],
+        datacenters=datacenter_ids,
+        purchase_price=s["purchase_price"],
+        cost_of_moving=s["cost_of_moving"],
+        life_expectancy=life_expectancy,
+        energy=energy,
+        maintenance=maintenance,
+        step=step,
+        cumulative=np.cumsum(step, axis=2),
+    )
@@ -1,18 +1,73 @@
-
-
+import functools
 import logging
+import time
+import tracemalloc
 import numpy as np
 import pandas as pd
-from scipy.stats import truncweibull_min
 
 
-# CREATE LOGGER
-logger = logging.getLogger()
-file_handler = logging.FileHandler('logs.log')
-logger.addHandler(file_handler)
-
-formatter = logging.Formatter('%(asctime)s | %(levelname)s | %(message)s')
-file_handler.setFormatter(formatter)
+# FILE THE EVALUATION LOGS GO TO, SEE get_logger
+LOG_FILE = 'logs.log'
+
+
+@functools.lru_cache(maxsize=None)
+def get_logger():
+    # CREATE LOGGER. THE FILE HANDLER IS ADDED THE FIRST TIME SOMETHING IS 
+    # LOGGED RATHER THAN ON IMPORT
+    logger = logging.getLogger()
+    file_handler = logging.FileHandler(LOG_FILE)
+    logger.addHandler(file_handler)
+
+    formatter = logging.Formatter('%(asctime)s | %(levelname)s | %(message)s')
+    file_handler.setFormatter(formatter)
+    return logger
+
+
+# PROFILE OF THE RUNNING EVALUATION, SET BY evaluation_function(profile=...).
+# WHEN IT IS None THE STAGES ARE NOT TIMED.
+PROFILE = None
+
+
+def profiled(f):
+    # ADD THE TIME AND A CALL OF f TO THE PROFILE OF THE RUNNING EVALUATION.
+    # NESTED STAGES ARE COUNTED IN THE STAGES THAT CALL THEM TOO
+    @functools.wraps(f)
+    def wrapper(*args, **kwargs):
+        if PROFILE is None:
+            return f(*args, **kwargs)
+        start = time.perf_counter()
+        try:
+            return f(*args, **kwargs)
+        finally:
+            stage = PROFILE['stages'].setdefault(f.__name__, {'calls': 0, 'time': 0.0})
+            stage['calls'] += 1
+            stage['time'] += time.perf_counter() - start
+    return wrapper
+
+
+def get_profiled_evaluation(evaluate, *args, memory=False, **kwargs):
+    # RUN evaluate WITH A PROFILE AND RETURN ITS RESULT AND THE PROFILE: THE
+    # CUMULATIVE TIME AND NUMBER OF CALLS OF EVERY profiled STAGE, THE TOTAL 
+    # TIME AND, IF memory, THE PEAK MEMORY IN BYTES TRACED BY tracemalloc
+    global PROFILE
+    PROFILE = {'stages': {}, 'time': 0.0, 'peak_memory': None}
+    profile = PROFILE
+    tracing = memory and not tracemalloc.is_tracing()
+    if tracing:
+        tracemalloc.start()
+    elif memory:
+        tracemalloc.reset_peak()
+    start = time.perf_counter()
+    try:
+        result = evaluate(*args, **kwargs)
+    finally:
+        profile['time'] = time.perf_counter() - start
+        if memory:
+            profile['peak_memory'] = tracemalloc.get_traced_memory()[1]
+        if tracing:
+            tracemalloc.stop()
+        PROFILE = None
+    return result, profile
 
 
 def get_known(key):
@@ -45,6 +100,12 @@ def get_known(key):
                 'server_generation', 
                 'server_id',
                 'action']
+    elif key == 'cohort_columns':
+        return ['time_step', 
+                'datacenter_id', 
+                'server_generation', 
+                'action',
+                'count']
     elif key == 'time_steps':
         return 168
     elif key == 'datacenter_fields':
@@ -57,27 +118,97 @@ def get_known(key):
                 'latency_sensitivity',
                 'server_generation',
                 'price']
-
-
-def fleet_data_preparation(solution, servers, datacenters, selling_prices):
+    elif key == 'fleet_violations':
+        return ['bad_action',
+                'unknown_datacenter',
+                'unknown_generation',
+                'out_of_window_buy',
+                'duplicate_id',
+                'orphan_action']
+
+
+@profiled
+def fleet_data_preparation(solution, 
+                           servers, 
+                           datacenters, 
+                           selling_prices, 
+                           violations=None):
     # CHECK DATA FORMAT
     solution = check_data_format(solution)
-    solution = check_actions(solution)
-    # CHECK DATACENTERS AND SERVERS NAMES
-    solution = check_datacenters_servers_generation(solution)
+    # DROP THE ROWS THAT BREAK THE RULES (ACTIONS, DATACENTERS AND SERVERS 
+    # NAMES, RELEASE TIME, DUPLICATE SERVERS IDs). violations IS CALLED WITH
+    # THE NUMBER OF DROPPED ROWS PER RULE
+    solution, summary = validate_fleet(solution, servers)
+    if violations is not None:
+        violations(summary)
     # ADD PROBLEM DATA
     solution = solution.merge(servers, on='server_generation', how='left')
     solution = solution.merge(datacenters, on='datacenter_id', how='left')
     solution = solution.merge(selling_prices, 
                               on=['server_generation', 'latency_sensitivity'], 
                               how='left')
-    # CHECK IF SERVERS ARE USED AT THE RIGHT RELEASE TIME
-    solution = check_server_usage_by_release_time(solution)
-    # DROP DUPLICATE SERVERS IDs
-    solution = drop_duplicate_server_ids(solution)
     return solution.reset_index(drop=True, inplace=False)
 
 
+def validate_fleet(solution, servers):
+    # CHECK ALL ROWS AT ONCE AGAINST THE RULES OF THE PROBLEM. RETURNS THE
+    # VALID ROWS AND THE NUMBER OF DROPPED ROWS PER RULE, WHICH IS ALSO LOGGED
+    violations = get_fleet_violations(solution, servers)
+    summary = violations.sum().astype(int).to_dict()
+    if any(summary.values()):
+        get_logger().warning(f'Dropped fleet rows: {summary}')
+    valid = ~violations.any(axis=1)
+    return solution[valid].reset_index(drop=True, inplace=False), summary
+
+
+def get_fleet_violations(solution, servers):
+    # FLAG EVERY ROW WITH THE FIRST RULE IT BREAKS, IN THE ORDER OF 
+    # get_known('fleet_violations'). SOLUTIONS WITHOUT A server_id COLUMN 
+    # (SEE cohorts.py) ARE NOT CHECKED FOR DUPLICATES AND ORPHAN ACTIONS
+    index = solution.index
+    action = solution['action']
+    generation = solution['server_generation']
+    time_step = solution['time_step']
+    rules = {}
+    rules['bad_action'] = ~action.isin(get_known('actions'))
+    if not (action[(time_step == 1) & ~rules['bad_action']] == 'buy').all():
+        raise(ValueError('At time-step 1 it is only possible to use the "buy" action.'))
+    rules['unknown_datacenter'] = ~solution['datacenter_id'].isin(get_known('datacenter_id'))
+    rules['unknown_generation'] = ~generation.isin(get_known('server_generation'))
+    windows = get_release_windows(servers)
+    start = generation.map(windows['release_start']).to_numpy()
+    end = generation.map(windows['release_end']).to_numpy()
+    rules['out_of_window_buy'] = (action == 'buy') & ~((time_step >= start) & (time_step <= end))
+    rules['duplicate_id'] = pd.Series(False, index=index)
+    rules['orphan_action'] = pd.Series(False, index=index)
+    violations = pd.DataFrame(rules, index=index)
+    for i, rule in enumerate(get_known('fleet_violations')[:-2]):
+        violations[rule] &= ~violations.iloc[:, :i].any(axis=1)
+    if 'server_id' in solution.columns:
+        kept = solution[~violations.any(axis=1)]
+        duplicate = kept['server_id'].duplicated() & (kept['action'] == 'buy')
+        violations.loc[duplicate.index, 'duplicate_id'] = duplicate
+        # THE MOVES AND DISMISSALS OF THE SERVERS WHOSE BUY HAS BEEN DROPPED
+        # (UNLESS ANOTHER BUY OF THE SAME ID IS KEPT)
+        kept = ~violations.any(axis=1)
+        buy = action == 'buy'
+        server_id = solution['server_id']
+        lost = server_id[buy & ~kept]
+        lost = lost[~lost.isin(server_id[buy & kept])]
+        violations['orphan_action'] = kept & ~buy & server_id.isin(lost)
+    return violations
+
+
+def get_release_windows(servers):
+    # THE RELEASE TIME OF EACH SERVER GENERATION, PARSED ONCE PER servers
+    # (SEE problem_data.py, IMPORTED HERE AS IT IS BUILT ON THIS MODULE)
+    from problem_data import get_server_arrays
+    s = get_server_arrays(servers)
+    return pd.DataFrame({'release_start': s['release_start'], 
+                         'release_end': s['release_end']},
+                        index=get_known('server_generation'))
+
+
 def check_data_format(solution):
     # CHECK THAT WE HAVE ALL AND ONLY THE REQUIRED COLUMNS
     required_cols = get_known('required_columns')
@@ -87,51 +218,7 @@ def check_data_format(solution):
         raise(ValueError('Please check the solution format.'))
 
 
-def check_actions(solution):
-    # CHECK THAT WE ARE USING ONLY ALLOWED ACTIONS
-    actions = get_known('actions')
-    solution = solution[solution['action'].isin(actions)]
-    if not (solution[solution['time_step'] == 1]['action'] == 'buy').all():
-        raise(ValueError('At time-step 1 it is only possible to use the "buy" action.'))
-    return solution.reset_index(drop=True, inplace=False)
-
-
-def check_datacenters_servers_generation(solution):
-    # CHECK THAT DATA-CENTERS AND SERVER GENERATIONS ARE NAMED AS REQUESTED
-    known_datacenters = get_known('datacenter_id')
-    known_generations = get_known('server_generation')
-    solution = solution[solution['datacenter_id'].isin(known_datacenters)]
-    solution = solution[solution['server_generation'].isin(known_generations)]
-    return solution
-
-
-def check_server_usage_by_release_time(solution):
-    # CHECK THAT ONLY THE SERVERS AVAILABLE FOR PURCHASE AT A CERTAIN TIME-STEP
-    # ARE USED AT THAT TIME-STEP
-    solution['rt_is_fine'] = solution.apply(check_release_time, axis=1)
-    solution = solution[(solution['rt_is_fine'] != 'buy') | solution['rt_is_fine']]
-    solution = solution.drop(columns='rt_is_fine', inplace=False)
-    return solution
-
-
-def check_release_time(x):
-    # HELPER FUNCTION TO CHECK THE CORRECT SERVER USAGE BY TIME-STEP
-    rt = eval(x['release_time'])
-    ts = x['time_step']
-    if ts >= min(rt) and ts <= max(rt):
-        return True
-    else:
-        return False
-
-
-def drop_duplicate_server_ids(solution):
-    # DROP SERVERS THAT ARE BOUGHT MULTIPLE TIMES WITH THE SAME SERVER ID
-    drop = solution[(solution['server_id'].duplicated()) & (solution['action'] == 'buy')].index
-    if drop.any():
-        solution = solution.drop(index=drop, inplace=False)
-    return solution
-
-
+@profiled
 def pricing_data_preparation(prices):
     # IF THERE IS NO PRICING STRATEGY DO NOTHING
     if prices.empty:
@@ -169,40 +256,59 @@ def change_selling_prices_format(selling_prices):
     return selling_prices
 
 
+@profiled
 def get_actual_demand(demand):
     # CALCULATE THE ACTUAL DEMAND AT TIME-STEP t
-    actual_demand = []
-    for ls in get_known('latency_sensitivity'):
-        for sg in get_known('server_generation'):
-            d = demand[demand['latency_sensitivity'] == ls]
-            sg_demand = d[sg].values.astype(float)
-            rw = get_random_walk(sg_demand.shape[0], 0, 2)
-            sg_demand += (rw * sg_demand)
-
-            ls_sg_demand = pd.DataFrame()
-            ls_sg_demand['time_step'] = d['time_step']
-            ls_sg_demand['server_generation'] = sg
-            ls_sg_demand['latency_sensitivity'] = ls
-            ls_sg_demand['demand'] = sg_demand.astype(int)
-            actual_demand.append(ls_sg_demand)
-
-    actual_demand = pd.concat(actual_demand, axis=0, ignore_index=True)
-    actual_demand = actual_demand.pivot(index=['time_step', 'server_generation'], columns='latency_sensitivity')
-    actual_demand.columns = actual_demand.columns.droplevel(0)
-    actual_demand = actual_demand.loc[actual_demand[get_known('latency_sensitivity')].sum(axis=1) > 0]
-    actual_demand = actual_demand.reset_index(['time_step', 'server_generation'], col_level=1, inplace=False)
+    return demand_array_to_frame(get_actual_demand_array(demand))
+
+
+@profiled
+def get_actual_demand_array(demand):
+    # CALCULATE THE ACTUAL DEMAND OF ALL TIME-STEPS AS AN ARRAY INDEXED BY
+    # [time_step, server_generation, latency_sensitivity] IN THE ORDER OF 
+    # get_known. ROW 0 IS UNUSED. THE RANDOM WALKS ARE DRAWN IN ONE CALL, IN 
+    # THE SAME ORDER AS ONE WALK PER LATENCY SENSITIVITY AND SERVER GENERATION
+    ls_list = get_known('latency_sensitivity')
+    sg_list = get_known('server_generation')
+    d = [demand[demand['latency_sensitivity'] == ls] for ls in ls_list]
+    n = d[0].shape[0]
+    if any(x.shape[0] != n for x in d):
+        raise(ValueError('The demand must have the same time-steps for every latency sensitivity.'))
+    # base[ls, sg, i] IS THE DEMAND OF THE i-th ROW
+    base = np.stack([x[sg_list].to_numpy(dtype=float).T for x in d])
+    rw = get_random_walks(len(ls_list) * len(sg_list), n, 0, 2)
+    base += rw.reshape(base.shape) * base
+    actual_demand = np.zeros((demand['time_step'].max() + 1, len(sg_list), len(ls_list)), dtype=np.int64)
+    for j, x in enumerate(d):
+        actual_demand[x['time_step'].to_numpy(), :, j] = base[j].T.astype(np.int64)
+    return actual_demand
+
+
+def demand_array_to_frame(actual_demand):
+    # ADAPT THE ACTUAL DEMAND ARRAY TO THE DATAFRAME FORMAT OF THE REST OF CODE
+    ls_list = get_known('latency_sensitivity')
+    sg_list = get_known('server_generation')
+    ts, sg = np.nonzero(actual_demand.sum(axis=2) > 0)
+    columns = sorted(ls_list)
+    actual_demand = pd.DataFrame(actual_demand[ts, sg][:, [ls_list.index(ls) for ls in columns]], 
+                                 columns=pd.Index(columns, name='latency_sensitivity'))
+    actual_demand.insert(0, 'time_step', ts)
+    actual_demand.insert(1, 'server_generation', np.array(sg_list, dtype=object)[sg])
     return actual_demand
 
 
+def get_random_walks(k, n, mu, sigma):
+    # HELPER FUNCTION TO GET k RANDOM WALKS OF n STEPS AT ONCE
+    r = np.random.normal(mu, sigma, (k, n))
+    ts = np.cumsum(r, axis=1)
+    ts_min = ts.min(axis=1, keepdims=True)
+    ts = (2 * (ts - ts_min) / np.ptp(ts, axis=1, keepdims=True)) - 1
+    return ts
+
+
 def get_random_walk(n, mu, sigma):
     # HELPER FUNCTION TO GET A RANDOM WALK TO CHANGE THE DEMAND PATTERN
-    r = np.random.normal(mu, sigma, n)
-    ts = np.empty(n)
-    ts[0] = r[0]
-    for i in range(1, n):
-        ts[i] = ts[i - 1] + r[i]
-    ts = (2 * (ts - ts.min()) / np.ptp(ts)) - 1
-    return ts
+    return get_random_walks(1, n, mu, sigma)[0]
 
 
 def get_time_step_demand(demand, ts):
@@ -213,6 +319,7 @@ def get_time_step_demand(demand, ts):
     return d
 
 
+@profiled
 def get_time_step_fleet(solution, ts):
     # GET THE FLEET AT A SPECIFIC TIME-STEP 
     if ts in solution['time_step'].values:
@@ -225,44 +332,64 @@ def get_time_step_fleet(solution, ts):
         return pd.DataFrame()
 
 
-def get_time_step_prices(pricing_strategy, ts):
-    # GET THE PRICES AT A SPECIFIC TIME-STEP 
-    if ts in pricing_strategy['time_step'].values:
-        s = pricing_strategy[pricing_strategy['time_step'] == ts]
-        s = s.drop(columns='time_step', inplace=False)
-        s = s.pivot(index='server_generation', columns='latency_sensitivity')
-        s.columns = s.columns.droplevel(0)
-        return s
-    else:
-        return pd.DataFrame()
+def get_index(key):
+    # MAP THE KNOWN NAMES OF A KEY TO THEIR POSITION IN THE ARRAYS
+    return {name: i for i, name in enumerate(get_known(key))}
 
 
-def update_selling_prices(selling_prices, ts_prices):
-    # UPDATE THE SELLING PRICES ACCORDING TO THE PRICING STRATEGY
-    if ts_prices.empty:
-        return selling_prices
-    else:
-        selling_prices.update(ts_prices)
-        return selling_prices
-
-
-def update_demand_according_to_prices(D, selling_prices, base_prices, elasticity):
-    # UPDATE THE DEMAND ACCORDING TO THE NEW PRICES
-    new_prices = selling_prices.ne(base_prices)
-    ix = new_prices.where(selling_prices.ne(base_prices)).stack().index.tolist()
-    if ix:
-        SG = D.index.values
-        for sg, ls in ix:
-            if sg in SG:
-                d0 = D.loc[sg, ls]
-                p0 = base_prices.loc[sg, ls]
-                p1 = selling_prices.loc[sg, ls]
-                e = elasticity.loc[sg, ls]
-                d1 = get_new_demand_for_new_price(d0, p0, p1, e)
-                D.loc[sg, ls] = d1
+def get_demand_array(actual_demand, time_steps=get_known('time_steps')):
+    # FIT THE ACTUAL DEMAND ARRAY (SEE get_actual_demand_array) TO time_steps,
+    # AS FLOATS LIKE IN get_time_step_demand
+    D = np.zeros((time_steps + 1,) + actual_demand.shape[1:])
+    n = min(time_steps + 1, actual_demand.shape[0])
+    D[:n] = actual_demand[:n]
     return D
 
 
+@profiled
+def get_price_arrays(pricing_strategy, selling_prices, time_steps=get_known('time_steps')):
+    # SELLING PRICES BY TIME-STEP, GENERATION AND LATENCY SENSITIVITY. A PRICE
+    # SET AT TIME-STEP t HOLDS UNTIL IT IS CHANGED AGAIN. RETURNS THE PRICES
+    # AND THE BASE PRICES
+    base = selling_prices.loc[get_known('server_generation'),
+                              get_known('latency_sensitivity')].to_numpy()
+    P = np.full((time_steps + 1,) + base.shape, np.nan)
+    P[0] = base
+    if not pricing_strategy.empty:
+        p = pricing_strategy[(pricing_strategy['time_step'] >= 1)
+                             & (pricing_strategy['time_step'] <= time_steps)]
+        p = p[p['server_generation'].isin(get_known('server_generation'))
+              & p['latency_sensitivity'].isin(get_known('latency_sensitivity'))]
+        P[p['time_step'].to_numpy(),
+          p['server_generation'].map(get_index('server_generation')).to_numpy(),
+          p['latency_sensitivity'].map(get_index('latency_sensitivity')).to_numpy()
+          ] = p['price'].to_numpy()
+    # FORWARD FILL ALONG THE TIME-STEPS
+    idx = np.where(np.isnan(P), 0, np.arange(time_steps + 1)[:, None, None])
+    idx = np.maximum.accumulate(idx, axis=0)
+    P = np.take_along_axis(P, idx, axis=0)
+    return P, base
+
+
+@profiled
+def update_demand_array_according_to_prices(D, prices, base_prices, elasticity):
+    # VECTORISED get_new_demand_for_new_price, FOR ALL TIME-STEPS AT ONCE
+    e = elasticity.loc[get_known('server_generation'),
+                       get_known('latency_sensitivity')].to_numpy()
+    changed = prices != base_prices[None]
+    delta_p_e = (prices - base_prices[None]) / base_prices[None] * e[None]
+    d1 = np.maximum(np.trunc(D * (1 + delta_p_e)), 0)
+    return np.where(changed, d1, D)
+
+
+def get_time_step_frame(a, ts):
+    # GET THE [server_generation, latency_sensitivity] SLICE OF AN ARRAY AT 
+    # TIME-STEP ts IN THE DATAFRAME FORMAT OF THE REST OF CODE
+    return pd.DataFrame(a[ts], 
+                        index=get_known('server_generation'), 
+                        columns=get_known('latency_sensitivity'))
+
+
 def get_new_demand_for_new_price(d0, p0, p1, e):
     # CALCULATE THE NEW DEMAND ACCORDING TO THE NEW PRICE
     delta_p = (p1 - p0) / p0
@@ -273,6 +400,7 @@ def get_new_demand_for_new_price(d0, p0, p1, e):
     return int(d1)
 
 
+@profiled
 def get_capacity_by_server_generation_latency_sensitivity(fleet):
     # CALCULATE THE CAPACITY AT A SPECIFIC TIME-STEP t FOR ALL PAIRS OF
     # LATENCY SENSITIVITIES AND SERVER GENERATIONS. ADJUST SUCH CAPACITY
@@ -280,7 +408,7 @@ def get_capacity_by_server_generation_latency_sensitivity(fleet):
     Z = fleet.groupby(by=['server_generation', 'latency_sensitivity'])['capacity'].sum().unstack()
     cols = get_valid_columns(Z.columns, get_known('latency_sensitivity'))
     Z = Z[cols]
-    Z = Z.map(adjust_capacity_by_failure_rate, na_action='ignore')
+    Z = adjust_capacity_by_failure_rates(Z)
     Z = Z.fillna(0, inplace=False)
     return Z
 
@@ -290,11 +418,45 @@ def get_valid_columns(cols1, cols2):
     return list(set(cols1).intersection(set(cols2)))
 
 
+# THE FAILURE RATE f FOLLOWS A WEIBULL DISTRIBUTION OF SHAPE c TRUNCATED TO 
+# [a, b]. exp(-a^c) AND exp(-b^c) ARE THE COMPLEMENTS OF ITS CDF AT a AND b.
+# THEY ARE COMPUTED WITH NUMPY, ON 0-D ARRAYS, AS scipy.stats DOES, WHICH CAN
+# DIFFER FROM THE MATH OF PYTHON FLOATS IN THE LAST BIT
+FAILURE_SHAPE, FAILURE_LOW, FAILURE_HIGH = np.array(0.3), np.array(0.05), np.array(0.1)
+FAILURE_EXP_LOW = np.exp(-pow(FAILURE_LOW, FAILURE_SHAPE))
+FAILURE_EXP_HIGH = np.exp(-pow(FAILURE_HIGH, FAILURE_SHAPE))
+
+
+def get_failure_rates(size=None, rng=None):
+    # DRAW FAILURE RATES f BY INVERSE CDF. WITHOUT rng THE UNIFORMS COME FROM
+    # np.random AND THE RATES ARE THE SAME, DRAW FOR DRAW, AS THOSE OF 
+    # scipy.stats.truncweibull_min.rvs(0.3, 0.05, 0.1, size=size), WHICH 
+    # KEEPS THE SCORES OF A SEED. WITH A np.random.Generator AS rng THE 
+    # SEQUENCE IS A DIFFERENT ONE.
+    q = np.random.uniform(size=size) if rng is None else rng.random(size)
+    x = (1 - q) * FAILURE_EXP_LOW + q * FAILURE_EXP_HIGH
+    return pow(-np.log(x), 1 / FAILURE_SHAPE)
+
+
 def adjust_capacity_by_failure_rate(x):
     # HELPER FUNCTION TO CALCULATE THE FAILURE RATE f
-    return int(x * (1 - truncweibull_min.rvs(0.3, 0.05, 0.1, size=1).item()))
+    return int(x * (1 - get_failure_rates(1).item()))
+
 
+def adjust_capacity_by_failure_rates(Z):
+    # adjust_capacity_by_failure_rate FOR EVERY CELL OF Z WITH A CAPACITY, 
+    # WITH ALL THE RATES DRAWN AT ONCE IN THE ORDER OF 
+    # Z.map(adjust_capacity_by_failure_rate, na_action='ignore'): COLUMN BY 
+    # COLUMN, SKIPPING THE EMPTY CELLS
+    values = Z.to_numpy(dtype=float).T.copy()
+    present = ~np.isnan(values)
+    values[present] = np.trunc(values[present] * (1 - get_failure_rates(present.sum())))
+    Z = pd.DataFrame(values.T, index=Z.index, columns=Z.columns)
+    # COLUMNS WITHOUT EMPTY CELLS HOLD INTEGERS, AS WITH Z.map
+    return Z.astype({c: np.int64 for c, full in zip(Z.columns, present.all(axis=1)) if full})
 
+
+@profiled
 def check_datacenter_slots_size_constraint(fleet):
     # CHECK DATACENTERS SLOTS SIZE CONSTRAINT
     slots = fleet.groupby(by=['datacenter_id']).agg({'slots_size': 'sum',
@@ -333,6 +495,39 @@ def get_normalized_lifespan(fleet):
     return (fleet['lifespan'] / fleet['life_expectancy']).sum() / fleet.shape[0]
 
 
+def get_cost_breakdown(fleet):
+    # SPLIT THE COST OF get_cost INTO ENERGY, MAINTENANCE, PURCHASE AND MOVING
+    bought = fleet['lifespan'] == 1
+    moved = ~bought & (fleet['moved'] == 1)
+    return {'energy_cost': (fleet['energy_consumption'] * fleet['cost_of_energy']).sum(),
+            'maintenance_cost': get_maintenance_cost(fleet['average_maintenance_fee'],
+                                                     fleet['lifespan'],
+                                                     fleet['life_expectancy']).sum(),
+            'purchase_cost': fleet.loc[bought, 'purchase_price'].sum(),
+            'moving_cost': fleet.loc[moved, 'cost_of_moving'].sum()}
+
+
+def get_trace_record(ts, D, Z, prices, costs, slots, U, L, P, O):
+    # ONE FLAT RECORD OF TIME-STEP ts FOR THE trace CALLBACK OF 
+    # evaluation_function. D, Z AND prices ARE [server_generation, 
+    # latency_sensitivity] ARRAYS AND slots IS BY DATACENTER, ALL IN THE ORDER
+    # OF get_known. Z IS THE CAPACITY AFTER FAILURES.
+    record = {'time_step': ts,
+              'O': O,
+              'P': P,
+              'U': U,
+              'L': L,
+              'revenue': float((np.minimum(Z, D) * prices).sum())}
+    record.update(costs)
+    for i, sg in enumerate(get_known('server_generation')):
+        for j, ls in enumerate(get_known('latency_sensitivity')):
+            record[f'demand_{sg}_{ls}'] = D[i, j]
+            record[f'capacity_{sg}_{ls}'] = Z[i, j]
+    for k, dc in enumerate(get_known('datacenter_id')):
+        record[f'slots_{dc}'] = slots[k]
+    return record
+
+
 def get_profit(D, Z, selling_prices, fleet):
     # CALCULATE OBJECTIVE P = PROFIT
     R = get_revenue(D, Z, selling_prices)
@@ -340,6 +535,7 @@ def get_profit(D, Z, selling_prices, fleet):
     return R - C
 
 
+@profiled
 def get_revenue(D, Z, selling_prices):
     # CALCULATE THE REVENUE
     r = 0
@@ -354,6 +550,7 @@ def get_revenue(D, Z, selling_prices):
     return r
 
 
+@profiled
 def get_cost(fleet):
     # CALCULATE THE SERVER COST - PART 1
     fleet['cost'] = fleet.apply(calculate_server_cost, axis=1)
@@ -383,6 +580,7 @@ def get_maintenance_cost(b, x, xhat):
     return b * (1 + (((1.5)*(x))/xhat * np.log2(((1.5)*(x))/xhat)))
 
 
+@profiled
 def update_fleet(ts, fleet, solution):
     # UPADATE THE FLEET ACCORDING TO THE ACTIONS AT THE CURRENT TIMESTEP
     if fleet.empty:
@@ -410,6 +608,7 @@ def update_fleet(ts, fleet, solution):
     return fleet
 
 
+@profiled
 def put_fleet_on_hold(fleet):
     fleet['action'] = 'hold'
     fleet['moved'] = 0
@@ -433,43 +632,46 @@ def get_evaluation(fleet,
                    selling_prices,
                    elasticity,
                    time_steps=get_known('time_steps'), 
-                   verbose=1):
+                   verbose=1,
+                   trace=None,
+                   violations=None):
 
-    # SOLUTION EVALUATION
+    # SOLUTION EVALUATION. trace IS CALLED WITH THE RECORD OF EVERY 
+    # TIME-STEP WITH A FLEET, SEE get_trace_record, AND violations WITH THE
+    # NUMBER OF FLEET ROWS DROPPED PER RULE, SEE validate_fleet
 
     # SOLUTION DATA PREPARATION
     fleet = fleet_data_preparation(fleet, 
                                    servers, 
                                    datacenters, 
-                                   selling_prices)
+                                   selling_prices,
+                                   violations)
 
     # PRICING STRATEGY DATA PREPARATION
     pricing_strategy = pricing_data_preparation(pricing_strategy)
     elasticity = change_elasticity_format(elasticity)
     selling_prices = change_selling_prices_format(selling_prices)
-    base_prices = selling_prices.copy()
 
     # DEMAND DATA PREPARATION
-    demand = get_actual_demand(demand)
+    demand = get_demand_array(get_actual_demand_array(demand), time_steps)
+
+    # THE PRICES OF ALL TIME-STEPS [time_step, server_generation, 
+    # latency_sensitivity] AND THE DEMAND UPDATED ACCORDING TO THEM
+    prices, base_prices = get_price_arrays(pricing_strategy, selling_prices, time_steps)
+    demand = update_demand_array_according_to_prices(demand, prices, base_prices, elasticity)
     OBJECTIVE = 0
     FLEET = pd.DataFrame()
     # if ts-related fleet is empty then current fleet is ts-fleet
     for ts in range(1, time_steps+1):
 
         # GET THE ACTUAL DEMAND AT TIMESTEP ts
-        D = get_time_step_demand(demand, ts)
+        D = get_time_step_frame(demand, ts)
 
         # GET THE SERVERS DEPLOYED AT TIMESTEP ts
         ts_fleet = get_time_step_fleet(fleet, ts)
 
         # GET THE PRICES AT TIMESTEP ts
-        ts_prices = get_time_step_prices(pricing_strategy, ts)
-
-        # UPDATE THE SELLING PRICES ACCORDING TO PRICES AT TIMESTEP ts
-        selling_prices = update_selling_prices(selling_prices, ts_prices)
-
-        # UPDATE THE DEMAND ACCORDING TO PRICES AT TIMESTEP ts
-        D = update_demand_according_to_prices(D, selling_prices, base_prices, elasticity)
+        selling_prices = get_time_step_frame(prices, ts)
 
         if ts_fleet.empty and not FLEET.empty:
             ts_fleet = FLEET
@@ -499,6 +701,22 @@ def get_evaluation(fleet,
 
             OBJECTIVE += P
 
+            if trace is not None:
+                sg_list = get_known('server_generation')
+                ls_list = get_known('latency_sensitivity')
+                Z = Zf.reindex(index=sg_list, columns=ls_list, fill_value=0)
+                slots = FLEET.groupby('datacenter_id')['slots_size'].sum()
+                trace(get_trace_record(ts,
+                                       demand[ts],
+                                       Z.to_numpy(),
+                                       prices[ts],
+                                       get_cost_breakdown(FLEET),
+                                       slots.reindex(get_known('datacenter_id'), fill_value=0).to_numpy(),
+                                       get_utilization(D, Zf),
+                                       get_normalized_lifespan(FLEET),
+                                       P,
+                                       OBJECTIVE))
+
             # PUT ENTIRE FLEET on HOLD ACTION
             FLEET = put_fleet_on_hold(FLEET)
 
@@ -527,7 +745,12 @@ def evaluation_function(fleet,
                         elasticity,
                         time_steps=get_known('time_steps'), 
                         seed=None,
-                        verbose=0):
+                        verbose=0,
+                        engine='dataframe',
+                        scenario=None,
+                        trace=None,
+                        violations=None,
+                        profile=False):
 
     """
     Evaluate a solution for the Tech Arena Phase 1 problem.
@@ -535,9 +758,14 @@ def evaluation_function(fleet,
     Parameters
     ----------
     fleet : pandas DataFrame
-        This is a fleet of servers. This is provided by the partecipant.
+        This is a fleet of servers. This is provided by the partecipant. 
+        It can also be given in the compact cohort form of cohorts.py, or 
+        as the memory-mapped arrays of a .npz solution (see 
+        utils.open_solution_arrays), which the 'array' engine reads without 
+        building a DataFrame.
     pricing_strategy : pandas DataFrame
-        This is a pricing strategy. This is provided by the partecipant.
+        This is a pricing strategy. This is provided by the partecipant. 
+        Like the fleet, it can be given as the arrays of a .npz solution.
     demand : pandas DataFrame
         This is the demand data. This is provided by default in the data 
         folder.
@@ -559,28 +787,88 @@ def evaluation_function(fleet,
     c1_max_violations : int
         This is the maximum number of violations to Contraint 1 that can be
         tolerated. If this number is exceeded the function will output None.
+    engine : str
+        Either 'dataframe' to run the time-step by time-step evaluation of 
+        get_evaluation, or 'array' to run the array-backed engine of 
+        fast_evaluation, which gives the same objective for a given seed.
+    scenario : scenario.Scenario
+        The actual demand and failure rates of a seed, see 
+        scenario.get_scenario. If given, they replace the random draws. This 
+        is only supported by the 'array' engine.
+    trace : callable
+        If given, it is called with a flat dict for every time-step with a
+        fleet: the demand, capacity after failures, revenue, energy, 
+        maintenance, purchase and moving costs, slots usage per datacenter, 
+        U, L, P and O. See evaluation_trace.py to write them to a file.
+    violations : callable
+        If given, it is called once with a dict of the number of fleet rows
+        dropped for breaking each rule of get_known('fleet_violations').
+    profile : bool or str
+        If True, the function returns the objective together with a dict of
+        the cumulative time and number of calls of every stage of the 
+        evaluation and its total time. If 'memory', the dict also has the 
+        peak memory in bytes traced by tracemalloc.
 
     Return
     ------
     This function returns a float that represents the value of the objective
     function O evaluated across all time-steps.
     In case the solution cannot be evaluated the function returns None.
+    With profile, it returns a tuple of the objective and the profile.
     """
     # SET RANDOM SEED
     np.random.seed(seed)
+    # SELECT THE EVALUATION ENGINE
+    kwargs = {}
+    if engine == 'array':
+        from fast_evaluation import get_array_evaluation
+        evaluate = get_array_evaluation
+        kwargs['scenario'] = scenario
+    elif engine == 'dataframe':
+        if scenario is not None:
+            raise(ValueError('Scenarios are only supported by the array engine.'))
+        # THE DATAFRAMES ARE ONLY BUILT FROM THE ARRAYS OF
+        # utils.open_solution_arrays FOR THIS ENGINE
+        from utils import arrays_to_frame
+        if isinstance(fleet, dict):
+            fleet = arrays_to_frame(fleet, 'fleet')
+        if isinstance(pricing_strategy, dict):
+            pricing_strategy = arrays_to_frame(pricing_strategy, 'pricing_strategy')
+        from cohorts import expand_cohorts, is_cohort_fleet
+        if is_cohort_fleet(fleet):
+            # THE ROWS ARE DROPPED WHEN THE COHORTS ARE EXPANDED
+            fleet = expand_cohorts(fleet, servers, time_steps, violations)
+            violations = None
+        evaluate = get_evaluation
+    else:
+        raise(ValueError(f'Unknown evaluation engine: {engine}.'))
+    evaluate = functools.partial(evaluate,
+                                 fleet, 
+                                 pricing_strategy, 
+                                 demand,
+                                 datacenters,
+                                 servers,
+                                 selling_prices,
+                                 elasticity,
+                                 time_steps=time_steps, 
+                                 verbose=verbose,
+                                 trace=trace,
+                                 violations=violations,
+                                 **kwargs)
+    # EVALUATE SOLUTION
+    if profile:
+        return get_profiled_evaluation(get_safe_evaluation, 
+                                       evaluate, 
+                                       memory=profile == 'memory')
+    return get_safe_evaluation(evaluate)
+
+
+def get_safe_evaluation(evaluate):
     # EVALUATE SOLUTION
     try:
-        return get_evaluation(fleet, 
-                                pricing_strategy, 
-                                demand,
-                                datacenters,
-                                servers,
-                                selling_prices,
-                                elasticity,
-                                time_steps=time_steps, 
-                                verbose=verbose)
+        return evaluate()
     # CATCH EXCEPTIONS
     except Exception as e:
-        logger.error(e)
+        get_logger().error(e)
         return None
 
@@ -0,0 +1,103 @@
+"""
+Writers for the per-time-step trace of `evaluation_function(trace=...)`.
+
+The evaluator calls `trace` once per time-step with a flat record (see
+`evaluation.get_trace_record`), so a writer only ever holds the current row,
+or one row group for Parquet, however many solutions and seeds are swept:
+
+    with CsvTraceWriter("trace.csv") as trace:
+        evaluation_function(fleet, pricing_strategy, *data, seed=seed, trace=trace)
+
+A writer can be reused across evaluations by setting the values of the
+columns it adds to every record before each one, e.g.
+`trace.extra = {"seed": seed}`. The columns themselves are fixed by the first
+record, so declare them all when the writer is made:
+
+    trace = CsvTraceWriter("trace.csv", extra={"solution": None, "seed": None})
+"""
+
+import csv
+
+
+class CsvTraceWriter:
+    """
+    Appends every record as a row of a csv file, the header comes first. The
+    `extra` columns cannot change once the header is written.
+    """
+
+    def __init__(self, path: str, extra: dict | None = None):
+        self.path = path
+        self.extra = extra or {}
+        self.columns: list[str] = []
+        self.file = None
+        self.writer = None
+
+    def __call__(self, record: dict):
+        if self.writer is None:
+            self.columns = list(self.extra)
+            self.file = open(self.path, "w", newline="")
+            fieldnames = dict.fromkeys(self.columns + list(record))
+            self.writer = csv.DictWriter(self.file, fieldnames=list(fieldnames))
+            self.writer.writeheader()
+        elif list(self.extra) != self.columns:
+            raise ValueError(
+                f"The extra columns of {self.path} are {self.columns}, "
+                f"they cannot change to {list(self.extra)}."
+            )
+        self.writer.writerow({**self.extra, **record})
+
+    def close(self):
+        if self.file is not None:
+            self.file.close()
+            self.file = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *_):
+        self.close()
+
+
+class ParquetTraceWriter:
+    """
+    Writes the records to a parquet file, one row group per `chunk_size`
+    records. Needs pyarrow, which is only imported on the first write.
+    """
+
+    def __init__(self, path: str, extra: dict | None = None, chunk_size: int = 10_000):
+        self.path = path
+        self.extra = extra or {}
+        self.chunk_size = chunk_size
+        self.rows: list[dict] = []
+        self.writer = None
+
+    def __call__(self, record: dict):
+        self.rows.append({**self.extra, **record})
+        if len(self.rows) >= self.chunk_size:
+            self.flush()
+
+    def flush(self):
+        if not self.rows:
+            return
+        try:
+            import pyarrow as pa
+            import pyarrow.parquet as pq
+        except ImportError:
+            raise ImportError("Writing a parquet trace needs pyarrow.") from None
+        table = pa.Table.from_pylist(self.rows)
+        if self.writer is None:
+            self.writer = pq.ParquetWriter(self.path, table.schema)
+        self.writer.write_table(table.cast(self.writer.schema))
+        self.rows = []
+
+    def close(self):
+        self.flush()
+        if self.writer is not None:
+            self.writer.close()
+            self.writer = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *_):
+        self.close()
@@ -1,12 +1,14 @@
 # pyright: basic
 from constants import get_datacenters, get_servers
 
+datacenters = get_datacenters()
+servers = get_servers()
+dc_map = {dc.datacenter_id: dc for dc in datacenters}
+sg_map = {sg.server_generation: sg for sg in servers}
 for ts in range(1, 169):
-    dc_map = {dc.datacenter_id: dc for dc in get_datacenters()}
-    sg_map = {sg.server_generation: sg for sg in get_servers()}
     print(ts, ":", end=" ")
-    for dc in get_datacenters():
-        for server in get_servers():
+    for dc in datacenters:
+        for server in servers:
             capacity = (
                 dc_map[dc.datacenter_id].slots_capacity
                 // sg_map[server.server_generation].slots_size
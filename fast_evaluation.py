@@ -0,0 +1,511 @@
+import numpy as np
+import pandas as pd
+from dataclasses import dataclass
+
+from cohorts import cohort_data_preparation, cohorts_to_batches, is_cohort_fleet
+from evaluation import (
+    change_elasticity_format,
+    change_selling_prices_format,
+    fleet_data_preparation,
+    get_actual_demand_array,
+    get_demand_array,
+    get_failure_rates,
+    get_index,
+    get_known,
+    get_logger,
+    get_price_arrays,
+    get_trace_record,
+    get_valid_columns,
+    pricing_data_preparation,
+    profiled,
+    update_demand_array_according_to_prices,
+)
+from problem_data import get_datacenter_arrays, get_frame_cost_tables, get_server_arrays
+from utils import arrays_to_frame
+
+
+# ARRAY-BACKED EVALUATION ENGINE
+#
+# THE SOLUTION IS COMPILED ONCE INTO PER-SERVER ARRAYS (GENERATION, BUY STEP,
+# LAST ALIVE STEP) AND PER-SEGMENT ARRAYS (A SEGMENT IS A RUN OF TIME-STEPS
+# THAT A SERVER SPENDS IN ONE DATACENTER). A SOLUTION IN COHORT FORM (SEE
+# cohorts.py) IS COMPILED INTO BATCHES OF IDENTICAL SERVERS INSTEAD, EACH
+# WEIGHTED BY ITS NUMBER OF SERVERS. EVERY PER-STEP QUANTITY OF THE
+# OBJECTIVE IS THEN OBTAINED WITH DIFFERENCE ARRAYS, CUMULATIVE SUMS AND
+# BINCOUNTS INSTEAD OF UPDATING A FLEET DATAFRAME 168 TIMES.
+#
+# THE RANDOM NUMBER GENERATOR IS CONSUMED IN THE SAME ORDER AS IN
+# evaluation.get_evaluation, SO BOTH ENGINES GIVE THE SAME OBJECTIVE FOR A
+# GIVEN SEED.
+
+
+@dataclass
+class CompiledFleet:
+    # PER SERVER (OR BATCH OF count SERVERS)
+    generation: np.ndarray
+    buy: np.ndarray
+    end: np.ndarray
+    count: np.ndarray
+    # PER DATACENTER SEGMENT, SORTED BY SERVER AND START
+    segment_server: np.ndarray
+    segment_generation: np.ndarray
+    segment_datacenter: np.ndarray
+    segment_start: np.ndarray
+    segment_end: np.ndarray
+    # PER MOVE THAT IS CHARGED
+    move_generation: np.ndarray
+    move_step: np.ndarray
+    move_count: np.ndarray
+    time_steps: int
+
+    @property
+    def segment_count(self):
+        return self.count[self.segment_server]
+
+
+@dataclass
+class StepArrays:
+    # count[t, g, d] = SERVERS OF GENERATION g IN DATACENTER d AT TIME-STEP t
+    count: np.ndarray
+    capacity: np.ndarray
+    slots: np.ndarray
+    energy_cost: np.ndarray
+    maintenance_cost: np.ndarray
+    purchase_cost: np.ndarray
+    moving_cost: np.ndarray
+    # SUM OF THE LIFESPANS OF THE SERVERS OVER THEIR LIFE EXPECTANCY
+    lifespan: np.ndarray
+
+    @property
+    def cost(self):
+        return (self.energy_cost
+                + self.maintenance_cost
+                + self.purchase_cost
+                + self.moving_cost)
+
+
+def get_fleet_columns(fleet):
+    # THE COLUMNS OF A FLEET DATAFRAME THAT compile_fleet NEEDS, AS ARRAYS:
+    # time_step, server_id AS CODES (-1 FOR MISSING IDS), AND action,
+    # server_generation AND datacenter_id AS POSITIONS IN get_known (-1 FOR
+    # UNKNOWN NAMES)
+    columns = {'time_step': fleet['time_step'].to_numpy(),
+               'server_id': pd.factorize(fleet['server_id'])[0]}
+    for column, key in [('action', 'actions'),
+                        ('server_generation', 'server_generation'),
+                        ('datacenter_id', 'datacenter_id')]:
+        index = fleet[column].map(get_index(key))
+        columns[column] = index.fillna(-1).to_numpy(dtype=np.int64)
+    return columns
+
+
+def get_solution_array_columns(arrays):
+    # THE SAME COLUMNS AS get_fleet_columns, READ FROM THE MEMORY-MAPPED
+    # ARRAYS OF utils.open_solution_arrays WITHOUT BUILDING A DATAFRAME. THE
+    # CATEGORY CODES OF THE TEXT COLUMNS ARE TRANSLATED THROUGH A LOOKUP
+    # TABLE OF THEIR FEW CATEGORIES
+    if not set(get_known('required_columns')) <= set(arrays['fleet/columns'].tolist()):
+        raise(ValueError('Please check the solution format.'))
+    columns = {'time_step': np.asarray(arrays['fleet/time_step']),
+               'server_id': np.asarray(arrays['fleet/server_id'])}
+    for column, key in [('action', 'actions'),
+                        ('server_generation', 'server_generation'),
+                        ('datacenter_id', 'datacenter_id')]:
+        codes = np.asarray(arrays[f'fleet/{column}'])
+        categories = arrays.get(f'fleet/{column}/categories')
+        if categories is None:
+            # A COLUMN WITHOUT TEXT HAS NO KNOWN NAMES
+            columns[column] = np.full(codes.shape, -1)
+            continue
+        index = get_index(key)
+        lookup = np.array([index.get(c, -1) for c in categories.tolist()] + [-1])
+        columns[column] = lookup[codes]
+    return columns
+
+
+def is_solution_arrays(fleet):
+    # THE ARRAYS OF utils.open_solution_arrays ARE A dict, A FLEET OTHERWISE
+    # IS A DATAFRAME
+    return isinstance(fleet, dict)
+
+
+@profiled
+def fleet_arrays_preparation(arrays, servers):
+    # evaluation.fleet_data_preparation FOR THE ARRAYS OF
+    # utils.open_solution_arrays: THE ROWS THAT BREAK THE RULES OF
+    # evaluation.get_fleet_violations ARE DROPPED AND COUNTED PER RULE.
+    # RETURNS THE COLUMNS OF THE VALID ROWS (SEE get_fleet_columns) AND THE
+    # NUMBER OF DROPPED ROWS PER RULE
+    columns = get_solution_array_columns(arrays)
+    action = columns['action']
+    generation = columns['server_generation']
+    time_step = columns['time_step']
+    buy = get_index('actions')['buy']
+    rules = {}
+    rules['bad_action'] = action < 0
+    if not (action[(time_step == 1) & ~rules['bad_action']] == buy).all():
+        raise(ValueError('At time-step 1 it is only possible to use the "buy" action.'))
+    rules['unknown_datacenter'] = columns['datacenter_id'] < 0
+    rules['unknown_generation'] = generation < 0
+    s = get_server_arrays(servers)
+    start = s['release_start'][generation]
+    end = s['release_end'][generation]
+    rules['out_of_window_buy'] = (action == buy) & ~((time_step >= start) & (time_step <= end))
+    dropped = np.zeros(time_step.size, dtype=bool)
+    for rule in get_known('fleet_violations')[:-2]:
+        rules[rule] &= ~dropped
+        dropped |= rules[rule]
+    # LATER BUYS OF AN ID THAT IS ALREADY IN THE KEPT ROWS
+    kept = np.flatnonzero(~dropped)
+    _, first = np.unique(columns['server_id'][kept], return_index=True)
+    duplicate = np.ones(kept.size, dtype=bool)
+    duplicate[first] = False
+    rules['duplicate_id'] = np.zeros(time_step.size, dtype=bool)
+    rules['duplicate_id'][kept] = duplicate & (action[kept] == buy)
+    dropped |= rules['duplicate_id']
+    # THE MOVES AND DISMISSALS OF THE SERVERS WHOSE BUY HAS BEEN DROPPED
+    # (UNLESS ANOTHER BUY OF THE SAME ID IS KEPT)
+    server_id = columns['server_id']
+    is_buy = action == buy
+    lost = np.setdiff1d(server_id[is_buy & dropped], server_id[is_buy & ~dropped])
+    rules['orphan_action'] = ~dropped & ~is_buy & np.isin(server_id, lost)
+    dropped |= rules['orphan_action']
+    summary = {rule: int(rules[rule].sum()) for rule in get_known('fleet_violations')}
+    if any(summary.values()):
+        get_logger().warning(f'Dropped fleet rows: {summary}')
+    return {c: a[~dropped] for c, a in columns.items()}, summary
+
+
+@profiled
+def compile_fleet(fleet, servers, time_steps=get_known('time_steps')):
+    # TURN A PREPARED FLEET (SEE evaluation.fleet_data_preparation, OR THE
+    # COLUMNS OF fleet_arrays_preparation) INTO ARRAYS. THE ACTIONS ARE
+    # INTERPRETED AS IN evaluation.update_fleet: THE FIRST NON-EMPTY
+    # TIME-STEP INITIALISES THE FLEET, "hold" DOES NOTHING AND A "move" OR
+    # "dismiss" OF A SERVER THAT IS NOT IN THE FLEET IS AN ERROR.
+    life_expectancy = get_server_arrays(servers)['life_expectancy']
+    actions = get_index('actions')
+    if not is_solution_arrays(fleet):
+        fleet = get_fleet_columns(fleet)
+
+    # THE ROWS IN THE HORIZON, THE FIRST ONE OF EVERY (time_step, server_id),
+    # IN THE ORDER OF THE TIME-STEPS
+    ts = fleet['time_step']
+    rows = np.flatnonzero((ts >= 1) & (ts <= time_steps))
+    pairs = np.stack([ts[rows], fleet['server_id'][rows]])
+    _, first = np.unique(pairs, axis=1, return_index=True)
+    rows = rows[np.sort(first)]
+    rows = rows[np.argsort(ts[rows], kind='stable')]
+    ts = ts[rows]
+    action = fleet['action'][rows]
+    generation = fleet['server_generation'][rows]
+    datacenter = fleet['datacenter_id'][rows]
+    server_id = fleet['server_id'][rows]
+
+    if ts.size == 0:
+        empty = np.zeros(0, dtype=int)
+        return CompiledFleet(empty, empty, empty, empty, empty, empty, empty,
+                             empty, empty, empty, empty, empty, empty, time_steps)
+
+    # BUY
+    is_buy = (action == actions['buy']) | (ts == ts[0])
+    if np.unique(server_id[is_buy]).size < is_buy.sum():
+        raise(ValueError('A server has been bought more than once.'))
+    buy_id = server_id[is_buy]
+    buy_ts = ts[is_buy]
+    buy_generation = generation[is_buy]
+    buy_datacenter = datacenter[is_buy]
+    end = buy_ts + life_expectancy[buy_generation] - 1
+
+    # MAP THE OTHER ACTIONS TO THE SERVERS THEY REFER TO
+    order = np.argsort(buy_id, kind='stable')
+    other = ~is_buy & (action != actions['hold'])
+    o_ts = ts[other]
+    o_action = action[other]
+    o_datacenter = datacenter[other]
+    o_id = server_id[other]
+    position = np.minimum(np.searchsorted(buy_id[order], o_id), buy_id.size - 1)
+    o_server = np.where(buy_id[order][position] == o_id, order[position], -1)
+    if (o_server < 0).any():
+        raise(KeyError('Moving or dismissing a server that has not been bought.'))
+    # A SERVER IS STILL IN THE FLEET WHEN ITS ACTIONS ARE APPLIED AT THE
+    # TIME-STEP AFTER ITS LAST ALIVE TIME-STEP
+    if ((o_ts <= buy_ts[o_server]) | (o_ts > end[o_server] + 1)).any():
+        raise(KeyError('Moving or dismissing a server that is not in the fleet.'))
+
+    # DISMISS
+    is_dismiss = o_action == actions['dismiss']
+    d_server = o_server[is_dismiss]
+    if np.unique(d_server).size < d_server.size:
+        raise(KeyError('Dismissing a server that is not in the fleet.'))
+    dismiss_ts = np.full(buy_id.size, time_steps + 1)
+    dismiss_ts[d_server] = o_ts[is_dismiss]
+    if (o_ts > dismiss_ts[o_server]).any():
+        raise(KeyError('Moving or dismissing a server that is not in the fleet.'))
+    end = np.minimum(end, dismiss_ts - 1)
+    end = np.minimum(end, time_steps)
+
+    # MOVE
+    is_move = (o_action == actions['move']) & (o_ts < dismiss_ts[o_server])
+    m_server = o_server[is_move]
+    m_ts = o_ts[is_move]
+    charged = m_ts <= end[m_server]
+
+    # SEGMENTS: ONE STARTING AT THE BUY AND ONE STARTING AT EACH MOVE
+    seg_server = np.concatenate([np.arange(buy_id.size), m_server])
+    seg_start = np.concatenate([buy_ts, m_ts])
+    seg_datacenter = np.concatenate([buy_datacenter, o_datacenter[is_move]])
+    order = np.lexsort((seg_start, seg_server))
+    seg_server = seg_server[order]
+    seg_start = seg_start[order]
+    seg_datacenter = seg_datacenter[order]
+    seg_end = end[seg_server].copy()
+    same = seg_server[1:] == seg_server[:-1]
+    seg_end[:-1][same] = seg_start[1:][same] - 1
+    keep = seg_start <= seg_end
+
+    return CompiledFleet(generation=buy_generation,
+                         buy=buy_ts,
+                         end=end,
+                         count=np.ones(buy_id.size, dtype=np.int64),
+                         segment_server=seg_server[keep],
+                         segment_generation=buy_generation[seg_server[keep]],
+                         segment_datacenter=seg_datacenter[keep],
+                         segment_start=seg_start[keep],
+                         segment_end=seg_end[keep],
+                         move_generation=buy_generation[m_server[charged]],
+                         move_step=m_ts[charged],
+                         move_count=np.ones(charged.sum(), dtype=np.int64),
+                         time_steps=time_steps)
+
+
+@profiled
+def compile_batches(batches, time_steps=get_known('time_steps')):
+    # TURN BATCHES OF IDENTICAL SERVERS (SEE cohorts.Batch) INTO ARRAYS. THE
+    # BATCHES PLAY THE ROLE OF THE SERVERS OF compile_fleet, WEIGHTED BY count
+    segments = [(i, b.generation) + s for i, b in enumerate(batches) for s in b.segments()]
+    moves = [(b.generation, ts, b.count) for b in batches for ts, _ in b.moves]
+    segments = np.array(segments, dtype=np.int64).reshape(-1, 5)
+    moves = np.array(moves, dtype=np.int64).reshape(-1, 3)
+    return CompiledFleet(generation=np.array([b.generation for b in batches], dtype=np.int64),
+                         buy=np.array([b.buy for b in batches], dtype=np.int64),
+                         end=np.array([b.end for b in batches], dtype=np.int64),
+                         count=np.array([b.count for b in batches], dtype=np.int64),
+                         segment_server=segments[:, 0],
+                         segment_generation=segments[:, 1],
+                         segment_start=segments[:, 2],
+                         segment_end=segments[:, 3],
+                         segment_datacenter=segments[:, 4],
+                         move_generation=moves[:, 0],
+                         move_step=moves[:, 1],
+                         move_count=moves[:, 2],
+                         time_steps=time_steps)
+
+
+@profiled
+def get_step_arrays(compiled, servers, datacenters):
+    # CALCULATE CAPACITY, SLOTS USAGE AND COSTS FOR ALL TIME-STEPS AT ONCE.
+    # ROW t OF EVERY ARRAY REFERS TO TIME-STEP t, ROW 0 IS UNUSED.
+    s = get_server_arrays(servers)
+    d = get_datacenter_arrays(datacenters)
+    costs = get_frame_cost_tables(servers, datacenters)
+    T = compiled.time_steps
+    G = len(get_known('server_generation'))
+    DC = len(get_known('datacenter_id'))
+    LS = len(get_known('latency_sensitivity'))
+
+    # NUMBER OF SERVERS BY TIME-STEP, GENERATION AND DATACENTER
+    diff = np.zeros((T + 2, G, DC), dtype=np.int64)
+    np.add.at(diff, (compiled.segment_start,
+                     compiled.segment_generation,
+                     compiled.segment_datacenter), compiled.segment_count)
+    np.add.at(diff, (compiled.segment_end + 1,
+                     compiled.segment_generation,
+                     compiled.segment_datacenter), -compiled.segment_count)
+    count = np.cumsum(diff, axis=0)[:T + 1]
+
+    # CAPACITY BY TIME-STEP, GENERATION AND LATENCY SENSITIVITY
+    by_sensitivity = np.zeros((DC, LS), dtype=np.int64)
+    by_sensitivity[np.arange(DC), d['latency_sensitivity']] = 1
+    capacity = (count * s['capacity'][None, :, None]) @ by_sensitivity
+
+    # SLOTS USAGE BY TIME-STEP AND DATACENTER
+    slots = np.einsum('tgd,g->td', count, s['slots_size'])
+
+    # ENERGY COST
+    energy_cost = np.einsum('tgd,gd->t', count, costs.energy)
+
+    # MAINTENANCE COST: alive[g, b, t] IS THE NUMBER OF SERVERS OF
+    # GENERATION g BOUGHT AT b THAT ARE STILL IN THE FLEET AT t
+    ends = np.zeros((G, T + 1, T + 1), dtype=np.int64)
+    np.add.at(ends, (compiled.generation, compiled.buy, compiled.end), compiled.count)
+    alive = np.flip(np.cumsum(np.flip(ends, axis=2), axis=2), axis=2)
+    steps = np.arange(T + 1)
+    age = steps[None, :] - steps[:, None] + 1
+    age = np.clip(age, 0, costs.maintenance.shape[1] - 1)
+    maintenance_cost = np.einsum('gbt,gbt->t', alive, costs.maintenance[:, age])
+    lifespan = np.einsum('gbt,bt,g->t', alive, age, 1 / s['life_expectancy'])
+
+    # PURCHASE AND MOVING COST
+    purchase_cost = np.bincount(compiled.buy,
+                                weights=costs.purchase_price[compiled.generation] * compiled.count,
+                                minlength=T + 1)[:T + 1]
+    moving_cost = np.bincount(compiled.move_step,
+                              weights=costs.cost_of_moving[compiled.move_generation] * compiled.move_count,
+                              minlength=T + 1)[:T + 1]
+
+    return StepArrays(count=count,
+                      capacity=capacity,
+                      slots=slots,
+                      energy_cost=energy_cost,
+                      maintenance_cost=maintenance_cost,
+                      purchase_cost=purchase_cost,
+                      moving_cost=moving_cost,
+                      lifespan=lifespan)
+
+
+def get_failure_order(present):
+    # THE ORDER IN WHICH evaluation.get_capacity_by_server_generation_latency_sensitivity
+    # DRAWS THE FAILURE RATES: COLUMN BY COLUMN, IN THE ORDER OF
+    # get_valid_columns, SKIPPING THE EMPTY CELLS
+    known = get_known('latency_sensitivity')
+    cols = sorted(known[j] for j in range(len(known)) if present[:, j].any())
+    cols = get_valid_columns(cols, known)
+    cells = []
+    for col in cols:
+        j = known.index(col)
+        cells.extend((g, j) for g in np.flatnonzero(present[:, j]))
+    return cells
+
+
+@profiled
+def get_failure_adjusted_capacity(capacity, failure_rates=None):
+    # ADJUST THE CAPACITY AT EVERY TIME-STEP BY A FAILURE RATE f PER CELL.
+    # THE FAILURE RATES ARE DRAWN FROM THE RANDOM NUMBER GENERATOR, OR TAKEN
+    # IN ORDER FROM failure_rates (SEE scenario.Scenario)
+    Z = np.zeros_like(capacity)
+    drawn = 0
+    for ts in range(1, capacity.shape[0]):
+        cells = get_failure_order(capacity[ts] > 0)
+        if not cells:
+            continue
+        g, j = np.array(cells).T
+        if failure_rates is None:
+            f = get_failure_rates(len(cells))
+        else:
+            f = failure_rates[drawn:drawn + len(cells)]
+            drawn += len(cells)
+        Z[ts, g, j] = (capacity[ts, g, j] * (1 - f)).astype(int)
+    return Z
+
+
+def get_utilization_array(D, Z):
+    # VECTORISED evaluation.get_utilization FOR ALL TIME-STEPS AT ONCE
+    served = (Z > 0) & (D >= 0)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        u = np.where(served, np.minimum(Z, D) / Z, 0).sum(axis=(1, 2))
+    n = served.sum(axis=(1, 2))
+    return np.divide(u, n, out=np.zeros_like(u), where=n > 0)
+
+
+def get_array_evaluation(fleet,
+                         pricing_strategy,
+                         demand,
+                         datacenters,
+                         servers,
+                         selling_prices,
+                         elasticity,
+                         time_steps=get_known('time_steps'),
+                         verbose=1,
+                         scenario=None,
+                         trace=None,
+                         violations=None):
+
+    # SOLUTION EVALUATION WITH THE ARRAY-BACKED ENGINE. WITH A scenario THE
+    # ACTUAL DEMAND AND THE FAILURE RATES ARE TAKEN FROM IT INSTEAD OF BEING
+    # DRAWN FROM THE RANDOM NUMBER GENERATOR. trace AND violations ARE
+    # CALLED AS IN evaluation.get_evaluation
+
+    # THE fleet AND pricing_strategy CAN BE THE MEMORY-MAPPED ARRAYS OF
+    # utils.open_solution_arrays, A SERVER FLEET IS THEN READ STRAIGHT FROM
+    # THE ARRAYS
+    if is_solution_arrays(pricing_strategy):
+        pricing_strategy = arrays_to_frame(pricing_strategy, 'pricing_strategy')
+    if is_solution_arrays(fleet) and 'server_id' not in fleet['fleet/columns']:
+        fleet = arrays_to_frame(fleet, 'fleet')
+
+    # SOLUTION DATA PREPARATION
+    if is_solution_arrays(fleet):
+        fleet, summary = fleet_arrays_preparation(fleet, servers)
+        if violations is not None:
+            violations(summary)
+        compiled = compile_fleet(fleet, servers, time_steps)
+    elif is_cohort_fleet(fleet):
+        fleet = cohort_data_preparation(fleet, servers, violations)
+        compiled = compile_batches(cohorts_to_batches(fleet, servers, time_steps), time_steps)
+    else:
+        fleet = fleet_data_preparation(fleet,
+                                       servers,
+                                       datacenters,
+                                       selling_prices,
+                                       violations)
+        compiled = compile_fleet(fleet, servers, time_steps)
+
+    # PRICING STRATEGY DATA PREPARATION
+    pricing_strategy = pricing_data_preparation(pricing_strategy)
+    elasticity = change_elasticity_format(elasticity)
+    selling_prices = change_selling_prices_format(selling_prices)
+    prices, base_prices = get_price_arrays(pricing_strategy, selling_prices, time_steps)
+
+    # DEMAND DATA PREPARATION
+    if scenario is None:
+        D = get_demand_array(get_actual_demand_array(demand), time_steps)
+        failure_rates = None
+    else:
+        D = scenario.get_demand(time_steps)
+        failure_rates = scenario.failure_rates
+    D = update_demand_array_according_to_prices(D, prices, base_prices, elasticity)
+
+    # CAPACITY, CONSTRAINTS AND COSTS
+    steps = get_step_arrays(compiled, servers, datacenters)
+    active = steps.count.sum(axis=(1, 2)) > 0
+    slots_capacity = get_datacenter_arrays(datacenters)['slots_capacity']
+    if (steps.slots[active] > slots_capacity[None, :]).any():
+        raise(ValueError('Constraint 2 has been violated.'))
+    Z = get_failure_adjusted_capacity(steps.capacity, failure_rates)
+
+    # PROFIT
+    R = (np.minimum(Z, D) * prices).sum(axis=(1, 2))
+    P = np.where(active, R - steps.cost, 0)
+    OBJECTIVE = P.sum()
+
+    if trace is not None:
+        O = np.cumsum(P)
+        U = get_utilization_array(D, Z)
+        n = steps.count.sum(axis=(1, 2))
+        L = np.divide(steps.lifespan, n, out=np.zeros_like(steps.lifespan), where=n > 0)
+        for ts in np.flatnonzero(active):
+            costs = {'energy_cost': steps.energy_cost[ts],
+                     'maintenance_cost': steps.maintenance_cost[ts],
+                     'purchase_cost': steps.purchase_cost[ts],
+                     'moving_cost': steps.moving_cost[ts]}
+            trace(get_trace_record(int(ts), D[ts], Z[ts], prices[ts], costs,
+                                   steps.slots[ts], U[ts], L[ts], P[ts], O[ts]))
+
+    if verbose:
+        O = np.cumsum(P)
+        with_actions = np.isin(np.arange(time_steps + 1), np.asarray(fleet['time_step']))
+        for ts in range(1, time_steps + 1):
+            if active[ts]:
+                output = {'time-step': ts,
+                          'O': round(O[ts], 2),
+                          'P': round(P[ts], 2)}
+            elif with_actions[ts] or active[ts - 1]:
+                output = {'time-step': ts,
+                          'O': np.nan,
+                          'P': np.nan}
+            else:
+                continue
+            print(output)
+
+    return OBJECTIVE
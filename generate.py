@@ -1,4 +1,8 @@
-from solver.models import Action, PriceEntry, Server, ServerGeneration, SolutionEntry
+import pandas as pd
+
+from cohorts import expand_cohorts
+from evaluation import get_known
+from solver.models import PriceEntry, Server, SolutionEntry
 
 
 def generate_pricing(prices: list[PriceEntry]):
@@ -15,60 +19,31 @@ def generate_pricing(prices: list[PriceEntry]):
     return pmap
 
 
+def generate_cohorts(entries: list[SolutionEntry]) -> pd.DataFrame:
+    """The solution in the compact cohort form of `cohorts`."""
+    return pd.DataFrame(
+        [
+            {
+                "time_step": entry.timestep,
+                "datacenter_id": entry.datacenter_id,
+                "server_generation": entry.server_generation.value,
+                "action": entry.action.value,
+                "count": entry.amount,
+                "from_datacenter_id": entry.from_datacenter_id,
+                "bought_time_step": entry.bought_timestep,
+            }
+            for entry in entries
+            if entry.amount > 0
+        ],
+        columns=get_known("cohort_columns")
+        + ["from_datacenter_id", "bought_time_step"],
+    )
+
+
 def generate_solution(
     entries: list[SolutionEntry], servers: list[Server]
 ) -> list[dict[str, str | int]]:
-    server_map = {server.server_generation: server for server in servers}
-    solution: list[dict[str, str | int]] = []
-    # datacenter_id -> server_generation -> list[server id]
-    ids: dict[str, dict[ServerGeneration, list[dict[str, int]]]] = {}
-    counter = 0
-    for entry in entries:
-        if entry.action == Action.BUY:
-            if ids.get(entry.datacenter_id) is None:
-                ids[entry.datacenter_id] = {entry.server_generation: []}
-            if ids[entry.datacenter_id].get(entry.server_generation) is None:
-                ids[entry.datacenter_id][entry.server_generation] = []
-            for _ in range(entry.amount):
-                ids[entry.datacenter_id][entry.server_generation].append(
-                    {
-                        "id": counter,
-                        "expires_at": entry.timestep
-                        + server_map[entry.server_generation].life_expectancy
-                        - 1,
-                    }
-                )
-                solution.append(
-                    {
-                        "time_step": entry.timestep,
-                        "datacenter_id": entry.datacenter_id,
-                        "server_id": counter,
-                        "server_generation": entry.server_generation.value,
-                        "action": "buy",
-                    }
-                )
-                counter += 1
-        elif entry.action == Action.DISMISS:
-
-            for _ in range(entry.amount):
-                if len(ids[entry.datacenter_id][entry.server_generation]) == 0:
-                    continue
-                server_id = ids[entry.datacenter_id][entry.server_generation].pop(0)
-                solution.append(
-                    {
-                        "time_step": entry.timestep,
-                        "datacenter_id": entry.datacenter_id,
-                        "server_id": server_id["id"],
-                        "server_generation": entry.server_generation.value,
-                        "action": "dismiss",
-                    }
-                )
-            # Pop until we have no more expired servers
-            while (
-                len(ids[entry.datacenter_id][entry.server_generation]) > 0
-                and ids[entry.datacenter_id][entry.server_generation][0]["expires_at"]
-                <= entry.timestep
-            ):
-                _ = ids[entry.datacenter_id][entry.server_generation].pop(0)
-
-    return solution
+    # Dismissals and moves take the servers bought at the time-step of the
+    # entry, or the oldest and youngest servers still alive, see `cohorts`
+    fleet = expand_cohorts(generate_cohorts(entries), servers)
+    return fleet.to_dict("records")  # pyright: ignore[reportReturnType]
@@ -1,39 +1,15 @@
 # pyright: reportUnknownMemberType=false, reportUnusedCallResult=false
-import matplotlib.pyplot as plt
 import numpy as np
-from scipy.stats import truncweibull_min  # type: ignore[import]
 
 import constants
+from costs import get_cost_tables
+from evaluation import get_failure_rates
 from solver import models
 from utils import demand_to_map, sp_to_map
 
 
 def weibullshit(capacity: int):
-    return int(
-        capacity
-        * (
-            1
-            - float(
-                truncweibull_min.rvs(0.3, 0.05, 0.1, size=1).item()  # type: ignore[reportUnknownArgumentType]
-            )
-        )
-    )
-
-
-def get_maintenance_cost(
-    average_maint_cost: int, operating_time: int, life_expectancy: int
-) -> float:
-    return float(
-        average_maint_cost  # type: ignore[reportAny]
-        * (
-            1
-            + (
-                ((1.5) * (operating_time))
-                / life_expectancy
-                * np.log2(((1.5) * (operating_time)) / life_expectancy)
-            )
-        )
-    )
+    return int(capacity * (1 - float(get_failure_rates(1).item())))
 
 
 class Solver:
@@ -78,6 +54,9 @@ class Solver:
         else:
             self.selling_prices = selling_prices
         self.plot_generation = plot_generation
+        self.costs = get_cost_tables(
+            list(self.server_map.values()), list(self.datacenter_map.values())
+        )
 
     def get_demand(
         self, ts: int, generation: models.ServerGeneration, sen: models.Sensitivity
@@ -111,6 +90,7 @@ class Solver:
                 sg: {sen: 0 for sen in models.Sensitivity}
                 for sg in models.ServerGeneration
             }
+            cumulative_maintenance = self.costs.cumulative_maintenance
             for sen in models.Sensitivity:
                 # Calculate the expected profit of a single server of this type
                 # Find the total capacity for this sensitivity
@@ -122,20 +102,14 @@ class Solver:
                     )
                     for dc in self.datacenter_map
                 )
-                for sg in models.ServerGeneration:
+                for g, sg in enumerate(models.ServerGeneration):
                     revenue = weibullshit(self.selling_prices[sg][sen])
                     energy_consumption = self.server_map[sg].energy_consumption
-                    buying_cost = self.server_map[sg].purchase_price
-                    maintenance_cost = sum(
-                        get_maintenance_cost(
-                            self.server_map[sg].average_maintenance_fee,
-                            ts2,
-                            self.server_map[sg].life_expectancy,
-                        )
-                        for ts2 in range(
-                            1, min(168 - ts, self.server_map[sg].life_expectancy)
-                        )
-                    )
+                    buying_cost = self.costs.purchase_price[g]
+                    # Maintenance over ages 1 .. min(168 - ts, life_expectancy) - 1
+                    maintenance_cost = cumulative_maintenance[
+                        g, max(min(168 - ts, self.server_map[sg].life_expectancy) - 1, 0)
+                    ]
                     ranking.append(
                         (
                             sg,
@@ -199,6 +173,8 @@ class Solver:
 
 
 if __name__ == "__main__":
+    import matplotlib.pyplot as plt
+
     models.scale = 1
 
     seed = 123
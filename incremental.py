@@ -0,0 +1,269 @@
+"""
+Incremental evaluation of a solution for local-search solvers.
+
+The solution is held as batches of identical servers and the evaluator keeps
+the per-time-step state of the objective (server counts, capacity, slot
+usage, revenue and costs). An edit only recomputes the time-steps that the
+changed batches are alive and the (generation, latency sensitivity) cells
+they serve.
+
+The failure rate of every (time-step, generation, latency sensitivity) cell
+is pinned when the evaluator is built: the cells present in the initial
+solution get the rates that `evaluation_function` would draw, so the initial
+score matches it exactly, and the other cells get the unused rates of the
+scenario. After edits the score is exact up to cells appearing or
+disappearing, which shifts the draws of the sequential evaluator.
+"""
+
+from dataclasses import replace
+
+import numpy as np
+import pandas as pd
+
+from cohorts import Batch, cohort_data_preparation, cohorts_to_batches, is_cohort_fleet
+from evaluation import (
+    change_elasticity_format,
+    change_selling_prices_format,
+    fleet_data_preparation,
+    get_known,
+    get_price_arrays,
+    pricing_data_preparation,
+    update_demand_array_according_to_prices,
+)
+from fast_evaluation import compile_fleet, get_failure_order
+from problem_data import get_datacenter_arrays, get_frame_cost_tables, get_server_arrays
+from scenario import CACHE_DIR, Scenario, get_scenario
+
+
+def pin_failure_rates(present: np.ndarray, failure_rates: np.ndarray) -> np.ndarray:
+    """
+    Assigns the failure rates of a scenario to the cells of `present`
+    [time_step, generation, sensitivity] in the order the evaluator draws them,
+    then hands the remaining rates to the other cells.
+    """
+    f = np.full(present.shape, np.nan)
+    drawn = 0
+    for ts in range(1, present.shape[0]):
+        cells = get_failure_order(present[ts])
+        if cells:
+            g, j = np.array(cells).T
+            f[ts, g, j] = failure_rates[drawn : drawn + len(cells)]
+            drawn += len(cells)
+    missing = np.isnan(f[1:])
+    f[1:][missing] = failure_rates[drawn : drawn + missing.sum()]
+    f[0] = 0
+    return f
+
+
+def batches_from_fleet(
+    fleet: pd.DataFrame, servers: pd.DataFrame, time_steps: int
+) -> list[Batch]:
+    """Groups the servers of a prepared fleet into batches."""
+    c = compile_fleet(fleet, servers, time_steps)
+    first = np.ones(c.segment_server.size, dtype=bool)
+    first[1:] = c.segment_server[1:] != c.segment_server[:-1]
+    datacenter = c.segment_datacenter[first]
+    moved = np.bincount(c.segment_server, minlength=c.buy.size) > 1
+
+    keys = np.stack([c.generation, datacenter, c.buy, c.end])
+    unique, counts = np.unique(keys[:, ~moved], axis=1, return_counts=True)
+    batches = [Batch(*map(int, k), count=int(n)) for k, n in zip(unique.T, counts)]
+
+    with_moves: dict[Batch, int] = {}
+    for i in np.flatnonzero(moved):
+        segments = c.segment_server == i
+        moves = tuple(
+            zip(
+                c.segment_start[segments][1:].tolist(),
+                c.segment_datacenter[segments][1:].tolist(),
+            )
+        )
+        b = Batch(*map(int, keys[:, i]), count=0, moves=moves)
+        with_moves[b] = with_moves.get(b, 0) + 1
+    batches += [replace(b, count=n) for b, n in with_moves.items()]
+    return batches
+
+
+class IncrementalEvaluator:
+    def __init__(
+        self,
+        batches: list[Batch],
+        demand: np.ndarray,
+        prices: np.ndarray,
+        failure_rates: np.ndarray,
+        servers: pd.DataFrame,
+        datacenters: pd.DataFrame,
+    ):
+        """
+        `demand` and `prices` are indexed by [time_step, generation,
+        sensitivity] with row 0 unused, and `demand` already reflects the
+        prices. `failure_rates` is either pinned per cell with the same shape
+        or a sequence in draw order (see `scenario.Scenario`), which is pinned
+        against the initial batches.
+        """
+        self.time_steps = demand.shape[0] - 1
+        self.demand = demand
+        self.prices = prices
+        s = get_server_arrays(servers)
+        d = get_datacenter_arrays(datacenters)
+        self.costs = get_frame_cost_tables(servers, datacenters)
+        self.capacity_per_server = s["capacity"]
+        self.slots_size = s["slots_size"]
+        self.life_expectancy = s["life_expectancy"]
+        self.slots_capacity = d["slots_capacity"]
+        self.sensitivity = d["latency_sensitivity"]
+
+        T = self.time_steps + 1
+        G, DC = self.costs.energy.shape
+        S = demand.shape[2]
+        self.count = np.zeros((T, G, DC), dtype=np.int64)
+        self.capacity = np.zeros((T, G, S), dtype=np.int64)
+        self.slots = np.zeros((T, DC), dtype=np.int64)
+        self.energy_cost = np.zeros(T)
+        self.maintenance_cost = np.zeros(T)
+        self.purchase_cost = np.zeros(T)
+        self.moving_cost = np.zeros(T)
+        self.revenue = np.zeros((T, G, S))
+
+        self.batches: dict[int, Batch] = {}
+        self.next_id = 0
+        for b in batches:
+            self._add(self.next_id, b, refresh=False)
+            self.next_id += 1
+
+        if failure_rates.ndim == 1:
+            failure_rates = pin_failure_rates(self.capacity > 0, failure_rates)
+        self.failure_rates = failure_rates
+        self._refresh_revenue(1, self.time_steps, slice(None), slice(None))
+
+    @classmethod
+    def from_solution(
+        cls,
+        fleet: pd.DataFrame,
+        pricing_strategy: pd.DataFrame,
+        demand: pd.DataFrame,
+        datacenters: pd.DataFrame,
+        servers: pd.DataFrame,
+        selling_prices: pd.DataFrame,
+        elasticity: pd.DataFrame,
+        seed: int | None = None,
+        scenario: Scenario | None = None,
+        time_steps: int = get_known("time_steps"),
+    ) -> "IncrementalEvaluator":
+        """Builds the evaluator from the same inputs as `evaluation_function`."""
+        if scenario is None:
+            cache_dir = None if seed is None else CACHE_DIR
+            scenario = get_scenario(
+                seed, demand, time_steps, cache_dir
+            )  # pyright: ignore[reportArgumentType]
+        if is_cohort_fleet(fleet):
+            fleet = cohort_data_preparation(fleet, servers)
+            batches = cohorts_to_batches(fleet, servers, time_steps)
+        else:
+            fleet = fleet_data_preparation(fleet, servers, datacenters, selling_prices)
+            batches = batches_from_fleet(fleet, servers, time_steps)
+        pricing_strategy = pricing_data_preparation(pricing_strategy)
+        elasticity = change_elasticity_format(elasticity)
+        selling_prices = change_selling_prices_format(selling_prices)
+        prices, base_prices = get_price_arrays(
+            pricing_strategy, selling_prices, time_steps
+        )
+        D = scenario.get_demand(time_steps)
+        D = update_demand_array_according_to_prices(D, prices, base_prices, elasticity)
+        return cls(
+            batches,
+            D,
+            prices,
+            scenario.failure_rates,
+            servers,
+            datacenters,
+        )
+
+    def score(self) -> float | None:
+        """The objective, or None if a datacenter runs out of slots."""
+        if not self.feasible():
+            return None
+        return float(
+            self.revenue.sum()
+            - self.energy_cost.sum()
+            - self.maintenance_cost.sum()
+            - self.purchase_cost.sum()
+            - self.moving_cost.sum()
+        )
+
+    def feasible(self) -> bool:
+        return bool((self.slots <= self.slots_capacity).all())
+
+    def apply_delta(self, edits: dict[int, Batch | None]) -> dict[int, Batch | None]:
+        """
+        Replaces the batch of every id in `edits`, removing it when the new
+        value is None and adding it when the id is unknown. Returns the edits
+        that undo this one.
+        """
+        undo: dict[int, Batch | None] = {}
+        for batch_id, batch in edits.items():
+            if batch is not None:
+                self.validate(batch)
+            old = self.batches.get(batch_id)
+            undo[batch_id] = old
+            if old is not None:
+                self._remove(batch_id)
+            if batch is not None:
+                self._add(batch_id, batch)
+                self.next_id = max(self.next_id, batch_id + 1)
+        return undo
+
+    def add(self, batch: Batch) -> int:
+        batch_id = self.next_id
+        self.apply_delta({batch_id: batch})
+        return batch_id
+
+    def validate(self, batch: Batch):
+        last = min(
+            self.time_steps, batch.buy + self.life_expectancy[batch.generation] - 1
+        )
+        if not 1 <= batch.buy <= batch.end <= last:
+            raise ValueError(f"Invalid buy or end time-step: {batch}")
+        steps = [ts for ts, _ in batch.moves]
+        if steps != sorted(set(steps)) or any(
+            not batch.buy < ts <= batch.end for ts in steps
+        ):
+            raise ValueError(f"Invalid move time-step: {batch}")
+        if batch.count < 0:
+            raise ValueError(f"Invalid count: {batch}")
+
+    def _add(self, batch_id: int, batch: Batch, refresh: bool = True):
+        self.batches[batch_id] = batch
+        self._update(batch, batch.count, refresh)
+
+    def _remove(self, batch_id: int):
+        batch = self.batches.pop(batch_id)
+        self._update(batch, -batch.count, True)
+
+    def _update(self, batch: Batch, n: int, refresh: bool):
+        g = batch.generation
+        for start, end, dc in batch.segments():
+            window = slice(start, end + 1)
+            s = self.sensitivity[dc]
+            self.count[window, g, dc] += n
+            self.capacity[window, g, s] += n * self.capacity_per_server[g]
+            self.slots[window, dc] += n * self.slots_size[g]
+            self.energy_cost[window] += n * self.costs.energy[g, dc]
+            if refresh:
+                self._refresh_revenue(start, end, g, s)
+        ages = np.arange(1, batch.end - batch.buy + 2)
+        self.maintenance_cost[batch.buy : batch.end + 1] += (
+            n * self.costs.maintenance[g, ages]
+        )
+        self.purchase_cost[batch.buy] += n * self.costs.purchase_price[g]
+        for ts, _ in batch.moves:
+            self.moving_cost[ts] += n * self.costs.cost_of_moving[g]
+
+    def _refresh_revenue(self, start: int, end: int, g, s):
+        window = slice(start, end + 1)
+        Z = (
+            self.capacity[window, g, s] * (1 - self.failure_rates[window, g, s])
+        ).astype(int)
+        self.revenue[window, g, s] = (
+            np.minimum(Z, self.demand[window, g, s]) * self.prices[window, g, s]
+        )
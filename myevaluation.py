@@ -1,36 +1,122 @@
 # pyright: basic
 
+import argparse
 import os
-import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from functools import lru_cache
+from multiprocessing import get_context
+
+import pandas as pd
 
 from evaluation import evaluation_function
+from scenario import get_scenario
 from utils import load_problem_data, load_solution
 
-thedir = sys.argv[1] if len(sys.argv) == 2 else "output"
-# List files in output directory
-solutions = [
-    f"./{thedir}/{f}" for f in os.listdir(thedir) if len(f) == 4 + len(".json")
-]
-solutions.sort(reverse=True)  # pyright: ignore[reportCallIssue]
-
-for f in solutions:
-    if not f:
-        continue
-    print(f"{f} - ", end="", flush=True)
-
-    seed = 0
-    fname = f.split("/")[-1]
-    seed = int(fname.split(".")[0])
-    fleet, pricing_strategy = load_solution(f)
-    demand, datacenters, servers, selling_prices, elasticity = load_problem_data()
-    score: int = evaluation_function(  # type: ignore[reportAssignmentType]
-        fleet,
-        pricing_strategy,
-        demand,
-        datacenters,
-        servers,
-        selling_prices,
-        elasticity,
+# Problem data of the worker process, set once by init_worker
+problem_data = None
+
+
+def init_worker(data):
+    global problem_data
+    problem_data = data
+
+
+@lru_cache(maxsize=None)
+def load_cached_solution(path, arrays=False):
+    return load_solution(path, arrays)
+
+
+@lru_cache(maxsize=None)
+def load_cached_scenario(seed):
+    return get_scenario(seed, problem_data[0])
+
+
+def score_solution(job):
+    path, seed, engine = job
+    # The array engine reads .npz solutions from their memory-mapped arrays
+    fleet, pricing_strategy = load_cached_solution(path, engine == "array")
+    start = time.perf_counter()
+    # The array engine takes the demand and failure rates of the seed from
+    # its cached scenario instead of drawing them again for every solution
+    scenario = load_cached_scenario(seed) if engine == "array" else None
+    score = evaluation_function(
+        fleet.copy(),
+        pricing_strategy.copy(),
+        *(d.copy() for d in problem_data),
         seed=seed,
+        engine=engine,
+        scenario=scenario,
     )
-    print(score)
+    return path, seed, score, time.perf_counter() - start
+
+
+def batch_evaluate(solutions, seeds=None, workers=None, engine="array"):
+    """
+    Scores every solution against every seed in a process pool and returns
+    one row per (solution, seed). When seeds is None each solution is only
+    scored against the seed in its file name.
+
+    The problem data is loaded once and handed to the workers. Workers are
+    forked so that they share the parent's string hashing, which decides the
+    order of the failure rate draws, so a score only depends on its seed.
+    """
+    if seeds is None:
+        jobs = [(f, seed_from_path(f), engine) for f in solutions]
+    else:
+        jobs = [(f, seed, engine) for f in solutions for seed in seeds]
+    data = load_problem_data()
+    if engine == "array":
+        # The scenarios are made (or loaded) in the parent, so the forked
+        # workers inherit them instead of racing to write the cache
+        init_worker(data)
+        for seed in sorted({seed for _, seed, _ in jobs}):
+            load_cached_scenario(seed)
+    with ProcessPoolExecutor(
+        workers,
+        mp_context=get_context("fork"),
+        initializer=init_worker,
+        initargs=(data,),
+    ) as pool:
+        rows = list(pool.map(score_solution, jobs))
+    return pd.DataFrame(rows, columns=["solution", "seed", "score", "wall_time"])
+
+
+def summarise(results):
+    return results.groupby("solution").agg(
+        mean=("score", "mean"),
+        std=("score", "std"),
+        failed=("score", lambda s: s.isna().sum()),
+        wall_time=("wall_time", "sum"),
+    )
+
+
+def seed_from_path(path):
+    return int(os.path.basename(path).split(".")[0])
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("dir", nargs="?", default="output")
+    parser.add_argument("--seeds", type=int, nargs="+")
+    parser.add_argument("--workers", type=int)
+    parser.add_argument("--engine", default="array", choices=["array", "dataframe"])
+    parser.add_argument("--out", help="csv file for the per-seed scores")
+    args = parser.parse_args()
+
+    # List files in output directory
+    solutions = [
+        f"./{args.dir}/{f}"
+        for f in os.listdir(args.dir)
+        if len(f) in (4 + len(".json"), 4 + len(".npz"))
+    ]
+    solutions.sort(reverse=True)
+
+    start = time.perf_counter()
+    results = batch_evaluate(solutions, args.seeds, args.workers, args.engine)
+    for row in results.itertuples():
+        print(f"{row.solution} - {row.seed} - {row.score}")
+    print(summarise(results).to_string())
+    print(f"Total wall time: {time.perf_counter() - start:.2f}s")
+    if args.out:
+        results.to_csv(args.out, index=False)
@@ -1,30 +1,65 @@
 # pyright: reportAssignmentType=false, reportUnknownMemberType=false
+import argparse
 import json
+import os
+import time
+from collections.abc import Callable, Iterator
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from multiprocessing import get_context
 
 import numpy as np
 import pandas as pd
 
-from constants import get_datacenters, get_elasticity, get_selling_prices, get_servers
-from evaluation import get_actual_demand  # type: ignore[import]
+from constants import (
+    get_datacenters,
+    get_demand,
+    get_elasticity,
+    get_selling_prices,
+    get_servers,
+)
 from generate import generate_pricing, generate_solution
 from solver.models import Demand, Sensitivity
-from solver.sat import create_supply_map, solve_supply
+from solver.sat import (
+    DISMISS_EVERY,
+    MOVE_EVERY,
+    create_supply_map,
+    get_problem,
+    get_supply_model,
+    solve_supply,
+)
+from utils import save_solution
 
 seeds: list[int] = [2381, 5351, 6047, 6829, 9221, 9859, 8053, 1097, 8677, 2521]
 
-known_solutions: set[str] = set()
+# Deadline of every slot of the pool of solve_seeds, shared with the forked
+# workers
+_deadlines = None
 
-count = 0
-for seed in seeds:
+
+class SlotDeadline:
+    """The deadline of a slot of solve_seeds, which moves as seeds finish."""
+
+    def __init__(self, slot: int):
+        self.slot = slot
+
+    def __call__(self) -> float:
+        return _deadlines[self.slot]
+
+
+def solve_seed(
+    seed: int,
+    deadline: float | Callable[[], float],
+    workers: int,
+    solution_format: str = "json",
+    dismiss_every: int = DISMISS_EVERY,
+    move_every: int = MOVE_EVERY,
+    rolling: bool = False,
+):
     # SET THE RANDOM SEED
     np.random.seed(seed)
 
     # GET THE DEMAND
-    parsed_demand: list[Demand] = []
-    for i, row in get_actual_demand(pd.read_csv("./data/demand.csv")).iterrows():  # type: ignore[reportUnknownVariableType, reportArgumentType]
-        parsed_demand.append(
-            Demand(row.time_step, row.server_generation, row.high, row.medium, row.low).setup()  # type: ignore[reportUnknownArgumentType]
-        )
+    parsed_demand: list[Demand] = get_demand()
     servers = get_servers()
     supply, solution, prices = solve_supply(
         parsed_demand,
@@ -32,6 +67,13 @@ for seed in seeds:
         get_selling_prices(),
         servers,
         get_elasticity(),
+        rolling=rolling,
+        # PER WINDOW WHEN ROLLING, THE WHOLE SOLVE IS BOUNDED BY THE DEADLINE
+        time_limit=10 if rolling else 60 * 30,
+        workers=workers,
+        deadline=deadline,
+        dismiss_every=dismiss_every,
+        move_every=move_every,
     )
     demand_map = create_supply_map()
     for d in parsed_demand:
@@ -41,13 +83,142 @@ for seed in seeds:
             )
     with open(f"output/{seed}_supply.json", "w") as f:
         json.dump(supply, f)
-    with open(f"output/{seed}.json", "w") as f:
-        json.dump(
-            {
-                "fleet": generate_solution(solution, servers),
-                "pricing_strategy": generate_pricing(prices),
-            },
-            f,
+    if solution_format == "npz":
+        # Binary columnar form of utils.save_solution_arrays
+        save_solution(
+            pd.DataFrame(generate_solution(solution, servers)),
+            pd.DataFrame(generate_pricing(prices)),
+            f"output/{seed}.npz",
         )
+    else:
+        with open(f"output/{seed}.json", "w") as f:
+            json.dump(
+                {
+                    "fleet": generate_solution(solution, servers),
+                    "pricing_strategy": generate_pricing(prices),
+                },
+                f,
+            )
     with open(f"output/{seed}_demand.json", "w") as f:
         json.dump(demand_map, f)
+    return seed
+
+
+def solve_seeds(
+    seeds: list[int],
+    budget: float,
+    cores: int,
+    concurrency: int | None = None,
+    solution_format: str = "json",
+    dismiss_every: int = DISMISS_EVERY,
+    move_every: int = MOVE_EVERY,
+    rolling: bool = False,
+) -> Iterator[tuple[int, Exception | None]]:
+    """
+    Solves the seeds in a process pool within `budget` seconds of wall-clock
+    time, yielding (seed, None) as soon as the output files of a seed are
+    written, or (seed, the exception) if it failed.
+
+    `concurrency` seeds run at once and the cores are split between them as
+    CP-SAT search workers. A seed gets an even share of the time left when
+    it starts. When a seed finishes, the seeds still running get the same
+    share of the time left if it is later than their deadline (see
+    `SlotDeadline`), so the time saved goes both to the seeds running and
+    to the ones that start after them, and the last ones run until the end.
+    Solutions are written as `solution_format`, json or npz. `dismiss_every` and `move_every` are the action grid of
+    `solve_supply`, and `rolling` solves in rolling windows instead of the
+    full model.
+    """
+    concurrency = min(concurrency or cores, len(seeds))
+    workers = max(cores // concurrency, 1)
+    end = time.time() + budget
+    queue = list(seeds)
+    # Build the seed-independent model once, the forked workers inherit it
+    get_supply_model(
+        get_problem(
+            [], get_datacenters(), get_selling_prices(), get_servers(), get_elasticity()
+        ),
+        dismiss_every=dismiss_every,
+        move_every=move_every,
+    )
+    global _deadlines
+    context = get_context("fork")
+    _deadlines = context.Array("d", concurrency, lock=False)
+    with ProcessPoolExecutor(concurrency, mp_context=context) as pool:
+        # The seed and the slot of every running future
+        running = {}
+        free = list(range(concurrency))
+        while queue or running:
+            rounds_left = -(-(len(queue) + len(running)) // concurrency)
+            share = time.time() + (end - time.time()) / rounds_left
+            for _, slot in running.values():
+                _deadlines[slot] = max(_deadlines[slot], share)
+            while queue and free:
+                slot = free.pop()
+                _deadlines[slot] = share
+                seed = queue.pop(0)
+                future = pool.submit(
+                    solve_seed,
+                    seed,
+                    SlotDeadline(slot),
+                    workers,
+                    solution_format,
+                    dismiss_every,
+                    move_every,
+                    rolling,
+                )
+                running[future] = (seed, slot)
+            done, _ = wait(running, return_when=FIRST_COMPLETED)
+            for future in done:
+                seed, slot = running.pop(future)
+                free.append(slot)
+                try:
+                    future.result()
+                except Exception as error:
+                    yield seed, error
+                else:
+                    yield seed, None
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--seeds", type=int, nargs="+", default=seeds)
+    parser.add_argument(
+        "--budget", type=float, default=600, help="wall-clock seconds for all seeds"
+    )
+    parser.add_argument("--cores", type=int, default=os.cpu_count() or 1)
+    parser.add_argument("--concurrency", type=int, help="seeds solved at once")
+    parser.add_argument("--format", default="json", choices=["json", "npz"])
+    parser.add_argument(
+        "--dismiss-every",
+        type=int,
+        default=DISMISS_EVERY,
+        help="time-steps between the dismissals the solver considers",
+    )
+    parser.add_argument(
+        "--move-every",
+        type=int,
+        default=MOVE_EVERY,
+        help="time-steps between the moves, a multiple of --dismiss-every",
+    )
+    parser.add_argument(
+        "--rolling", action="store_true", help="solve in rolling windows"
+    )
+    args = parser.parse_args()
+
+    os.makedirs("output", exist_ok=True)
+    start = time.time()
+    for seed, error in solve_seeds(
+        args.seeds,
+        args.budget,
+        args.cores,
+        args.concurrency,
+        args.format,
+        args.dismiss_every,
+        args.move_every,
+        args.rolling,
+    ):
+        if error is None:
+            print(f"Seed {seed} written after {time.time() - start:.0f}s")
+        else:
+            print(f"Seed {seed} failed after {time.time() - start:.0f}s: {error!r}")
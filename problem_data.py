@@ -0,0 +1,185 @@
+"""
+Problem data loaded once per data directory.
+
+The csv files are parsed into DataFrames and the `solver.models`
+dataclasses on first use and memoised by the absolute path of the directory,
+so `utils.load_problem_data` and `constants` share one parse. The lookup
+arrays and cost tables of the evaluators are memoised by the content of the
+DataFrames they are given. Arrays are indexed in the order of
+`evaluation.get_known`: generations as `ServerGeneration`, datacenters by id
+and latency sensitivities high, medium, low.
+
+Callers get copies of the DataFrames and dataclasses, which they are free to
+change, and the arrays read-only.
+"""
+
+import copy
+import json
+import os
+from dataclasses import dataclass
+from functools import lru_cache
+
+import numpy as np
+import pandas as pd
+
+from costs import CostTables, get_cost_tables
+from evaluation import get_index, get_known
+from solver import models
+from solver.models import Datacenter, Elasticity, SellingPrices, Server
+
+DATA_DIR = "./data/"
+
+FILES = {
+    "demand": "demand.csv",
+    "datacenters": "datacenters.csv",
+    "servers": "servers.csv",
+    "selling_prices": "selling_prices.csv",
+    "elasticity": "price_elasticity_of_demand.csv",
+}
+
+
+@dataclass
+class ProblemData:
+    path: str
+    demand: pd.DataFrame
+    datacenters: pd.DataFrame
+    servers: pd.DataFrame
+    selling_prices: pd.DataFrame
+    elasticity: pd.DataFrame
+
+    def frames(self) -> tuple[pd.DataFrame, ...]:
+        """Copies of the DataFrames, as returned by `utils.load_problem_data`."""
+        return tuple(
+            frame.copy()
+            for frame in (
+                self.demand,
+                self.datacenters,
+                self.servers,
+                self.selling_prices,
+                self.elasticity,
+            )
+        )
+
+
+# Lookups by the content of the DataFrames they are built from, so that
+# callers which only get the frames (the evaluators) share them
+_lookups: dict[tuple, object] = {}
+
+
+def _frame_key(frame: pd.DataFrame) -> tuple:
+    hashes = pd.util.hash_pandas_object(frame, index=False).to_numpy()
+    return tuple(frame.columns), hashes.tobytes()
+
+
+def _memoised(name: str, build, *frames: pd.DataFrame):
+    key = (name,) + tuple(_frame_key(frame) for frame in frames)
+    if key not in _lookups:
+        _lookups[key] = build(*frames)
+    return _lookups[key]
+
+
+def _read_only(arrays: dict[str, np.ndarray]) -> dict[str, np.ndarray]:
+    for a in arrays.values():
+        a.flags.writeable = False
+    return arrays
+
+
+def _server_arrays(servers: pd.DataFrame) -> dict[str, np.ndarray]:
+    servers = servers.set_index("server_generation")
+    servers = servers.loc[get_known("server_generation")]
+    windows = np.array(servers["release_time"].map(json.loads).tolist())
+    server = {
+        column: servers[column].to_numpy()
+        for column in servers.columns
+        if column not in ("server_type", "release_time")
+    }
+    server["release_start"] = windows[:, 0]
+    server["release_end"] = windows[:, 1]
+    return _read_only(server)
+
+
+def _datacenter_arrays(datacenters: pd.DataFrame) -> dict[str, np.ndarray]:
+    datacenters = datacenters.set_index("datacenter_id")
+    datacenters = datacenters.loc[get_known("datacenter_id")]
+    return _read_only(
+        {
+            "cost_of_energy": datacenters["cost_of_energy"].to_numpy(),
+            "slots_capacity": datacenters["slots_capacity"].to_numpy(),
+            "latency_sensitivity": datacenters["latency_sensitivity"]
+            .map(get_index("latency_sensitivity"))
+            .to_numpy(),
+        }
+    )
+
+
+def _cost_tables(servers: pd.DataFrame, datacenters: pd.DataFrame) -> CostTables:
+    costs = get_cost_tables(servers, datacenters)
+    _read_only({k: v for k, v in vars(costs).items() if isinstance(v, np.ndarray)})
+    return costs
+
+
+def get_server_arrays(servers: pd.DataFrame) -> dict[str, np.ndarray]:
+    """
+    Attribute -> [generation] of the servers DataFrame, with the release
+    window as release_start and release_end.
+    """
+    return _memoised("servers", _server_arrays, servers)
+
+
+def get_datacenter_arrays(datacenters: pd.DataFrame) -> dict[str, np.ndarray]:
+    """Attribute -> [datacenter], latency_sensitivity as its index."""
+    return _memoised("datacenters", _datacenter_arrays, datacenters)
+
+
+def get_frame_cost_tables(
+    servers: pd.DataFrame, datacenters: pd.DataFrame
+) -> CostTables:
+    """`costs.get_cost_tables` of the DataFrames (csv units)."""
+    return _memoised("costs", _cost_tables, servers, datacenters)
+
+
+@lru_cache(maxsize=None)
+def _load(path: str) -> ProblemData:
+    frames = {
+        name: pd.read_csv(os.path.join(path, file)) for name, file in FILES.items()
+    }
+    return ProblemData(path=path, **frames)
+
+
+def load_data(path: str = DATA_DIR) -> ProblemData:
+    return _load(os.path.abspath(path))
+
+
+@lru_cache(maxsize=None)
+def _load_models(path: str, scale: int):
+    # The dataclasses depend on `models.scale` when they are set up
+    data = _load(path)
+    return (
+        [Server(**row).setup() for row in data.servers.to_dict("records")],
+        [Datacenter(**row).setup() for row in data.datacenters.to_dict("records")],
+        [
+            SellingPrices(**row).setup()
+            for row in data.selling_prices.to_dict("records")
+        ],
+        [Elasticity(**row).setup() for row in data.elasticity.to_dict("records")],
+    )
+
+
+def _models(path: str, i: int):
+    return copy.deepcopy(_load_models(os.path.abspath(path), models.scale)[i])
+
+
+def get_servers(path: str = DATA_DIR) -> list[Server]:
+    return _models(path, 0)
+
+
+def get_datacenters(path: str = DATA_DIR) -> list[Datacenter]:
+    return _models(path, 1)
+
+
+def get_selling_prices(path: str = DATA_DIR) -> list[SellingPrices]:
+    return _models(path, 2)
+
+
+def get_elasticity(path: str = DATA_DIR) -> list[Elasticity]:
+    return _models(path, 3)
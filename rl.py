@@ -1,14 +1,8 @@
-import gym
 import numpy as np
-import torch
-import torch.nn as nn
-import tensorflow as tf
 import random
 from collections import deque
 import json
 import pandas as pd
-from scipy.stats import truncweibull_min
-import logging
 
 from evaluation import get_known, update_fleet, get_capacity_by_server_generation_latency_sensitivity, get_utilization, get_normalized_lifespan, get_profit, evaluation_function
 from constants import get_datacenters, get_selling_prices, get_servers, get_demand
@@ -17,11 +11,6 @@ from constants import get_datacenters, get_selling_prices, get_servers, get_dema
 # env.render() – Rendering the environment for displaying the visualization of the working setup.
 # env.step() – To proceed with an action on the selected environment.
 # env.close() – Close the particular render frame of the environment.
-logger = logging.getLogger()
-file_handler = logging.FileHandler('logs.log')
-logger.addHandler(file_handler)
-formatter = logging.Formatter('%(asctime)s | %(levelname)s | %(message)s')
-file_handler.setFormatter(formatter)
 
 # NN
 class ServerFleetEnvironment:
@@ -67,45 +56,53 @@ class ServerFleetEnvironment:
         P = get_profit(D, Z, self.selling_prices, self.fleet)
         return U * L * P
 
-class DQN(tf.keras.Model):
-    def __init__(self, state_size, action_size):
-        super(DQN, self).__init__()
-        self.dense1 = tf.keras.layers.Dense(128, activation='relu')
-        self.dense2 = tf.keras.layers.Dense(128, activation='relu')
-        self.dense3 = tf.keras.layers.Dense(action_size)
+def get_dqn(state_size, action_size):
+    # TENSORFLOW IS ONLY IMPORTED WHEN A MODEL IS BUILT
+    import tensorflow as tf
 
-    def call(self, state):
-        # Process time_step
-        time_step = tf.cast(state['time_step'], tf.float32)
+    class DQN(tf.keras.Model):
+        def __init__(self, state_size, action_size):
+            super(DQN, self).__init__()
+            self.dense1 = tf.keras.layers.Dense(128, activation='relu')
+            self.dense2 = tf.keras.layers.Dense(128, activation='relu')
+            self.dense3 = tf.keras.layers.Dense(action_size)
+
+        def call(self, state):
+            # Process time_step
+            time_step = tf.cast(state['time_step'], tf.float32)
         
-        # Process fleet
-        fleet = state['fleet']
-        if len(fleet) == 0:
-            fleet_tensor = tf.zeros((1, 5))  # Assuming 5 features for each server
-        else:
-            fleet_tensor = tf.convert_to_tensor([[
-                server['time_step'],
-                self.encode_datacenter(server['datacenter_id']),
-                self.encode_server_generation(server['server_generation']),
-                self.encode_server_id(server['server_id']),
-                self.encode_action(server['action'])
-            ] for server in fleet], dtype=tf.float32)
+            # Process fleet
+            fleet = state['fleet']
+            if len(fleet) == 0:
+                fleet_tensor = tf.zeros((1, 5))  # Assuming 5 features for each server
+            else:
+                fleet_tensor = tf.convert_to_tensor([[
+                    server['time_step'],
+                    self.encode_datacenter(server['datacenter_id']),
+                    self.encode_server_generation(server['server_generation']),
+                    self.encode_server_id(server['server_id']),
+                    self.encode_action(server['action'])
+                ] for server in fleet], dtype=tf.float32)
         
-        # Process demand
-        demand = tf.convert_to_tensor(state['demand'], dtype=tf.float32)
+            # Process demand
+            demand = tf.convert_to_tensor(state['demand'], dtype=tf.float32)
         
-        # Combine all inputs
-        combined_input = tf.concat([
-            tf.expand_dims(time_step, -1),
-            tf.reshape(fleet_tensor, (-1,)),
-            tf.reshape(demand, (-1,))
-        ], axis=-1)
+            # Combine all inputs
+            combined_input = tf.concat([
+                tf.expand_dims(time_step, -1),
+                tf.reshape(fleet_tensor, (-1,)),
+                tf.reshape(demand, (-1,))
+            ], axis=-1)
         
-        x = self.dense1(combined_input)
-        x = self.dense2(x)
-        return self.dense3(x)
+            x = self.dense1(combined_input)
+            x = self.dense2(x)
+            return self.dense3(x)
+
+    return DQN(state_size, action_size)
 
 def train_model(env, model, episodes, epsilon=0.1):
+    import tensorflow as tf
+
     optimizer = tf.keras.optimizers.Adam(learning_rate=0.001)
     loss_fn = tf.keras.losses.MeanSquaredError()
 
@@ -0,0 +1,111 @@
+"""
+Per-seed realisation of the randomness of the evaluator.
+
+A scenario holds the actual demand and the sequence of failure rates that
+`evaluation_function(seed=...)` would draw, so that many candidate solutions
+can be scored against the same seed without regenerating them. Scenarios are
+cached on disk as .npz files keyed by seed and by a hash of the demand data.
+"""
+
+import hashlib
+import os
+import tempfile
+import zipfile
+from dataclasses import dataclass
+
+import numpy as np
+import pandas as pd
+
+from evaluation import (
+    get_actual_demand_array,
+    get_demand_array,
+    get_failure_rates,
+    get_known,
+)
+
+CACHE_DIR = "./cache/scenarios/"
+
+
+@dataclass
+class Scenario:
+    seed: int
+    # demand[time_step, generation, sensitivity], row 0 is unused
+    demand: np.ndarray
+    # Failure rates in the order in which the evaluator consumes them. There
+    # is one per (time_step, generation, sensitivity), the most that can be
+    # consumed.
+    failure_rates: np.ndarray
+
+    @property
+    def time_steps(self) -> int:
+        return self.demand.shape[0] - 1
+
+    def get_demand(self, time_steps: int) -> np.ndarray:
+        if time_steps > self.time_steps:
+            raise ValueError(f"The scenario only covers {self.time_steps} time-steps.")
+        return self.demand[: time_steps + 1].astype(float)
+
+    def save(self, path: str):
+        # Written to a temporary file that replaces `path` once complete, so
+        # that concurrent readers never see a partial file
+        with tempfile.NamedTemporaryFile(
+            dir=os.path.dirname(path) or ".", suffix=".npz", delete=False
+        ) as f:
+            np.savez(
+                f,
+                seed=self.seed,
+                demand=self.demand,
+                failure_rates=self.failure_rates,
+            )
+        os.replace(f.name, path)
+
+    @classmethod
+    def load(cls, path: str) -> "Scenario":
+        with np.load(path) as data:
+            return cls(int(data["seed"]), data["demand"], data["failure_rates"])
+
+
+def hash_demand(demand: pd.DataFrame) -> str:
+    h = pd.util.hash_pandas_object(demand, index=False).to_numpy()
+    return hashlib.sha1(h.tobytes()).hexdigest()[:16]
+
+
+def make_scenario(
+    seed: int, demand: pd.DataFrame, time_steps: int = get_known("time_steps")
+) -> Scenario:
+    # Same order of draws as evaluation.get_evaluation: the demand random
+    # walks first, then the failure rates.
+    np.random.seed(seed)
+    D = get_demand_array(get_actual_demand_array(demand), time_steps).astype(np.int64)
+    cells = (
+        time_steps
+        * len(get_known("server_generation"))
+        * len(get_known("latency_sensitivity"))
+    )
+    f = get_failure_rates(cells)
+    return Scenario(seed, D, f)
+
+
+def get_scenario(
+    seed: int,
+    demand: pd.DataFrame,
+    time_steps: int = get_known("time_steps"),
+    cache_dir: str | None = CACHE_DIR,
+) -> Scenario:
+    """
+    Loads the scenario of a seed from the cache, or makes it and stores it.
+    Pass cache_dir=None to skip the cache.
+    """
+    if cache_dir is None:
+        return make_scenario(seed, demand, time_steps)
+    path = os.path.join(cache_dir, f"{seed}_{time_steps}_{hash_demand(demand)}.npz")
+    if os.path.exists(path):
+        try:
+            return Scenario.load(path)
+        except (OSError, EOFError, KeyError, ValueError, zipfile.BadZipFile):
+            # An unreadable file is a cache miss, it is made again
+            pass
+    scenario = make_scenario(seed, demand, time_steps)
+    os.makedirs(cache_dir, exist_ok=True)
+    scenario.save(path)
+    return scenario
@@ -0,0 +1,243 @@
+"""
+Linear relaxation of the supply model of `solver.sat`, solved with HiGHS.
+
+The variables are the same cohort runs as the CP-SAT model (see
+`sat.get_cohort_runs`) and the met demand, without moves. Each met demand
+has a revenue column next to it, which is only used in pricing mode. The relaxation is
+rounded down, which keeps the cohorts shrinking and the datacenters within
+their slots, then runs that were rounded down by half a server or more are
+rounded up again wherever both still hold.
+
+On the default grid of `sat.DISMISS_EVERY` time-steps it solves in about 4 s
+on one core (5 s in pricing mode), which is enough for what-if runs that
+don't need integral optimality. Dismissing at every time-step takes about
+45 s (60 s in pricing mode), so give it a longer `time_limit`.
+"""
+
+from collections import defaultdict
+
+import numpy as np
+
+from costs import get_cost_tables
+
+from .models import (
+    Datacenter,
+    Demand,
+    Elasticity,
+    SellingPrices,
+    Sensitivity,
+    Server,
+    ServerGeneration,
+)
+from .sat import (
+    DISMISS_EVERY,
+    MAX_TS,
+    MIN_TS,
+    PRICE_CUTS,
+    DecisionKey,
+    Problem,
+    extract_solution,
+    get_cohort_runs,
+    get_problem,
+)
+
+
+class _Rows:
+    """Sparse constraint rows built in one pass as coordinate triplets."""
+
+    def __init__(self):
+        self.rows: list[int] = []
+        self.cols: list[int] = []
+        self.vals: list[float] = []
+        self.ub: list[float] = []
+
+    def add(self, terms: list[tuple[int, float]], ub: float):
+        row = len(self.ub)
+        for col, val in terms:
+            self.rows.append(row)
+            self.cols.append(col)
+            self.vals.append(val)
+        self.ub.append(ub)
+
+    def matrix(self, n: int):
+        from scipy.sparse import coo_matrix
+
+        return coo_matrix(
+            (self.vals, (self.rows, self.cols)), shape=(len(self.ub), n)
+        ).tocsr()
+
+
+def solve_supply_lp(
+    demands: list[Demand],
+    datacenters: list[Datacenter],
+    selling_prices: list[SellingPrices],
+    servers: list[Server],
+    elasticity: list[Elasticity],
+    time_limit: float = 60,
+    pricing: bool = False,
+    dismiss_every: int = DISMISS_EVERY,
+):
+    """
+    Same inputs and result as `sat.solve_supply`: the supply map, the solution
+    entries and the prices. `pricing` is the pricing mode of
+    `sat.build_supply_model`, and servers can be dismissed every
+    `dismiss_every` time-steps.
+    """
+    problem = get_problem(demands, datacenters, selling_prices, servers, elasticity)
+    runs = get_cohort_runs(problem, dismiss_every=dismiss_every)
+    keys = list(runs)
+    index = {key: i for i, key in enumerate(keys)}
+    costs = get_cost_tables(servers, datacenters)
+    g_index = {sg: g for g, sg in enumerate(ServerGeneration)}
+    d_index = {dc: d for d, dc in enumerate(costs.datacenters)}
+    sg_map = problem.sg_map
+    dc_map = problem.dc_map
+
+    # Runs covering every (timestep, server_generation, datacenter_id)
+    covering: defaultdict[tuple[int, ServerGeneration, str], list[int]] = defaultdict(
+        list
+    )
+    cost = np.zeros(len(keys))
+    upper = np.zeros(len(keys))
+    rows = _Rows()
+    for i, ((first, dc, sg, bought), run) in enumerate(runs.items()):
+        g, d = g_index[sg], d_index[dc]
+        for ts in run:
+            covering[(ts, sg, dc)].append(i)
+        ages = slice(run.start - bought + 1, run.stop - bought + 1)
+        cost[i] = (costs.energy[g, d] * len(run) + costs.maintenance[g, ages].sum()) + (
+            costs.purchase_price[g] if first == bought else 0
+        )
+        upper[i] = dc_map[dc].slots_capacity // sg_map[sg].slots_size
+        if first > bought:
+            # Cohorts only shrink
+            rows.add([(i, 1), (i - 1, -1)], 0)
+
+    for ts in range(MIN_TS, MAX_TS + 1):
+        for dc in datacenters:
+            # Slots are strictly below the capacity, as in the CP-SAT model
+            rows.add(
+                [
+                    (i, sg_map[sg].slots_size)
+                    for sg in ServerGeneration
+                    for i in covering[(ts, sg, dc.datacenter_id)]
+                ],
+                dc.slots_capacity - 1,
+            )
+
+    # Met demand, bounded by the demand and by the capacity
+    met: list[tuple[int, ServerGeneration, Sensitivity]] = []
+    met_cost: list[float] = []
+    met_upper: list[float] = []
+    for ts in range(MIN_TS, MAX_TS + 1):
+        for sg in ServerGeneration:
+            if ts < sg_map[sg].release_time[0]:
+                continue
+            for sen in Sensitivity:
+                column = len(keys) + 2 * len(met)
+                demand = max(problem.demand_map[ts].get(sg, {sen: 0})[sen], 0)
+                p, e = problem.sp_map[sg][sen], problem.elasticity_map[sg][sen]
+                met.append((ts, sg, sen))
+                if pricing:
+                    # The revenue follows the tangents of the revenue curve,
+                    # see `sat.build_supply_model`
+                    met_cost += [0, -1]
+                    met_upper += [demand * (1 - e) / 2, np.inf]
+                    for k in range(PRICE_CUTS):
+                        x = (1 - e) / 2 * k / (PRICE_CUTS - 1)
+                        rows.add(
+                            [(column + 1, 1), (column, -p * (1 - 1 / e + 2 * x / e))],
+                            -p * x * x / e * demand,
+                        )
+                else:
+                    met_cost += [-p, 0]
+                    met_upper += [demand, 0]
+                rows.add(
+                    [(column, 1)]
+                    + [
+                        (i, -sg_map[sg].capacity)
+                        for dc in datacenters
+                        if dc.latency_sensitivity == sen
+                        for i in covering[(ts, sg, dc.datacenter_id)]
+                    ],
+                    0,
+                )
+
+    # Imported here as scipy is slow to import for the callers that don't solve
+    from scipy.optimize import linprog
+
+    n = len(keys) + 2 * len(met)
+    result = linprog(
+        np.concatenate([cost, met_cost]),
+        A_ub=rows.matrix(n),
+        b_ub=np.array(rows.ub),
+        bounds=np.stack([np.zeros(n), np.concatenate([upper, met_upper])]).T,
+        method="highs",
+        options={"time_limit": time_limit},
+    )
+    if result.x is None:
+        raise Exception(f"No solution found: {result.message}")
+    print("Status:", result.message)
+    print("Objective:", -result.fun)
+
+    alive = repair(problem, runs, result.x[: len(keys)])
+    met_amount = result.x[len(keys) :: 2]
+    values: dict[DecisionKey, int] = {}
+    supply = {
+        (ts, sg, dc.datacenter_id): 0
+        for ts in range(MIN_TS, MAX_TS + 1)
+        for sg in ServerGeneration
+        for dc in datacenters
+    }
+    for (first, dc, sg, bought), run in runs.items():
+        amount = int(alive[index[(first, dc, sg, bought)]])
+        values[(first, "alive", dc, sg, bought)] = amount
+        if first == bought:
+            values[(first, "buy", dc, sg)] = amount
+        for ts in run:
+            supply[(ts, sg, dc)] += amount
+    if pricing:
+        # The rounded supply may meet a little less than the relaxation
+        for (ts, sg, sen), amount in zip(met, met_amount):
+            capacity = sum(
+                supply[(ts, sg, dc.datacenter_id)] * sg_map[sg].capacity
+                for dc in datacenters
+                if dc.latency_sensitivity == sen
+            )
+            values[(ts, "met", sg, sen)] = min(int(amount), capacity)
+    return extract_solution(problem, values, supply)
+
+
+def repair(
+    problem: Problem,
+    runs: dict[tuple[int, str, ServerGeneration, int], range],
+    x: np.ndarray,
+) -> np.ndarray:
+    """
+    Rounds the cohort runs of the relaxation to servers, keeping every
+    cohort shrinking and every datacenter strictly within its slots.
+    """
+    alive = np.floor(x + 1e-6)
+    slots = {
+        dc.datacenter_id: np.zeros(MAX_TS + 1, dtype=np.int64)
+        for dc in problem.datacenters
+    }
+    for i, ((_, dc, sg, _), run) in enumerate(runs.items()):
+        slots[dc][run.start : run.stop] += int(alive[i]) * problem.sg_map[sg].slots_size
+
+    # Round up the runs that lost the most first
+    keys = list(runs)
+    for i in np.argsort(alive - x):
+        if x[i] - alive[i] < 0.5:
+            break
+        first, dc, sg, bought = keys[i]
+        run = runs[keys[i]]
+        size = problem.sg_map[sg].slots_size
+        shrinking = first == bought or alive[i] + 1 <= alive[i - 1]
+        fits = (
+            slots[dc][run.start : run.stop] + size < problem.dc_map[dc].slots_capacity
+        ).all()
+        if shrinking and fits:
+            alive[i] += 1
+            slots[dc][run.start : run.stop] += size
+    return alive
@@ -92,9 +92,11 @@ class Server:
         self.release_time = json.loads(self.release_time)  # type: ignore[reportArgumentType]
         self.purchase_price = self.purchase_price * scale
         self.average_maintenance_fee = self.average_maintenance_fee * scale
+        self.cost_of_moving = self.cost_of_moving * scale
         if scale != 1:
             self.purchase_price = int(self.purchase_price)
             self.average_maintenance_fee = int(self.average_maintenance_fee)
+            self.cost_of_moving = int(self.cost_of_moving)
             self.capacity = int(round(self.capacity * (1 - 0.072604916987), 0))
         return self
 
@@ -123,7 +125,7 @@ class Demand:
 class Action(Enum):
     BUY = "buy"
     DISMISS = "dismiss"
-    # MOVE = "move"
+    MOVE = "move"
 
 
 @dataclass
@@ -141,6 +143,11 @@ class SolutionEntry:
     server_generation: ServerGeneration
     action: Action
     amount: int
+    # The datacenter the servers leave, for moves
+    from_datacenter_id: str | None = None
+    # The time-step the dismissed or moved servers were bought at, None for
+    # any of them
+    bought_timestep: int | None = None
 
     def to_dict(self):
         return {
@@ -149,4 +156,6 @@ class SolutionEntry:
             "server_generation": self.server_generation.value,
             "action": self.action.value,
             "amount": self.amount,
+            "from_datacenter_id": self.from_datacenter_id,
+            "bought_timestep": self.bought_timestep,
         }
@@ -1,10 +1,20 @@
 # pyright: reportAssignmentType=false
+from __future__ import annotations
+
 import itertools
+import threading
+import time
 from collections import defaultdict
 from collections.abc import Callable
-from typing import TypeVar
+from dataclasses import dataclass, field
+from typing import TYPE_CHECKING, TypeVar
+
+from costs import get_cost_tables
 
-from ortools.sat.python import cp_model
+if TYPE_CHECKING:
+    # Imported where the models are built and solved, as ortools is slow to
+    # import for the modules that only need the solution helpers
+    from ortools.sat.python import cp_model
 
 from .models import (
     Action,
@@ -25,10 +35,24 @@ from .models import (
 # a = "actions"
 # am = "amount"
 
-INFINITY: int = 2**43
-
 MIN_TS = 1
 MAX_TS = 168
+# Rolling horizon defaults: windows of WINDOW time-steps, of which the last
+# OVERLAP are solved again by the next window
+WINDOW = 24
+OVERLAP = 12
+# Coarse-to-fine default: actions only at the first time-step of each BUCKET
+BUCKET = 12
+# Servers can be dismissed every DISMISS_EVERY time-steps and moved every
+# MOVE_EVERY (a multiple of it). Coarser grids keep the cohorts to a fraction
+# of the model at the cost of the solutions it can express: every time-step
+# makes a model of about 500k variables that CP-SAT takes minutes to build
+# and to find a first solution of
+DISMISS_EVERY = 6
+MOVE_EVERY = 24
+# Pricing mode: tangents of the revenue curve of every (time-step, generation,
+# sensitivity), from no servers to the revenue-maximising amount
+PRICE_CUTS = 5
 K = TypeVar("K")
 V = TypeVar("V")
 
@@ -61,13 +85,242 @@ def price_from_supply(
     )
 
 
-def solve_supply(
-    demands: list[Demand],
+# The decisions of the model, keyed by their time-step first:
+#   (timestep, "buy", datacenter_id, server_generation)
+#   (timestep, "alive", datacenter_id, server_generation, bought at), the
+#    servers of the cohort from that time-step until its next alive count
+#   (timestep, "move", from datacenter_id, to datacenter_id, server_generation,
+#    bought at)
+#   (timestep, "met", server_generation, sensitivity), in pricing mode only
+# Servers are tracked by the time-step they were bought at (their cohort), so
+# dismissals are the drops in the alive counts of a cohort.
+DecisionKey = tuple[int, str, *tuple[str | ServerGeneration | int, ...]]
+# A time.time() to finish by, or a function that returns the current one
+Deadline = float | Callable[[], float]
+
+
+@dataclass
+class Problem:
+    demand_map: dict[int, dict[ServerGeneration, dict[Sensitivity, int]]]
+    sp_map: dict[ServerGeneration, dict[Sensitivity, int]]
+    elasticity_map: dict[ServerGeneration, dict[Sensitivity, float]]
+    sg_map: dict[ServerGeneration, Server]
+    dc_map: dict[str, Datacenter]
+    datacenters: list[Datacenter]
+    servers: list[Server]
+
+
+@dataclass
+class SupplyModel:
+    cp: cp_model.CpModel
+    # The last time-step of the model
+    horizon: int
+    life_expectancy: dict[ServerGeneration, int]
+    # buys[(timestep, datacenter_id, server_generation)], only in the release
+    # window of the generation
+    buys: dict[tuple[int, str, ServerGeneration], cp_model.IntVar]
+    # alive[(timestep, datacenter_id, server_generation, bought at)], only
+    # while the cohort is younger than its life expectancy
+    alive: dict[tuple[int, str, ServerGeneration, int], cp_model.IntVar]
+    # moves[(timestep, datacenter_id, server_generation, bought at)], the
+    # servers of the cohort that arrive in the datacenter, from whichever
+    # datacenters the cohort loses servers at the same time-step
+    moves: dict[tuple[int, str, ServerGeneration, int], cp_model.IntVar]
+    # supply[(timestep, server_generation, datacenter_id)]
+    supply: dict[tuple[int, ServerGeneration, str], cp_model.IntVar]
+    # met_demand[(timestep, server_generation, sensitivity)], the only
+    # variables whose domain depends on the demand
+    met_demand: dict[tuple[int, ServerGeneration, Sensitivity], cp_model.IntVar]
+    # Pricing mode: the met demand can go up to the demand times served[(
+    # server_generation, sensitivity)] by lowering the price, and the
+    # revenue is bounded by cuts whose bound is the demand times a
+    # coefficient, as revenue_cuts[(timestep, server_generation,
+    # sensitivity)] = [(constraint index, coefficient)]
+    served: dict[tuple[ServerGeneration, Sensitivity], float] = field(
+        default_factory=dict
+    )
+    revenue_cuts: dict[
+        tuple[int, ServerGeneration, Sensitivity], list[tuple[int, float]]
+    ] = field(default_factory=dict)
+    # The copy of `cp` that instantiate patches, the domains and objective
+    # it restores first, and the variables it changed last time
+    _instance: cp_model.CpModel | None = field(default=None, init=False, repr=False)
+    _domains: list[list[int]] = field(default_factory=list, init=False, repr=False)
+    _coeffs: list[int] = field(default_factory=list, init=False, repr=False)
+    _patched: list[int] = field(default_factory=list, init=False, repr=False)
+    # The time-step of the variable of every term of the objective, and the
+    # (term, time-step, life expectancy) of the buys
+    _objective_steps: list[int] = field(default_factory=list, init=False, repr=False)
+    _buy_terms: list[tuple[int, int, int]] = field(
+        default_factory=list, init=False, repr=False
+    )
+    _decisions: dict[DecisionKey, cp_model.IntVar] | None = field(
+        default=None, init=False, repr=False
+    )
+
+    def instantiate(
+        self,
+        demand_map: dict[int, dict[ServerGeneration, dict[Sensitivity, int]]],
+        horizon: int | None = None,
+        fixed: dict[DecisionKey, int] | None = None,
+        hints: dict[DecisionKey, int] | None = None,
+    ) -> cp_model.CpModel:
+        """
+        The model for a demand, patched in place of rebuilding it.
+        Time-steps after `horizon` buy and move nothing and are left out of
+        the objective, which makes it the model of time-steps 1 to `horizon`
+        (by default the horizon the model was built for). Servers bought
+        before `horizon` are then only charged the part of their purchase
+        price that they live through by it, as the revenue they make after
+        it is left out as well.
+
+        Every call patches the same copy of `cp`, so an instance is only
+        valid until the next call.
+        """
+        horizon = self.horizon if horizon is None else horizon
+        fixed = fixed or {}
+        hints = hints or {}
+        cp = self._reset()
+        proto = cp.Proto()
+
+        def restrict(index: int, domain: list[int]):
+            proto.variables[index].domain[:] = domain
+            self._patched.append(index)
+
+        for (ts, sg, sen), var in self.met_demand.items():
+            demand = demand_map[ts].get(sg, {sen: 0})[sen] if ts <= horizon else 0
+            demand = max(demand, 0)
+            served = int(demand * self.served.get((sg, sen), 1))
+            restrict(var.index, [0, served])
+            for index, coefficient in self.revenue_cuts.get((ts, sg, sen), []):
+                proto.constraints[index].linear.domain[-1] = int(coefficient * demand)
+        for key, var in self.decisions().items():
+            if key[0] > horizon:
+                # Cohorts are left free to age out after the horizon
+                if key[1] != "alive":
+                    restrict(var.index, [0, 0])
+            elif key in fixed:
+                restrict(var.index, [fixed[key], fixed[key]])
+            elif key in hints:
+                proto.solution_hint.vars.append(var.index)
+                proto.solution_hint.values.append(hints[key])
+        if horizon < self.horizon:
+            objective = proto.objective
+            for i, ts in enumerate(self._objective_steps):
+                if ts > horizon:
+                    objective.coeffs[i] = 0
+            for i, ts, life in self._buy_terms:
+                if ts <= horizon:
+                    life = min(life, self.horizon - ts + 1)
+                    share = min((horizon - ts + 1) / life, 1)
+                    objective.coeffs[i] = round(self._coeffs[i] * share)
+        return cp
+
+    def _reset(self) -> cp_model.CpModel:
+        if self._instance is None:
+            self._instance = self.cp.clone()
+            proto = self._instance.Proto()
+            self._domains = [list(v.domain) for v in proto.variables]
+            self._coeffs = list(proto.objective.coeffs)
+            steps = {
+                var.index: key[0]
+                for variables in (self.decisions(), self.supply, self.met_demand)
+                for key, var in variables.items()
+            }
+            self._objective_steps = [steps.get(v, MIN_TS) for v in proto.objective.vars]
+            buys = {
+                var.index: (ts, self.life_expectancy[sg])
+                for (ts, _, sg), var in self.buys.items()
+            }
+            self._buy_terms = [
+                (i, *buys[v]) for i, v in enumerate(proto.objective.vars) if v in buys
+            ]
+        proto = self._instance.Proto()
+        for index in self._patched:
+            proto.variables[index].domain[:] = self._domains[index]
+        self._patched = []
+        proto.objective.coeffs[:] = self._coeffs
+        proto.ClearField("solution_hint")
+        return self._instance
+
+    def decisions(self) -> dict[DecisionKey, cp_model.IntVar]:
+        if self._decisions is not None:
+            return self._decisions
+        decisions: dict[DecisionKey, cp_model.IntVar] = {}
+        for (ts, dc, sg), var in self.buys.items():
+            decisions[(ts, "buy", dc, sg)] = var
+        for (ts, dc, sg, bought), var in self.alive.items():
+            decisions[(ts, "alive", dc, sg, bought)] = var
+        for (ts, dc, sg, bought), var in self.moves.items():
+            decisions[(ts, "move", dc, sg, bought)] = var
+        if self.revenue_cuts:
+            # The met demand sets the price
+            for (ts, sg, sen), var in self.met_demand.items():
+                decisions[(ts, "met", sg, sen)] = var
+        self._decisions = decisions
+        return decisions
+
+
+def get_actions(
+    values: dict[DecisionKey, int],
+) -> list[tuple[int, str, ServerGeneration, Action, int, str | None, int | None]]:
+    """
+    The (timestep, datacenter_id, server_generation, action, amount, from
+    datacenter_id, bought at) actions of a solution of the model. The
+    servers a cohort gains in a datacenter move in from the datacenters it
+    loses servers at, and the other losses that are not ageing out are
+    dismissals.
+    """
+    actions = []
+    # The count of every cohort at the start of each run, by datacenter
+    counts: defaultdict[tuple[ServerGeneration, int], dict[int, dict[str, int]]] = (
+        defaultdict(lambda: defaultdict(dict))
+    )
+    for key, amount in values.items():
+        if key[1] == "buy":
+            ts, _, dc, sg = key
+            if amount > 0:
+                actions.append((ts, dc, sg, Action.BUY, amount, None, None))
+        elif key[1] == "alive":
+            ts, _, dc, sg, bought = key
+            counts[(sg, bought)][ts][dc] = amount
+    for (sg, bought), runs in counts.items():
+        starts = sorted(runs)
+        for previous, ts in zip(starts, starts[1:]):
+            gains: dict[str, int] = {}
+            losses: dict[str, int] = {}
+            for dc, amount in runs[ts].items():
+                change = amount - runs[previous].get(dc, 0)
+                if change > 0:
+                    gains[dc] = change
+                elif change < 0:
+                    losses[dc] = -change
+            for dst, gain in gains.items():
+                for src in losses:
+                    amount = min(gain, losses[src])
+                    if amount > 0:
+                        actions.append((ts, dst, sg, Action.MOVE, amount, src, bought))
+                        losses[src] -= amount
+                        gain -= amount
+            for dc, amount in losses.items():
+                if amount > 0:
+                    actions.append((ts, dc, sg, Action.DISMISS, amount, None, bought))
+    return sorted(actions, key=lambda action: action[0])
+
+
+# Seed-independent lookups of get_problem by problem data
+_problem_maps: dict[str, tuple] = {}
+
+
+def get_problem_maps(
     datacenters: list[Datacenter],
     selling_prices: list[SellingPrices],
     servers: list[Server],
     elasticity: list[Elasticity],
-):
+) -> tuple[dict, dict, dict, dict]:
+    key = repr((datacenters, selling_prices, servers, elasticity))
+    if key in _problem_maps:
+        return _problem_maps[key]
     elasticity_map: dict[ServerGeneration, dict[Sensitivity, float]] = {}
     for el in elasticity:
         if elasticity_map.get(el.server_generation) is None:
@@ -75,6 +328,26 @@ def solve_supply(
         elasticity_map[el.server_generation][el.latency_sensitivity] = el.elasticity
     sg_map = {server.server_generation: server for server in servers}
     dc_map = {dc.datacenter_id: dc for dc in datacenters}
+    sp_map: dict[ServerGeneration, dict[Sensitivity, int]] = {}
+    for sp in selling_prices:
+        if sp_map.get(sp.server_generation) is None:
+            sp_map[sp.server_generation] = {}
+
+        sp_map[sp.server_generation][sp.latency_sensitivity] = sp.selling_price
+    _problem_maps[key] = (elasticity_map, sg_map, dc_map, sp_map)
+    return _problem_maps[key]
+
+
+def get_problem(
+    demands: list[Demand],
+    datacenters: list[Datacenter],
+    selling_prices: list[SellingPrices],
+    servers: list[Server],
+    elasticity: list[Elasticity],
+) -> Problem:
+    elasticity_map, sg_map, dc_map, sp_map = get_problem_maps(
+        datacenters, selling_prices, servers, elasticity
+    )
     demand_map: dict[int, dict[ServerGeneration, dict[Sensitivity, int]]] = {}
     for price in demands:
         if demand_map.get(price.time_step) is None:
@@ -85,294 +358,764 @@ def solve_supply(
             demand_map[price.time_step][price.server_generation][sen] = (
                 price.get_latency(sen)
             )
-    sp_map: dict[ServerGeneration, dict[Sensitivity, int]] = {}
-    for sp in selling_prices:
-        if sp_map.get(sp.server_generation) is None:
-            sp_map[sp.server_generation] = {}
 
-        sp_map[sp.server_generation][sp.latency_sensitivity] = sp.selling_price
+    return Problem(
+        demand_map,
+        sp_map,
+        elasticity_map,
+        sg_map,
+        dc_map,
+        datacenters,
+        servers,
+    )
 
-    cp = cp_model.CpModel()
+
+# Seed-independent models by problem data, see get_supply_model
+_supply_models: dict[str, SupplyModel] = {}
+
+
+def get_supply_model(
+    problem: Problem,
+    pricing: bool = False,
+    dismiss_every: int = DISMISS_EVERY,
+    move_every: int = MOVE_EVERY,
+    horizon: int = MAX_TS,
+) -> SupplyModel:
     """
-    The action model is what will be solved by SAT. It decides when to buy, sell, or move servers.
+    The model is the same for every seed up to the demand, so it is built
+    once per process and patched with `SupplyModel.instantiate`. Processes
+    forked after the first call share it.
     """
-    action_model = {
-        timestep: {
-            datacenter.datacenter_id: {
-                server_generation: {
-                    act: cp.new_int_var(
-                        0,
-                        (
-                            0
-                            if (
-                                sg_map[server_generation].release_time[0] > timestep
-                                and sg_map[server_generation].release_time[1] < timestep
-                                and act == Action.BUY
-                            )
-                            or (timestep == 0 and act == Action.DISMISS)
-                            else (
-                                dc_map[datacenter.datacenter_id].slots_capacity
-                                // sg_map[server_generation].slots_size
-                            )
-                        ),
-                        f"{timestep}_{datacenter}_{server_generation}_action",
-                    )
-                    for act in Action
-                }
-                for server_generation in ServerGeneration
-            }
-            for datacenter in datacenters
-        }
-        for timestep in range(1, MAX_TS + 1)
-    }
-
-    # We calculate the total cost of buying servers by multiplying to volume to price
-    buying_cost = cp.new_int_var(0, INFINITY, "cost")
-    _ = cp.add(
-        buying_cost
-        == sum(
-            action_model[t][d][s][Action.BUY] * sg_map[s].purchase_price
-            for t in action_model
-            for d in action_model[t]
-            for s in action_model[t][d]
+    key = repr(
+        (
+            problem.servers,
+            problem.datacenters,
+            problem.sp_map,
+            pricing,
+            dismiss_every,
+            move_every,
+            horizon,
         )
     )
-    dismissed_servers = {
-        t: {
-            sg: {
-                dc.datacenter_id: cp.new_int_var(
-                    0,
-                    (dc_map[dc.datacenter_id].slots_capacity // sg_map[sg].slots_size),
-                    f"{t}_{sg}_{dc}_dismissed",
-                )
-                for dc in datacenters
-            }
-            for sg in ServerGeneration
-        }
-        for t in action_model
-    }
-    dismissed_servers[0] = {
-        sg: {
-            dc.datacenter_id: cp.new_int_var(0, 0, f"0_{sg}_{dc}_dismissed")
-            for dc in datacenters
-        }
+    if pricing:
+        key += repr(problem.elasticity_map)
+    if key not in _supply_models:
+        _supply_models[key] = build_supply_model(
+            problem, pricing, dismiss_every, move_every, horizon
+        )
+    return _supply_models[key]
+
+
+def get_cohort_runs(
+    problem: Problem, horizon: int = MAX_TS, dismiss_every: int = DISMISS_EVERY
+) -> dict[tuple[int, str, ServerGeneration, int], range]:
+    """
+    The runs of time-steps over which the count of a cohort is constant, by
+    (first time-step, datacenter_id, server_generation, bought at) and in
+    time order within a cohort. A cohort is alive from the time-step it is
+    bought at, in the release window of its generation, until it reaches its
+    life expectancy, which is all the expiry there is to model. Its count
+    only changes at the time-steps servers can be dismissed at, every
+    `dismiss_every` time-steps.
+    """
+    runs: dict[tuple[int, str, ServerGeneration, int], range] = {}
+    for sg, server in problem.sg_map.items():
+        first_buy, last_buy = server.release_time
+        for bought in range(max(first_buy, MIN_TS), min(last_buy, horizon) + 1):
+            last = min(bought + server.life_expectancy - 1, horizon)
+            starts = [bought] + [
+                ts
+                for ts in range(bought + 1, last + 1)
+                if (ts - MIN_TS) % dismiss_every == 0
+            ]
+            for dc in problem.datacenters:
+                for first, end in zip(starts, starts[1:] + [last + 1]):
+                    runs[(first, dc.datacenter_id, sg, bought)] = range(first, end)
+    return runs
+
+
+def build_supply_model(
+    problem: Problem,
+    pricing: bool = False,
+    dismiss_every: int = DISMISS_EVERY,
+    move_every: int = MOVE_EVERY,
+    horizon: int = MAX_TS,
+) -> SupplyModel:
+    """
+    The model of time-steps 1 to `horizon` with met demand bounded by
+    capacity only. With `pricing` the met demand can differ from the demand,
+    at the price that makes them equal (see `price_from_supply`), and the
+    revenue follows the price. Servers can be dismissed every
+    `dismiss_every` time-steps and moved every `move_every`, which has to be
+    a multiple of it.
+    """
+    from ortools.sat.python import cp_model
+
+    if dismiss_every < 1 or move_every % dismiss_every != 0:
+        raise ValueError("Moves have to fall on the time-steps of dismissals.")
+
+    sp_map = problem.sp_map
+    sg_map = problem.sg_map
+    datacenters = problem.datacenters
+    costs = get_cost_tables(problem.servers, datacenters)
+    g_index = {sg: g for g, sg in enumerate(ServerGeneration)}
+    d_index = {dc: d for d, dc in enumerate(costs.datacenters)}
+
+    def most(dc: Datacenter, sg: ServerGeneration) -> int:
+        # The most servers of a generation that fit in a datacenter
+        return dc.slots_capacity // sg_map[sg].slots_size
+
+    cp = cp_model.CpModel()
+    # Servers can only be bought in the release window of their generation
+    buys = {
+        (ts, dc.datacenter_id, sg): cp.new_int_var(
+            0, most(dc, sg), f"{ts}_{dc.datacenter_id}_{sg}_buy"
+        )
         for sg in ServerGeneration
+        for ts in range(
+            max(sg_map[sg].release_time[0], MIN_TS),
+            min(sg_map[sg].release_time[1], horizon) + 1,
+        )
+        for dc in datacenters
     }
-    # Now we need to calculate the total availability of each type of server at each timestep
-    # based on the sum of purchase amounts minus the sum of sell amounts
-    # Customers don't really care about cost of energy and stuff like that. We can deal with that later
-    supply = {
-        t: {
-            sg: {
-                dc.datacenter_id: cp.new_int_var(
-                    0,
-                    (dc_map[dc.datacenter_id].slots_capacity // sg_map[sg].slots_size),
-                    f"{t}_{sg}_{dc}_avail",
-                )
-                for dc in datacenters
-            }
-            for sg in ServerGeneration
-        }
-        for t in action_model
+    runs = get_cohort_runs(problem, horizon, dismiss_every)
+    alive = {
+        (first, dc, sg, bought): cp.new_int_var(
+            0, most(problem.dc_map[dc], sg), f"{first}_{dc}_{sg}_{bought}_alive"
+        )
+        for first, dc, sg, bought in runs
     }
-    # HACK
-    supply[0] = {
-        sg: {
-            dc.datacenter_id: cp.new_int_var(0, 0, f"0_{sg}_{dc}_avail")
-            for dc in datacenters
-        }
-        for sg in ServerGeneration
+    previous = {}
+    for first, dc, sg, bought in runs:
+        if first > bought:
+            previous[(first, dc, sg, bought)] = last_run
+        last_run = alive[(first, dc, sg, bought)]
+    # Servers move between datacenters every `move_every` time-steps and
+    # keep their cohort, so they are charged the cost of moving instead of a
+    # new purchase. Only the arrivals are variables: a cohort cannot grow,
+    # so what it gains in some datacenters it loses in the others, which
+    # get_actions pairs up into moves
+    moves = {
+        (ts, dc, sg, bought): cp.new_int_var(
+            0, most(problem.dc_map[dc], sg), f"{ts}_{dc}_{sg}_{bought}_move"
+        )
+        for (ts, dc, sg, bought) in alive
+        if ts > bought and (ts - MIN_TS) % move_every == 0
     }
+    moving = defaultdict(list)
+    for ts, dc, sg, bought in moves:
+        moving[(ts, sg, bought)].append(dc)
+    for (ts, sg, bought), dcs in moving.items():
+        _ = cp.add(
+            sum(alive[(ts, dc, sg, bought)] for dc in dcs)
+            <= sum(previous[(ts, dc, sg, bought)] for dc in dcs)
+        )
 
-    for ts in supply:
-        if ts == 0:
+    cohorts = defaultdict(list)
+    for (ts, dc, sg, bought), var in alive.items():
+        for t in runs[(ts, dc, sg, bought)]:
+            cohorts[(t, sg, dc)].append(var)
+        if ts == bought:
+            _ = cp.add(var == buys[(ts, dc, sg)])
             continue
+        # Whatever is neither kept nor arrives is dismissed
+        arriving = moves.get((ts, dc, sg, bought), 0)
+        _ = cp.add(var <= previous[(ts, dc, sg, bought)] + arriving)
 
-        for server_generation in supply[ts]:
-            for dc in supply[ts][server_generation]:
-                # Find expired servers that were not dismissed
-                _ = cp.add(
-                    dismissed_servers[ts][server_generation][dc]
-                    == dismissed_servers[ts - 1][server_generation][dc]
-                    + action_model[ts][dc][server_generation][Action.DISMISS]
-                )
-                m = cp.new_int_var(0, INFINITY, f"{ts}_{server_generation}_{dc}_m")
-                if ts - sg_map[server_generation].life_expectancy >= 1:
-                    _ = cp.add_max_equality(
-                        m,
-                        [
-                            0,
-                            action_model[
-                                ts - sg_map[server_generation].life_expectancy
-                            ][dc][server_generation][Action.BUY]
-                            - dismissed_servers[ts - 1][server_generation][dc]
-                            + dismissed_servers[
-                                ts - sg_map[server_generation].life_expectancy - 1
-                            ][server_generation][dc],
-                        ],
-                    )
-                else:
-                    _ = cp.add(m == 0)
-                # Logic: we sum buy/sells for datacenters that match the sensitivity and subtract the sells
-                # We do this for all timesteps in the past
-                _ = cp.add(
-                    # Calculate current sum
-                    supply[ts][server_generation][dc]
-                    == action_model[ts][dc][server_generation][Action.BUY]
-                    # Take the previous timestep
-                    + supply[ts - 1][server_generation][dc]
-                    # Subtract dismissed servers
-                    - action_model[ts][dc][server_generation][Action.DISMISS]
-                    # Subtract the expired servers based on life expectancy
-                    - (m if ts > sg_map[server_generation].life_expectancy else 0)
-                )
-
-    energy_cost = cp.new_int_var(0, INFINITY, "energy_cost")
-    _ = cp.add(
-        energy_cost
-        == sum(
-            (
-                supply[ts][sg][dc]
-                * sg_map[sg].energy_consumption
-                * dc_map[dc].cost_of_energy
-            )
-            for ts in supply
-            for sg in supply[ts]
-            for dc in supply[ts][sg]
+    supply = {
+        (ts, sg, dc.datacenter_id): cp.new_int_var(
+            0,
+            most(dc, sg) if cohorts[(ts, sg, dc.datacenter_id)] else 0,
+            f"{ts}_{sg}_{dc.datacenter_id}_avail",
         )
-    )
+        for ts in range(MIN_TS, horizon + 1)
+        for sg in ServerGeneration
+        for dc in datacenters
+    }
+    for key, var in supply.items():
+        _ = cp.add(var == sum(cohorts[key]))
 
+    buying_cost = sum(
+        var * int(costs.purchase_price[g_index[sg]]) for (_, _, sg), var in buys.items()
+    )
+    moving_cost = sum(
+        var * int(costs.cost_of_moving[g_index[sg]])
+        for (_, _, sg, _), var in moves.items()
+    )
+    energy_cost = sum(
+        var * int(costs.energy[g_index[sg], d_index[dc]])
+        for (_, sg, dc), var in supply.items()
+    )
+    # The cohort gives the age of the servers and so their exact maintenance
     maintenance_cost = 0
+    for (first, dc, sg, bought), run in runs.items():
+        ages = slice(run.start - bought + 1, run.stop - bought + 1)
+        maintenance_cost += alive[(first, dc, sg, bought)] * int(
+            round(costs.maintenance[g_index[sg], ages].sum())
+        )
 
-    for ts in supply:
-        if ts == 0:
-            continue
+    for ts in range(MIN_TS, horizon + 1):
         for dc in datacenters:
             # Ensure we don't run out of slots on datacenters
             _ = cp.add(
                 sum(
-                    supply[ts][sg][dc.datacenter_id] * sg_map[sg].slots_size
-                    for sg in supply[ts]
+                    supply[(ts, sg, dc.datacenter_id)] * sg_map[sg].slots_size
+                    for sg in ServerGeneration
                 )
-                < dc_map[dc.datacenter_id].slots_capacity
+                < dc.slots_capacity
             )
 
-    # Calculate server utilization
-    # This is the ratio of demand to availability for server type (sensitivity + server generation)
-    revenues = {
-        ts: {
-            sg: {
-                sen: cp.new_int_var(0, INFINITY, f"{ts}_{sg}_{sen}_rev")
-                for sen in Sensitivity
-            }
-            for sg in ServerGeneration
-        }
-        for ts in supply
-    }
-    revenues[0] = {
-        sg: {sen: cp.new_int_var(0, 0, f"0_{sg}_{sen}_util") for sen in Sensitivity}
-        for sg in ServerGeneration
-    }
-    for ts in revenues:
-        if ts == 0:
-            continue
-
-        for sg in revenues[ts]:
-            maintenance_cost += sum(
-                supply[ts][sg][dc.datacenter_id] * sg_map[sg].average_maintenance_fee
-                for dc in datacenters
-            )
-            for sen in revenues[ts][sg]:
+    met_demand: dict[tuple[int, ServerGeneration, Sensitivity], cp_model.IntVar] = {}
+    served: dict[tuple[ServerGeneration, Sensitivity], float] = {}
+    revenue_cuts: dict[
+        tuple[int, ServerGeneration, Sensitivity], list[tuple[int, float]]
+    ] = {}
+    # Revenue is the price times the demand that is met. The objective pushes
+    # the met demand up, so bounding it by the demand and by the capacity is
+    # enough to make it the minimum of both.
+    total_revenue = 0
+    for ts in range(MIN_TS, horizon + 1):
+        for sg in ServerGeneration:
+            if ts < sg_map[sg].release_time[0]:
+                continue
+            for sen in Sensitivity:
                 total_availability = sum(
-                    (
-                        supply[ts][sg][dc.datacenter_id] * sg_map[sg].capacity
-                        if dc.latency_sensitivity == sen
-                        else 0
-                    )
+                    supply[(ts, sg, dc.datacenter_id)] * sg_map[sg].capacity
                     for dc in datacenters
+                    if dc.latency_sensitivity == sen
                 )
-                if ts < sg_map[sg].release_time[0]:
-                    _ = cp.add(revenues[ts][sg][sen] == 0)
-                    continue
-
                 # Get amount of demand that can be satisfied
-                m = cp.new_int_var(0, INFINITY, f"{ts}_{sg}_{sen}_m")
-                _ = cp.add_min_equality(
-                    m,
-                    [
-                        demand_map[ts].get(sg, {sen: 0})[sen],
-                        total_availability,
-                    ],  # Each server has *capacity* number of cpu/gpu that satisfies demand
+                m = cp.new_int_var(
+                    0,
+                    sum(
+                        most(dc, sg) * sg_map[sg].capacity
+                        for dc in datacenters
+                        if dc.latency_sensitivity == sen
+                    ),
+                    f"{ts}_{sg}_{sen}_m",
                 )
-                _ = cp.add_multiplication_equality(
-                    revenues[ts][sg][sen], [m, sp_map[sg][sen]]
+                _ = cp.add(m <= total_availability)
+                met_demand[(ts, sg, sen)] = m
+                if not pricing:
+                    total_revenue += m * sp_map[sg][sen]
+                    continue
+                # Meeting x times the demand d at the price p (1 + (x - 1) / e)
+                # earns p d (x (1 - 1 / e) + x^2 / e), which is concave as the
+                # elasticity e is negative and largest at x = (1 - e) / 2. The
+                # revenue is bounded by its tangents up to there.
+                p, e = sp_map[sg][sen], problem.elasticity_map[sg][sen]
+                served[(sg, sen)] = (1 - e) / 2
+                revenue = cp.new_int_var(
+                    0, int(m.Proto().domain[-1] * p * (1 - 1 / e)), f"{ts}_{sg}_{sen}_r"
                 )
+                cuts = []
+                for k in range(PRICE_CUTS):
+                    x = served[(sg, sen)] * k / (PRICE_CUTS - 1)
+                    cut = cp.add(revenue - int(p * (1 - 1 / e + 2 * x / e)) * m <= 0)
+                    cuts.append((cut.index, -p * x * x / e))
+                revenue_cuts[(ts, sg, sen)] = cuts
+                total_revenue += revenue
 
-    total_cost = cp.new_int_var(0, INFINITY, "total_cost")
-    _ = cp.add(total_cost == buying_cost + energy_cost + maintenance_cost)
-    total_revenue = sum(
-        revenues[ts][sg][sen]
-        for ts in revenues
-        for sg in revenues[ts]
-        for sen in revenues[ts][sg]
-    )
+    total_cost = buying_cost + energy_cost + maintenance_cost + moving_cost
     cp.maximize(total_revenue - total_cost)
 
+    return SupplyModel(
+        cp,
+        horizon,
+        {sg: server.life_expectancy for sg, server in sg_map.items()},
+        buys,
+        alive,
+        moves,
+        supply,
+        met_demand,
+        served,
+        revenue_cuts,
+    )
+
+
+def solve_supply(
+    demands: list[Demand],
+    datacenters: list[Datacenter],
+    selling_prices: list[SellingPrices],
+    servers: list[Server],
+    elasticity: list[Elasticity],
+    rolling: bool = False,
+    window: int = WINDOW,
+    overlap: int = OVERLAP,
+    time_limit: float = 60 * 30,
+    warm_start: bool = True,
+    gap_time_limit: float = 0,
+    workers: int = 0,
+    deadline: Deadline | None = None,
+    bucket: int = 0,
+    pricing: bool = False,
+    horizon: int = MAX_TS,
+    dismiss_every: int = DISMISS_EVERY,
+    move_every: int = MOVE_EVERY,
+):
+    """
+    Solves the whole horizon as one model, or with `rolling` as a sequence of
+    overlapping windows of `window` time-steps: each window is solved with the
+    decisions before it fixed, and its first `window - overlap` time-steps are
+    committed. `time_limit` is per window in that mode. With `warm_start`
+    the model, or the first window, is hinted with
+    `heuristics.Solver.heuristic_solve` and the next windows with the
+    previous one. When `gap_time_limit` is set the rolling solution is also
+    scored in the full model, which is then solved for that long to report
+    the objective gap.
+
+    A solve that finds no solution in its time, or a worse one, falls back
+    to the better of its hints and of keeping the servers it starts with
+    (see `solve_instance`). For a window, the hints are the plan of the
+    previous window, and the purchases are amortised over the part of the
+    life of the servers within the window (see `SupplyModel.instantiate`).
+
+    `workers` sets CP-SAT's number of search workers (0 lets it use every
+    core). `deadline` is a `time.time()` by which the solve has to finish;
+    the time left is shared evenly between the windows still to solve, so
+    windows that finish early hand their time to the next ones. It can also
+    be a function returning the deadline, which may move later while the
+    last solve runs: that solve is then stopped when the deadline passes
+    rather than given the time left when it starts.
+
+    With `bucket` (and without `rolling`) the model is first solved with
+    buys and moves only at the first time-step of every `bucket` time-steps,
+    then solved again with the decisions of each (datacenter, generation)
+    free at every time-step within a bucket of the coarse actions it took,
+    and fixed elsewhere. `gap_time_limit` reports the gap to the full model
+    there too.
+
+    With `pricing` the model chooses the demand to meet along with the
+    supply, and the prices are set from it (see `build_supply_model`).
+
+    With `horizon` only time-steps 1 to `horizon` are modelled and solved,
+    and the solution stops there.
+
+    `dismiss_every` and `move_every` coarsen the time-steps servers can be
+    dismissed and moved at, see `build_supply_model`.
+    """
+    problem = get_problem(demands, datacenters, selling_prices, servers, elasticity)
+    model = get_supply_model(problem, pricing, dismiss_every, move_every, horizon)
+    if bucket > 0 and not rolling:
+        values, supply = solve_coarse_to_fine(
+            problem, model, bucket, time_limit, workers, deadline, horizon
+        )
+        if gap_time_limit > 0:
+            report_gap(problem, model, values, gap_time_limit)
+        return extract_solution(problem, values, supply)
+    hints = get_heuristic_hints(problem, model) if warm_start else {}
+    if not rolling:
+        values, supply = solve_instance(
+            problem,
+            model,
+            horizon,
+            get_time_limit(time_limit, deadline, 1),
+            workers,
+            deadline,
+            hints=hints,
+            fallbacks=[keep_servers(model, hints, horizon)] if hints else [],
+        )
+        return extract_solution(problem, values, supply)
+
+    if not 0 <= overlap < window:
+        raise ValueError("The overlap must be shorter than the window.")
+    committed: dict[DecisionKey, int] = {}
+    values = {}
+    start = MIN_TS
+    while True:
+        end = min(start + window - 1, horizon)
+        windows_left = 1 + -(-(horizon - end) // (window - overlap))
+        # The previous window goes on as it was planned, or with the servers
+        # it committed only
+        values, supply = solve_instance(
+            problem,
+            model,
+            end,
+            get_time_limit(time_limit, deadline, windows_left),
+            workers,
+            deadline,
+            fixed=committed,
+            hints=hints,
+            fallbacks=[keep_servers(model, {**values, **committed}, end)],
+        )
+        last = end if end == horizon else end - overlap
+        print(f"Window {start}-{end}: committed up to {last}")
+        committed.update({k: v for k, v in values.items() if k[0] <= last})
+        if warm_start:
+            hints.update(values)
+        if end == horizon:
+            break
+        start = last + 1
+
+    if gap_time_limit > 0:
+        report_gap(problem, model, committed, gap_time_limit)
+    # The last window holds every time-step
+    return extract_solution(problem, values, supply)
+
+
+def solve_coarse_to_fine(
+    problem: Problem,
+    model: SupplyModel,
+    bucket: int,
+    time_limit: float,
+    workers: int,
+    deadline: Deadline | None,
+    horizon: int = MAX_TS,
+) -> tuple[dict[DecisionKey, int], dict[tuple[int, ServerGeneration, str], int]]:
+    decisions = model.decisions()
+    coarse = {
+        key: 0
+        for key in decisions
+        if key[1] in ("buy", "move") and (key[0] - MIN_TS) % bucket != 0
+    }
+    values, _ = solve_instance(
+        problem,
+        model,
+        horizon,
+        get_time_limit(time_limit, deadline, 2),
+        workers,
+        deadline,
+        fixed=coarse,
+    )
+
+    # Refine the (datacenter, generation) pairs around their coarse actions
+    refined: set[tuple[int, str, ServerGeneration]] = set()
+    for ts, dc, sg, _, _, src, _ in get_actions(values):
+        for t in range(max(ts - bucket + 1, MIN_TS), min(ts + bucket, MAX_TS + 1)):
+            refined.add((t, dc, sg))
+            if src is not None:
+                refined.add((t, src, sg))
+
+    def is_refined(key: DecisionKey) -> bool:
+        if key[1] == "met":
+            return True
+        return (key[0], key[2], key[3]) in refined
+
+    fixed = {key: v for key, v in values.items() if not is_refined(key)}
+    print(f"Refining {len(decisions) - len(fixed)} of {len(decisions)} decisions")
+    return solve_instance(
+        problem,
+        model,
+        horizon,
+        get_time_limit(time_limit, deadline, 1),
+        workers,
+        deadline,
+        fixed=fixed,
+        hints=values,
+        fallbacks=[values],
+    )
+
+
+def get_time_limit(time_limit: float, deadline: Deadline | None, solves_left: int):
+    if deadline is None:
+        return time_limit
+    if callable(deadline):
+        if solves_left == 1:
+            # solve_model stops it at the deadline, wherever it is by then
+            return time_limit
+        deadline = deadline()
+    return max(min(time_limit, (deadline - time.time()) / solves_left), 1)
+
+
+def get_model_size(cp: cp_model.CpModel) -> tuple[int, int]:
+    proto = cp.Proto()
+    return len(proto.variables), len(proto.constraints)
+
+
+def solve_instance(
+    problem: Problem,
+    model: SupplyModel,
+    horizon: int,
+    time_limit: float,
+    workers: int = 0,
+    deadline: Deadline | None = None,
+    fixed: dict[DecisionKey, int] | None = None,
+    hints: dict[DecisionKey, int] | None = None,
+    fallbacks: list[dict[DecisionKey, int]] | None = None,
+) -> tuple[dict[DecisionKey, int], dict[tuple[int, ServerGeneration, str], int]]:
+    """
+    Solves the model up to `horizon` with the `fixed` decisions and returns
+    the value of the decisions and of the supply, as `solve_model`. The
+    `fallbacks` are assignments of the decisions that satisfy `fixed` (see
+    `keep_servers`), scored in the same instance: the best of them is
+    returned if it beats the solution found in `time_limit`, or if there is
+    none. Keeping the servers of `fixed` is always one of them.
+    """
+    fixed = fixed or {}
+    best = solve_model(
+        model.instantiate(problem.demand_map, horizon, fixed, hints),
+        model,
+        time_limit,
+        workers,
+        horizon,
+        deadline,
+    )
+    fallbacks = (fallbacks or []) + [keep_servers(model, fixed, horizon)]
+    for i, fallback in enumerate(fallbacks):
+        if fallback in fallbacks[:i]:
+            continue
+        # Every decision is fixed, which presolve settles
+        candidate = solve_model(
+            model.instantiate(problem.demand_map, horizon, fallback),
+            model,
+            max(time_limit, 1),
+            workers,
+            horizon,
+        )
+        if candidate is not None and (best is None or candidate[2] > best[2]):
+            print("Falling back to an objective of", candidate[2])
+            best = candidate
+    if best is None:
+        raise Exception("No solution found")
+    return best[0], best[1]
+
+
+def keep_servers(
+    model: SupplyModel, values: dict[DecisionKey, int], horizon: int
+) -> dict[DecisionKey, int]:
+    """
+    `values` completed up to `horizon` by buying and moving nothing more and
+    keeping every server until it ages out. This is feasible whenever
+    `values` is the solution of a shorter horizon, as the datacenters only
+    ever hold the same servers or fewer.
+    """
+    assignment: dict[DecisionKey, int] = {}
+    kept: dict[tuple[str, ServerGeneration, int], int] = {}
+    for key in model.decisions():
+        if key[0] > horizon or key[1] == "met":
+            continue
+        if key in values:
+            assignment[key] = values[key]
+        elif key[1] == "alive":
+            ts, _, dc, sg, bought = key
+            # The runs of a cohort come in time order
+            if ts == bought:
+                assignment[key] = assignment[(ts, "buy", dc, sg)]
+            else:
+                assignment[key] = kept[(dc, sg, bought)]
+        else:
+            assignment[key] = 0
+        if key[1] == "alive":
+            kept[key[2:]] = assignment[key]
+    return assignment
+
+
+def solve_model(
+    cp: cp_model.CpModel,
+    model: SupplyModel,
+    time_limit: float,
+    workers: int = 0,
+    horizon: int = MAX_TS,
+    deadline: Deadline | None = None,
+) -> (
+    tuple[dict[DecisionKey, int], dict[tuple[int, ServerGeneration, str], int], float]
+    | None
+):
+    """
+    Solves an instance of the model (see `SupplyModel.instantiate`) and
+    returns the value of the decisions and of the supply up to `horizon`,
+    and the objective, or None if no solution was found in `time_limit`.
+    A `deadline` function also stops the search once its deadline passes.
+    """
+    from ortools.sat.python import cp_model
+
+    print("Model size: %d variables, %d constraints" % get_model_size(cp))
     solver = cp_model.CpSolver()
-    solver.parameters.max_time_in_seconds = 60 * 30
-    status = solver.solve(cp)
+    solver.parameters.max_time_in_seconds = time_limit
+    solver.parameters.num_workers = workers
+    # Hints only cover some decisions, let CP-SAT complete and repair them
+    solver.parameters.repair_hint = True
+    if callable(deadline):
+        solved = threading.Event()
+
+        def watch():
+            while not solved.wait(0.5):
+                if time.time() >= deadline():
+                    solver.stop_search()
+                    return
+
+        watcher = threading.Thread(target=watch, daemon=True)
+        watcher.start()
+        status = solver.solve(cp)
+        solved.set()
+        watcher.join()
+    else:
+        status = solver.solve(cp)
     if (
         status == cp_model.OPTIMAL  # type: ignore[reportUnnecessaryComparison]
         or status == cp_model.FEASIBLE  # type: ignore[reportUnnecessaryComparison]
     ):
         print("Time:", solver.UserTime())
         print("Status:", solver.status_name(status))
-        supply_map = create_supply_map()
-        for ts, sg, dc in itertools.product(
-            range(MIN_TS, MAX_TS + 1), ServerGeneration, datacenters
-        ):
-            supply_map[sg.value][dc.latency_sensitivity.value][ts] += (
-                solver.value(supply[ts][sg][dc.datacenter_id]) * sg_map[sg].capacity
-            )
-        solution: list[SolutionEntry] = []
-        for ts in action_model:
-            for dc in action_model[ts]:
-                for sg in action_model[ts][dc]:
-                    for act in action_model[ts][dc][sg]:
-                        solution.append(
-                            SolutionEntry(
-                                ts,
-                                dc,
-                                sg,
-                                act,
-                                solver.value(action_model[ts][dc][sg][act]),
-                            )
-                        )
-        prices: list[PriceEntry] = []
-        for ts in range(MIN_TS, MAX_TS + 1):
-            for sen in Sensitivity:
-                for sg in ServerGeneration:
-                    price = int(
-                        price_from_supply(
-                            demand_map[ts].get(sg, {sen: 0})[sen],
-                            sp_map[sg][sen],
-                            supply_map[sg.value][sen.value][ts],
-                            elasticity_map[sg][sen],
-                        )
+        print("Objective:", solver.objective_value)
+        return (
+            {
+                key: solver.value(var)
+                for key, var in model.decisions().items()
+                if key[0] <= horizon
+            },
+            {key: solver.value(var) for key, var in model.supply.items()},
+            solver.objective_value,
+        )
+    print(solver.status_name(status))
+    print(solver.solution_info())
+    return None
+
+
+def dismiss_oldest(cohorts: dict[int, int], amount: int) -> int:
+    """Dismisses up to `amount` servers of the oldest `cohorts`, by bought at."""
+    dismissed = 0
+    for bought in sorted(cohorts):
+        n = min(max(amount - dismissed, 0), cohorts[bought])
+        cohorts[bought] -= n
+        dismissed += n
+    return dismissed
+
+
+def get_heuristic_hints(problem: Problem, model: SupplyModel) -> dict[DecisionKey, int]:
+    """
+    A feasible assignment of every decision of the model that follows the
+    supply of the heuristic solver from below: servers are bought when it
+    grows and the oldest are dismissed when it shrinks, at the time-steps
+    the model can dismiss at, and the datacenters keep a free slot.
+    """
+    # Imported here as only the warm start needs the heuristic
+    from heuristics import Solver
+
+    availability = Solver(
+        [],
+        problem.demand_map,
+        problem.sg_map,
+        problem.dc_map,
+        problem.sp_map,
+    ).heuristic_solve()
+    # The cohorts with a run starting at every time-step
+    starts: defaultdict[tuple[int, str, ServerGeneration], list[int]] = defaultdict(
+        list
+    )
+    for first, dc, sg, bought in model.alive:
+        starts[(first, dc, sg)].append(bought)
+    dismissals = sorted(
+        {first for first, _, _, bought in model.alive if first > bought}
+    )
+
+    hints: dict[DecisionKey, int] = {}
+    # Servers of every (datacenter_id, server_generation) by time-step bought
+    counts: defaultdict[tuple[str, ServerGeneration], dict[int, int]] = defaultdict(
+        dict
+    )
+    for ts in range(MIN_TS, model.horizon + 1):
+        # Counts hold until the next time-step servers can be dismissed at
+        end = next((t for t in dismissals if t > ts), model.horizon + 1)
+        for dc in problem.datacenters:
+            free = dc.slots_capacity - 1
+            cohorts: dict[ServerGeneration, dict[int, int]] = {}
+            targets: dict[ServerGeneration, int] = {}
+            for sg in ServerGeneration:
+                life = problem.sg_map[sg].life_expectancy
+                cohorts[sg] = {
+                    bought: n
+                    for bought, n in counts[(dc.datacenter_id, sg)].items()
+                    if ts < bought + life
+                }
+                counts[(dc.datacenter_id, sg)] = cohorts[sg]
+                targets[sg] = min(
+                    availability[t][dc.datacenter_id][sg] for t in range(ts, end)
+                )
+                if ts in dismissals:
+                    dismiss_oldest(cohorts[sg], sum(cohorts[sg].values()) - targets[sg])
+                free -= sum(cohorts[sg].values()) * problem.sg_map[sg].slots_size
+            for sg in ServerGeneration:
+                size = problem.sg_map[sg].slots_size
+                if ts in dismissals and free < 0:
+                    # The heuristic can fill a datacenter to the last slot
+                    free += dismiss_oldest(cohorts[sg], -(free // size)) * size
+                if (ts, dc.datacenter_id, sg) in model.buys:
+                    amount = min(
+                        max(targets[sg] - sum(cohorts[sg].values()), 0),
+                        max(free, 0) // size,
+                    )
+                    cohorts[sg][ts] = amount
+                    free -= amount * size
+                    hints[(ts, "buy", dc.datacenter_id, sg)] = amount
+                for bought in starts[(ts, dc.datacenter_id, sg)]:
+                    hints[(ts, "alive", dc.datacenter_id, sg, bought)] = cohorts[
+                        sg
+                    ].get(bought, 0)
+    return keep_servers(model, hints, model.horizon)
+
+
+def report_gap(
+    problem: Problem,
+    model: SupplyModel,
+    decisions: dict[DecisionKey, int],
+    time_limit: float,
+):
+    """Prints the gap between `decisions` and the full model solved from them."""
+    from ortools.sat.python import cp_model
+
+    solver = cp_model.CpSolver()
+    _ = solver.solve(model.instantiate(problem.demand_map, fixed=decisions))
+    objective = solver.objective_value
+
+    solver = cp_model.CpSolver()
+    solver.parameters.max_time_in_seconds = time_limit
+    _ = solver.solve(model.instantiate(problem.demand_map, hints=decisions))
+    bound = solver.best_objective_bound
+    best = max(objective, solver.objective_value)
+    print("Solution objective:", objective)
+    print("Full model objective:", best, "bound:", bound)
+    print("Gap to full model:", (bound - objective) / max(abs(bound), 1))
+
+
+def extract_solution(
+    problem: Problem,
+    values: dict[DecisionKey, int],
+    supply: dict[tuple[int, ServerGeneration, str], int],
+):
+    demand_map = problem.demand_map
+    sp_map = problem.sp_map
+    elasticity_map = problem.elasticity_map
+    sg_map = problem.sg_map
+    datacenters = problem.datacenters
+    supply_map = create_supply_map()
+    for ts, sg, dc in itertools.product(
+        range(MIN_TS, MAX_TS + 1), ServerGeneration, datacenters
+    ):
+        supply_map[sg.value][dc.latency_sensitivity.value][ts] += (
+            supply.get((ts, sg, dc.datacenter_id), 0) * sg_map[sg].capacity
+        )
+    solution = [SolutionEntry(*action) for action in get_actions(values)]
+    # In pricing mode the price sells the demand the model chose to meet
+    met = {
+        (key[0], key[2], key[3]): amount
+        for key, amount in values.items()
+        if key[1] == "met"
+    }
+    prices: list[PriceEntry] = []
+    for ts in range(MIN_TS, MAX_TS + 1):
+        for sen in Sensitivity:
+            for sg in ServerGeneration:
+                price = int(
+                    price_from_supply(
+                        demand_map[ts].get(sg, {sen: 0})[sen],
+                        sp_map[sg][sen],
+                        met.get((ts, sg, sen), supply_map[sg.value][sen.value][ts]),
+                        elasticity_map[sg][sen],
                     )
-                    if price == 0:
-                        continue
-                    prices.append(
-                        PriceEntry(
-                            ts,
-                            sg,
-                            sen,
-                            price,
-                        )
+                )
+                if price == 0 and (ts, sg, sen) in met:
+                    # Prices carry over to the next time-steps in the
+                    # evaluator, so go back to the base price
+                    price = sp_map[sg][sen]
+                if price == 0:
+                    continue
+                prices.append(
+                    PriceEntry(
+                        ts,
+                        sg,
+                        sen,
+                        price,
                     )
-        return supply_map, solution, prices
-    else:
-        print(solver.status_name(status))
-        print(solver.solution_info())
-        print(solver.response_stats())
-        raise Exception("No solution found")
+                )
+    return supply_map, solution, prices
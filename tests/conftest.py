@@ -0,0 +1,48 @@
+import os
+import sys
+import tempfile
+
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+import evaluation  # noqa: E402
+
+# Keep the evaluation logs out of the tracked logs.log
+evaluation.LOG_FILE = os.path.join(tempfile.gettempdir(), "evaluation_tests.log")
+
+
+@pytest.fixture(autouse=True)
+def in_root(monkeypatch):
+    # The data directory and the scenario cache are relative to the root
+    monkeypatch.chdir(ROOT)
+
+
+@pytest.fixture
+def data():
+    from utils import load_problem_data
+
+    return load_problem_data()
+
+
+@pytest.fixture
+def cohorts(data):
+    # A feasible fleet of 300 servers with moves, in cohort form
+    import bench
+
+    return bench.synthetic_cohorts(300, data[2], data[1], seed=1)
+
+
+@pytest.fixture
+def fleet(data, cohorts):
+    from cohorts import expand_cohorts
+
+    return expand_cohorts(cohorts, data[2])
+
+
+@pytest.fixture
+def pricing_strategy(data):
+    import bench
+
+    return bench.synthetic_pricing(data[3], seed=1)
@@ -0,0 +1,37 @@
+import pytest
+
+from cohorts import cohorts_to_batches, expand_cohorts
+from evaluation import evaluation_function
+from utils import load_solution, save_solution
+
+
+@pytest.mark.parametrize("engine", ["dataframe", "array"])
+def test_cohorts_agree_with_servers(data, cohorts, fleet, pricing_strategy, engine):
+    scores = [
+        evaluation_function(
+            f.copy(), pricing_strategy.copy(), *data, seed=2381, engine=engine
+        )
+        for f in [cohorts, fleet]
+    ]
+    assert scores[0] is not None
+    assert scores[0] == pytest.approx(scores[1], rel=1e-12)
+
+
+def test_batches_keep_every_server(data, cohorts, fleet):
+    batches = cohorts_to_batches(cohorts, data[2])
+    bought = cohorts.loc[cohorts["action"] == "buy", "count"].sum()
+    assert sum(b.count for b in batches) == bought
+    assert (fleet["action"] == "buy").sum() == bought
+    assert fleet["server_id"][fleet["action"] == "buy"].is_unique
+
+
+def test_json_export_expands_cohorts(data, cohorts, pricing_strategy, tmp_path):
+    path = str(tmp_path / "solution.json")
+    save_solution(cohorts, pricing_strategy, path, servers=data[2])
+    fleet, _ = load_solution(path)
+    assert len(fleet) == len(expand_cohorts(cohorts, data[2]))
+    scores = [
+        evaluation_function(f, pricing_strategy.copy(), *data, seed=1, engine="array")
+        for f in [cohorts, fleet]
+    ]
+    assert scores[0] == pytest.approx(scores[1], rel=1e-12)
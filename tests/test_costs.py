@@ -0,0 +1,39 @@
+import numpy as np
+import pytest
+
+from costs import get_cost_tables
+from evaluation import calculate_server_cost, get_known
+
+
+@pytest.fixture
+def tables(data):
+    return get_cost_tables(data[2], data[1])
+
+
+def test_step_costs_match_calculate_server_cost(data, tables):
+    servers = data[2].set_index("server_generation")
+    datacenters = data[1].set_index("datacenter_id")
+    for g, sg in enumerate(get_known("server_generation")):
+        for d, dc in enumerate(tables.datacenters):
+            row = {
+                **servers.loc[sg].to_dict(),
+                "cost_of_energy": datacenters.loc[dc, "cost_of_energy"],
+            }
+            for age in range(1, int(tables.life_expectancy[g]) + 1):
+                for moved in [0, 1]:
+                    expected = calculate_server_cost(
+                        {**row, "lifespan": age, "moved": moved}
+                    )
+                    cost = tables.interval_cost(g, d, age, age, moved and age > 1)
+                    assert cost == pytest.approx(expected, rel=1e-12)
+
+
+def test_cumulative_costs(tables):
+    g, d = 3, 2
+    life = tables.life_expectancy[g]
+    assert tables.lifetime_cost(g, d) == pytest.approx(tables.step[g, d].sum())
+    assert tables.interval_cost(g, d, 1, life) == pytest.approx(
+        tables.lifetime_cost(g, d)
+    )
+    # No cost past the life expectancy
+    assert np.all(tables.step[g, d, life + 1 :] == 0)
@@ -0,0 +1,23 @@
+import numpy as np
+from scipy.stats import truncweibull_min
+
+from evaluation import get_failure_rates
+
+
+def test_failure_rates_match_scipy():
+    np.random.seed(2381)
+    expected = truncweibull_min.rvs(0.3, 0.05, 0.1, size=1000)
+    np.random.seed(2381)
+    assert np.array_equal(get_failure_rates(1000), expected)
+
+
+def test_failure_rates_in_range():
+    f = get_failure_rates(10_000, np.random.default_rng(0))
+    assert ((f >= 0.05) & (f <= 0.1)).all()
+
+
+def test_single_draws_follow_the_same_sequence():
+    np.random.seed(1)
+    expected = [truncweibull_min.rvs(0.3, 0.05, 0.1, size=1).item() for _ in range(5)]
+    np.random.seed(1)
+    assert [get_failure_rates(1).item() for _ in range(5)] == expected
@@ -0,0 +1,20 @@
+import csv
+
+import pytest
+
+from evaluation_trace import CsvTraceWriter
+
+
+def test_csv_trace_extra_columns(tmp_path):
+    path = tmp_path / "trace.csv"
+    with CsvTraceWriter(str(path), extra={"seed": None}) as trace:
+        for seed in [1, 2]:
+            trace.extra = {"seed": seed}
+            trace({"time_step": 1, "P": 1.5})
+        trace.extra = {"seed": 3, "solution": "a"}
+        with pytest.raises(ValueError):
+            trace({"time_step": 1, "P": 1.5})
+    with open(path, newline="") as f:
+        rows = list(csv.DictReader(f))
+    assert [row["seed"] for row in rows] == ["1", "2"]
+    assert list(rows[0]) == ["seed", "time_step", "P"]
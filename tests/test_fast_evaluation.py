@@ -0,0 +1,24 @@
+import pytest
+
+from evaluation import evaluation_function
+
+# The failure rates are drawn in an order that depends on string hashing, so
+# the engines are only compared within one process, where it is the same
+
+SEEDS = [2381, 5351]
+
+
+@pytest.mark.parametrize("seed", SEEDS)
+def test_engines_agree(data, fleet, pricing_strategy, seed):
+    scores = [
+        evaluation_function(
+            fleet.copy(),
+            pricing_strategy.copy(),
+            *(d.copy() for d in data),
+            seed=seed,
+            engine=engine,
+        )
+        for engine in ["dataframe", "array"]
+    ]
+    assert scores[0] is not None
+    assert scores[1] == pytest.approx(scores[0], rel=1e-12)
@@ -0,0 +1,84 @@
+from dataclasses import replace
+
+import numpy as np
+import pytest
+
+from cohorts import Batch
+from evaluation import evaluation_function
+from incremental import IncrementalEvaluator
+from scenario import get_scenario
+
+STATE = [
+    "count",
+    "capacity",
+    "slots",
+    "energy_cost",
+    "maintenance_cost",
+    "purchase_cost",
+    "moving_cost",
+    "revenue",
+]
+
+
+@pytest.fixture
+def evaluator(data, cohorts, pricing_strategy):
+    scenario = get_scenario(2381, data[0], cache_dir=None)
+    return IncrementalEvaluator.from_solution(
+        cohorts, pricing_strategy, *data, scenario=scenario
+    )
+
+
+def rebuild(evaluator, data):
+    return IncrementalEvaluator(
+        list(evaluator.batches.values()),
+        evaluator.demand,
+        evaluator.prices,
+        evaluator.failure_rates,
+        data[2],
+        data[1],
+    )
+
+
+def test_initial_score(data, cohorts, pricing_strategy, evaluator):
+    scenario = get_scenario(2381, data[0], cache_dir=None)
+    score = evaluation_function(
+        cohorts, pricing_strategy, *data, engine="array", scenario=scenario
+    )
+    assert evaluator.score() == pytest.approx(score, rel=1e-12)
+
+
+def test_apply_delta_matches_rebuild(data, evaluator):
+    before = evaluator.score()
+    ids = list(evaluator.batches)
+    first, second = evaluator.batches[ids[0]], evaluator.batches[ids[1]]
+    edits = {
+        ids[0]: None,
+        ids[1]: replace(second, count=second.count + 2),
+        evaluator.next_id: Batch(
+            first.generation, 0, first.buy, first.end, 3, moves=((first.end, 1),)
+        ),
+    }
+    if first.end == first.buy:
+        edits[evaluator.next_id] = replace(edits[evaluator.next_id], moves=())
+    undo = evaluator.apply_delta(edits)
+
+    full = rebuild(evaluator, data)
+    assert full.feasible()
+    for name in STATE:
+        assert np.allclose(getattr(evaluator, name), getattr(full, name)), name
+    assert evaluator.score() == pytest.approx(full.score(), rel=1e-12)
+
+    evaluator.apply_delta(undo)
+    assert evaluator.score() == pytest.approx(before, rel=1e-12)
+
+
+def test_slots_overflow_is_infeasible(data, evaluator):
+    before = evaluator.score()
+    batch = next(iter(evaluator.batches.values()))
+    capacity = int(evaluator.slots_capacity[batch.datacenter])
+    undo = evaluator.apply_delta(
+        {evaluator.next_id: replace(batch, count=capacity, moves=())}
+    )
+    assert evaluator.score() is None
+    evaluator.apply_delta(undo)
+    assert evaluator.score() == pytest.approx(before, rel=1e-12)
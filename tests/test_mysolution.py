@@ -0,0 +1,48 @@
+import json
+import time
+
+import pytest
+
+import mysolution
+
+# Where the fake solve_seed writes, set before the pool forks
+OUT = None
+
+
+def fake_solve_seed(seed, deadline, *args):
+    if seed == 2:
+        raise ValueError("no solution")
+    if seed == 4:
+        first = deadline()
+        time.sleep(2)
+        with open(OUT / "deadlines.json", "w") as f:
+            json.dump([first, deadline()], f)
+    return seed
+
+
+@pytest.fixture
+def pool(monkeypatch, tmp_path):
+    global OUT
+    OUT = tmp_path
+    monkeypatch.setattr(mysolution, "solve_seed", fake_solve_seed)
+    monkeypatch.setattr(mysolution, "get_supply_model", lambda *a, **k: None)
+    return tmp_path
+
+
+def test_a_failing_seed_is_reported(pool):
+    results = dict(mysolution.solve_seeds([1, 2, 3], 60, cores=1))
+    assert results.keys() == {1, 2, 3}
+    assert results[1] is None and results[3] is None
+    assert isinstance(results[2], ValueError)
+
+
+def test_finished_seeds_give_their_time(pool):
+    start = time.time()
+    results = dict(mysolution.solve_seeds([4, 1, 3], 100, cores=2))
+    assert set(results.values()) == {None}
+    with open(pool / "deadlines.json") as f:
+        first, last = json.load(f)
+    # Seed 4 starts with half of the budget, and gets all of it once seed 1
+    # has finished and seed 3 can run alongside it
+    assert first == pytest.approx(start + 50, abs=1)
+    assert last == pytest.approx(start + 100, abs=1)
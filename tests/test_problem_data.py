@@ -0,0 +1,33 @@
+import json
+
+import numpy as np
+import pytest
+
+from evaluation import get_known
+from problem_data import get_datacenter_arrays, get_frame_cost_tables, get_server_arrays
+
+
+def test_lookups_are_shared_by_content(data):
+    datacenters, servers = data[1], data[2]
+    assert get_server_arrays(servers) is get_server_arrays(servers.copy())
+    assert get_datacenter_arrays(datacenters) is get_datacenter_arrays(
+        datacenters.copy()
+    )
+    assert get_frame_cost_tables(servers, datacenters) is get_frame_cost_tables(
+        servers.copy(), datacenters.copy()
+    )
+    changed = servers.copy()
+    changed.loc[0, "purchase_price"] += 1
+    assert get_server_arrays(changed) is not get_server_arrays(servers)
+
+
+def test_server_arrays(data):
+    servers = data[2].set_index("server_generation")
+    s = get_server_arrays(data[2])
+    for g, generation in enumerate(get_known("server_generation")):
+        window = json.loads(servers.loc[generation, "release_time"])
+        assert [s["release_start"][g], s["release_end"][g]] == window
+        assert s["capacity"][g] == servers.loc[generation, "capacity"]
+    with pytest.raises(ValueError):
+        s["capacity"][0] = 0
+    assert np.all(get_datacenter_arrays(data[1])["slots_capacity"] > 0)
@@ -0,0 +1,42 @@
+import pytest
+
+import evaluation
+from evaluation import evaluation_function
+
+
+@pytest.mark.parametrize("engine", ["dataframe", "array"])
+def test_profile_keeps_the_score(data, fleet, pricing_strategy, engine):
+    score = evaluation_function(
+        fleet.copy(), pricing_strategy.copy(), *data, seed=1, engine=engine
+    )
+    profiled, profile = evaluation_function(
+        fleet.copy(),
+        pricing_strategy.copy(),
+        *data,
+        seed=1,
+        engine=engine,
+        profile=True
+    )
+    assert profiled == score
+    assert profile["stages"]["fleet_data_preparation"]["calls"] == 1
+    assert all(stage["time"] >= 0 for stage in profile["stages"].values())
+    assert profile["time"] > 0
+    assert profile["peak_memory"] is None
+    assert evaluation.PROFILE is None
+
+
+def test_profile_memory(data, fleet, pricing_strategy):
+    _, profile = evaluation_function(
+        fleet, pricing_strategy, *data, seed=1, engine="array", profile="memory"
+    )
+    assert profile["peak_memory"] > 0
+    assert "compile_fleet" in profile["stages"]
+
+
+def test_profile_of_a_failed_evaluation(data, pricing_strategy):
+    score, profile = evaluation_function(
+        data[0], pricing_strategy, *data, seed=1, engine="array", profile=True
+    )
+    assert score is None
+    assert evaluation.PROFILE is None
+    assert profile["time"] > 0
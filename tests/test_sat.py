@@ -0,0 +1,224 @@
+import time
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from constants import (
+    get_datacenters,
+    get_demand,
+    get_elasticity,
+    get_selling_prices,
+    get_servers,
+)
+from evaluation import evaluation_function, get_known
+from generate import generate_pricing, generate_solution
+from solver import sat
+from solver.lp import solve_supply_lp
+from solver.models import Action, ServerGeneration
+
+SEED = 2381
+# Short horizons keep the smoke tests to seconds
+HORIZON = 36
+
+
+@pytest.fixture
+def problem():
+    np.random.seed(SEED)
+    return (
+        get_demand(),
+        get_datacenters(),
+        get_selling_prices(),
+        get_servers(),
+        get_elasticity(),
+    )
+
+
+def evaluate(data, solution, prices):
+    """The score of a solution of `sat.solve_supply` in the evaluator."""
+    fleet = pd.DataFrame(generate_solution(solution, get_servers()))
+    pricing_strategy = pd.DataFrame(
+        generate_pricing(prices), columns=get_known("price_strategy_columns")
+    )
+    return evaluation_function(
+        fleet, pricing_strategy, *data, seed=SEED, engine="array"
+    )
+
+
+def test_cohort_runs(problem):
+    p = sat.get_problem(*problem)
+    runs = sat.get_cohort_runs(p, dismiss_every=6)
+    lives = {}
+    for (first, dc, sg, bought), run in runs.items():
+        assert run.start == first
+        assert first == bought or (first - sat.MIN_TS) % 6 == 0
+        lives.setdefault((dc, sg, bought), []).append(run)
+    for (dc, sg, bought), cohort in lives.items():
+        steps = [ts for run in cohort for ts in run]
+        last = min(bought + p.sg_map[sg].life_expectancy - 1, sat.MAX_TS)
+        assert steps == list(range(bought, last + 1))
+
+
+def test_moves_pair_gains_with_losses():
+    sg = ServerGeneration.CPU_S1
+    values = {
+        (1, "buy", "DC1", sg): 5,
+        (1, "alive", "DC1", sg, 1): 5,
+        (1, "alive", "DC2", sg, 1): 0,
+        (1, "alive", "DC3", sg, 1): 0,
+        (25, "alive", "DC1", sg, 1): 1,
+        (25, "alive", "DC2", sg, 1): 2,
+        (25, "alive", "DC3", sg, 1): 1,
+        (25, "move", "DC1", sg, 1): 0,
+        (25, "move", "DC2", sg, 1): 2,
+        (25, "move", "DC3", sg, 1): 1,
+        (31, "alive", "DC1", sg, 1): 1,
+        (31, "alive", "DC2", sg, 1): 1,
+        (31, "alive", "DC3", sg, 1): 1,
+    }
+    assert sorted(sat.get_actions(values), key=str) == sorted(
+        [
+            (1, "DC1", sg, Action.BUY, 5, None, None),
+            (25, "DC2", sg, Action.MOVE, 2, "DC1", 1),
+            (25, "DC3", sg, Action.MOVE, 1, "DC1", 1),
+            (25, "DC1", sg, Action.DISMISS, 1, None, 1),
+            (31, "DC2", sg, Action.DISMISS, 1, None, 1),
+        ],
+        key=str,
+    )
+
+
+def test_moves_are_arrivals(problem):
+    model = sat.get_supply_model(sat.get_problem(*problem))
+    on_move_steps = [
+        key
+        for key in model.alive
+        if key[0] > key[3] and (key[0] - sat.MIN_TS) % sat.MOVE_EVERY == 0
+    ]
+    assert set(model.moves) == set(on_move_steps)
+
+
+def test_instances_are_patched_back(problem):
+    p = sat.get_problem(*problem)
+    model = sat.get_supply_model(p)
+    decisions = model.decisions()
+    assert model.decisions() is decisions
+    first = model.instantiate(p.demand_map).Proto().SerializeToString()
+    key = next(key for key in decisions if key[1] == "buy")
+    instance = model.instantiate(
+        p.demand_map, HORIZON, fixed={key: 1}, hints={(2,) + key[1:]: 1}
+    )
+    assert instance.Proto().solution_hint.vars
+    assert model.instantiate(p.demand_map) is instance
+    assert instance.Proto().SerializeToString() == first
+
+
+def test_short_horizon_model(problem):
+    model = sat.get_supply_model(sat.get_problem(*problem), horizon=HORIZON)
+    assert model.horizon == HORIZON
+    assert max(key[0] for key in model.decisions()) == HORIZON
+    assert max(key[0] for key in model.supply) == HORIZON
+
+
+def test_keep_servers(problem):
+    p = sat.get_problem(*problem)
+    model = sat.get_supply_model(p, horizon=HORIZON)
+    buy = (1, "buy", "DC1", ServerGeneration.CPU_S1)
+    assignment = sat.keep_servers(model, {buy: 2}, HORIZON)
+    for key, value in assignment.items():
+        if key[1] == "alive" and key[2:] == ("DC1", ServerGeneration.CPU_S1, 1):
+            assert value == 2
+        else:
+            assert value == (2 if key == buy else 0)
+    solved = sat.solve_model(
+        model.instantiate(p.demand_map, fixed=assignment), model, 10, 1, HORIZON
+    )
+    assert solved is not None
+    assert solved[0] == assignment
+
+
+def test_heuristic_hints(problem):
+    p = sat.get_problem(*problem)
+    model = sat.get_supply_model(p, horizon=HORIZON)
+    hints = sat.get_heuristic_hints(p, model)
+    assert any(value for key, value in hints.items() if key[1] == "buy")
+    solved = sat.solve_model(
+        model.instantiate(p.demand_map, fixed=hints), model, 10, 1, HORIZON
+    )
+    assert solved is not None
+    assert solved[0] == hints
+
+
+def test_rolling(data, problem):
+    _, solution, prices = sat.solve_supply(
+        *problem,
+        rolling=True,
+        window=24,
+        overlap=12,
+        time_limit=5,
+        workers=1,
+        horizon=HORIZON,
+    )
+    assert solution
+    assert evaluate(data, solution, prices) is not None
+
+
+def test_full_model(data, problem):
+    _, solution, prices = sat.solve_supply(
+        *problem, time_limit=20, workers=1, horizon=HORIZON
+    )
+    assert solution
+    assert all(entry.timestep <= HORIZON for entry in solution)
+    assert evaluate(data, solution, prices) is not None
+
+
+def test_deadline_function(data, problem):
+    start = time.time()
+    _, solution, prices = sat.solve_supply(
+        *problem,
+        time_limit=600,
+        workers=1,
+        horizon=HORIZON,
+        deadline=lambda: start + 5,
+    )
+    assert time.time() - start < 20
+    assert evaluate(data, solution, prices) is not None
+
+
+def test_passed_deadline_stops_the_search(problem):
+    p = sat.get_problem(*problem)
+    model = sat.get_supply_model(p)
+    start = time.time()
+    sat.solve_model(model.instantiate(p.demand_map), model, 600, 1, deadline=lambda: 0)
+    assert time.time() - start < 10
+
+
+@pytest.mark.parametrize("pricing", [False, True])
+def test_lp(data, problem, pricing):
+    _, solution, prices = solve_supply_lp(*problem, pricing=pricing)
+    assert solution
+    assert evaluate(data, solution, prices) is not None
+
+
+def test_tight_linear_model(problem):
+    model = sat.get_supply_model(sat.get_problem(*problem))
+    proto = model.cp.Proto()
+    assert max(v.domain[-1] for v in proto.variables) < 2**31
+    assert {c.WhichOneof("constraint") for c in proto.constraints} == {"linear"}
+
+
+def test_coarse_to_fine(data, problem):
+    _, solution, prices = sat.solve_supply(
+        *problem, bucket=12, time_limit=10, workers=1, horizon=HORIZON
+    )
+    assert solution
+    assert evaluate(data, solution, prices) is not None
+
+
+def test_pricing(data, problem):
+    _, solution, prices = sat.solve_supply(
+        *problem, pricing=True, time_limit=10, workers=1, horizon=HORIZON
+    )
+    assert solution
+    assert prices
+    assert evaluate(data, solution, prices) is not None
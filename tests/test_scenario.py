@@ -0,0 +1,42 @@
+import numpy as np
+import pytest
+
+from evaluation import evaluation_function
+from scenario import get_scenario, make_scenario
+
+
+@pytest.mark.parametrize("seed", [2381, 5351])
+def test_scenario_matches_seed(data, fleet, pricing_strategy, tmp_path, seed):
+    by_seed = evaluation_function(
+        fleet.copy(), pricing_strategy.copy(), *data, seed=seed, engine="array"
+    )
+    # Made, then stored, then loaded from the cache
+    for cache_dir in [None, str(tmp_path), str(tmp_path)]:
+        scenario = get_scenario(seed, data[0], cache_dir=cache_dir)
+        by_scenario = evaluation_function(
+            fleet.copy(),
+            pricing_strategy.copy(),
+            *data,
+            engine="array",
+            scenario=scenario,
+        )
+        assert by_scenario == by_seed
+
+
+def test_cache_holds_only_complete_files(data, tmp_path):
+    scenario = get_scenario(1, data[0], cache_dir=str(tmp_path))
+    (path,) = tmp_path.iterdir()
+    assert path.suffix == ".npz"
+    made = make_scenario(1, data[0])
+    assert np.array_equal(scenario.demand, made.demand)
+    assert np.array_equal(scenario.failure_rates, made.failure_rates)
+
+
+def test_unreadable_scenario_is_made_again(data, tmp_path):
+    scenario = get_scenario(1, data[0], cache_dir=str(tmp_path))
+    (path,) = tmp_path.iterdir()
+    path.write_bytes(b"PK\x03\x04")
+    again = get_scenario(1, data[0], cache_dir=str(tmp_path))
+    assert np.array_equal(again.demand, scenario.demand)
+    assert np.array_equal(again.failure_rates, scenario.failure_rates)
+    assert len(list(tmp_path.iterdir())) == 1
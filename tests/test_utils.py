@@ -0,0 +1,47 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from evaluation import evaluation_function
+from utils import load_solution, open_solution_arrays, save_solution
+
+
+def test_npz_round_trip(fleet, pricing_strategy, tmp_path):
+    path = str(tmp_path / "solution.json")
+    save_solution(fleet, pricing_strategy, path)
+    fleet, pricing_strategy = load_solution(path)
+    npz = str(tmp_path / "solution.npz")
+    save_solution(fleet, pricing_strategy, npz)
+    loaded = load_solution(npz)
+    pd.testing.assert_frame_equal(loaded[0], fleet)
+    pd.testing.assert_frame_equal(loaded[1], pricing_strategy)
+
+
+def test_npz_arrays_are_memory_mapped(fleet, pricing_strategy, tmp_path):
+    path = str(tmp_path / "solution.npz")
+    save_solution(fleet, pricing_strategy, path)
+    arrays = open_solution_arrays(path)
+    assert all(
+        isinstance(arrays[f"fleet/{column}"], np.memmap) for column in fleet.columns
+    )
+    loaded, _ = load_solution(path, arrays=True)
+    assert isinstance(loaded["fleet/server_id"], np.memmap)
+
+
+@pytest.mark.parametrize("engine", ["dataframe", "array"])
+def test_npz_arrays_score_like_frames(data, fleet, pricing_strategy, tmp_path, engine):
+    path = str(tmp_path / "solution.npz")
+    save_solution(fleet, pricing_strategy, path)
+    scores = [
+        evaluation_function(*solution, *data, seed=2381, engine=engine)
+        for solution in [load_solution(path), load_solution(path, arrays=True)]
+    ]
+    assert scores[0] is not None
+    assert scores[0] == scores[1]
+
+
+def test_compressed_npz_is_rejected(tmp_path):
+    path = str(tmp_path / "solution.npz")
+    np.savez_compressed(path, a=np.arange(3))
+    with pytest.raises(ValueError):
+        open_solution_arrays(path)
@@ -0,0 +1,76 @@
+import pandas as pd
+import pytest
+
+from evaluation import evaluation_function, get_known
+from utils import load_solution, save_solution
+
+# A valid fleet and one row breaking each rule of get_known("fleet_violations")
+ROWS = [
+    (1, "DC1", "CPU.S1", "a", "buy"),
+    (1, "DC2", "GPU.S1", "b", "buy"),
+    (2, "DC1", "CPU.S1", "a", "sell"),  # bad_action
+    (2, "DC9", "CPU.S1", "c", "buy"),  # unknown_datacenter
+    (2, "DC1", "CPU.S9", "d", "buy"),  # unknown_generation
+    (100, "DC1", "CPU.S1", "e", "buy"),  # out_of_window_buy
+    (3, "DC2", "CPU.S1", "b", "buy"),  # duplicate_id
+    (10, "DC1", "CPU.S1", "a", "dismiss"),
+    (120, "DC1", "CPU.S1", "e", "dismiss"),  # orphan_action
+]
+
+
+@pytest.fixture
+def fleet():
+    return pd.DataFrame(ROWS, columns=get_known("required_columns"))
+
+
+@pytest.mark.parametrize("engine", ["dataframe", "array"])
+@pytest.mark.parametrize("as_arrays", [False, True])
+def test_violation_counts(data, fleet, tmp_path, engine, as_arrays):
+    pricing_strategy = pd.DataFrame(columns=get_known("price_strategy_columns"))
+    if as_arrays:
+        path = str(tmp_path / "solution.npz")
+        save_solution(fleet, pricing_strategy, path)
+        fleet, pricing_strategy = load_solution(path, arrays=True)
+    summaries = []
+    score = evaluation_function(
+        fleet,
+        pricing_strategy,
+        *data,
+        seed=1,
+        engine=engine,
+        violations=summaries.append,
+    )
+    assert score is not None
+    assert summaries == [{rule: 1 for rule in get_known("fleet_violations")}]
+
+
+@pytest.mark.parametrize("engine", ["dataframe", "array"])
+def test_actions_of_a_dropped_buy(data, engine):
+    pricing_strategy = pd.DataFrame(columns=get_known("price_strategy_columns"))
+    valid = [(1, "DC1", "CPU.S1", "a", "buy")]
+    dropped = [
+        (100, "DC1", "CPU.S1", "b", "buy"),
+        (105, "DC2", "CPU.S1", "b", "move"),
+        (110, "DC2", "CPU.S1", "b", "dismiss"),
+    ]
+    columns = get_known("required_columns")
+    expected = evaluation_function(
+        pd.DataFrame(valid, columns=columns),
+        pricing_strategy,
+        *data,
+        seed=1,
+        engine=engine,
+    )
+    summaries = []
+    score = evaluation_function(
+        pd.DataFrame(valid + dropped, columns=columns),
+        pricing_strategy,
+        *data,
+        seed=1,
+        engine=engine,
+        violations=summaries.append,
+    )
+    assert expected is not None
+    assert score == expected
+    assert summaries[0]["out_of_window_buy"] == 1
+    assert summaries[0]["orphan_action"] == 2
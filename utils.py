@@ -1,8 +1,13 @@
 
 
 import json
+import struct
+import zipfile
+import numpy as np
 import pandas as pd
-from os.path import abspath, join
+from os.path import splitext
+
+from solver.models import Demand, SellingPrices, Sensitivity, ServerGeneration
 
 
 def load_json(path):
@@ -14,16 +19,33 @@ def save_json(path, data):
         json.dump(data, out, ensure_ascii=False, indent=4)
 
 
-def load_solution(path):
-    # Loads a solution from a json file to 2 pandas DataFrames.
+def load_solution(path, arrays=False):
+    # Loads a solution from a json file, or from the .npz form of 
+    # save_solution_arrays, to 2 pandas DataFrames. With arrays=True a .npz 
+    # solution is returned as the memory-mapped arrays of 
+    # open_solution_arrays in place of both DataFrames, which 
+    # evaluation_function takes as they are.
+    if splitext(path)[1] == '.npz':
+        solution = open_solution_arrays(path)
+        if arrays:
+            return solution, solution
+        return arrays_to_frame(solution, 'fleet'), arrays_to_frame(solution, 'pricing_strategy')
     solution = load_json(path)
     fleet = pd.DataFrame(solution['fleet'])
     pricing_strategy = pd.DataFrame(solution['pricing_strategy'])
     return fleet, pricing_strategy
 
 
-def save_solution(fleet, pricing_strategy, path):
-    # Saves a solution into a json file.
+def save_solution(fleet, pricing_strategy, path, servers=None):
+    # Saves a solution into a json file, or into the .npz form of 
+    # save_solution_arrays if the path ends with .npz. A fleet in the cohort 
+    # form of cohorts.py is expanded to one row per server when servers are 
+    # given.
+    if servers is not None and 'server_id' not in fleet.columns:
+        from cohorts import expand_cohorts
+        fleet = expand_cohorts(fleet, servers)
+    if splitext(path)[1] == '.npz':
+        return save_solution_arrays(fleet, pricing_strategy, path)
     fleet = fleet.to_dict('records')
     pricing_strategy = pricing_strategy.to_dict('records')
     solution = {'fleet': fleet,
@@ -31,30 +53,106 @@ def save_solution(fleet, pricing_strategy, path):
     return save_json(path, solution)
 
 
+def save_solution_arrays(fleet, pricing_strategy, path):
+    # Saves a solution column by column into an uncompressed .npz file. Text
+    # columns (datacenters, generations, actions, ids) are stored as codes 
+    # into their categories, with -1 for missing values, and integer columns
+    # in the smallest type that holds them. The arrays are named 
+    # "<frame>/<column>", and "<frame>/<column>/categories" for the 
+    # categories, with the column order in "<frame>/columns".
+    arrays = {}
+    for name, frame in [('fleet', fleet), ('pricing_strategy', pricing_strategy)]:
+        arrays[f'{name}/columns'] = np.array(frame.columns, dtype=str)
+        for column in frame.columns:
+            values = frame[column]
+            key = f'{name}/{column}'
+            if pd.api.types.is_integer_dtype(values) and len(values) > 0:
+                dtype = np.promote_types(np.min_scalar_type(values.min()),
+                                         np.min_scalar_type(values.max()))
+                arrays[key] = values.to_numpy(dtype=dtype)
+            elif pd.api.types.is_numeric_dtype(values):
+                arrays[key] = values.to_numpy()
+            else:
+                codes = pd.Categorical(values)
+                if not all(isinstance(c, str) for c in codes.categories):
+                    raise ValueError(f'Column {column} mixes text and other values.')
+                arrays[key] = codes.codes
+                arrays[f'{key}/categories'] = np.array(codes.categories, dtype=str)
+    np.savez(path, **arrays)
+
+
+def open_solution_arrays(path):
+    # Memory-maps every array of a .npz solution of save_solution_arrays. 
+    # Nothing is read until the arrays are used, so many solutions can be
+    # opened at once.
+    arrays = {}
+    with zipfile.ZipFile(path) as archive, open(path, 'rb') as f:
+        for info in archive.infolist():
+            if info.compress_type != zipfile.ZIP_STORED:
+                raise ValueError('Only uncompressed .npz files can be memory-mapped.')
+            # SKIP THE LOCAL FILE HEADER OF THE MEMBER TO ITS .npy DATA
+            f.seek(info.header_offset + 26)
+            name_length, extra_length = struct.unpack('<HH', f.read(4))
+            f.seek(name_length + extra_length, 1)
+            version = np.lib.format.read_magic(f)
+            if version == (1, 0):
+                shape, fortran_order, dtype = np.lib.format.read_array_header_1_0(f)
+            else:
+                shape, fortran_order, dtype = np.lib.format.read_array_header_2_0(f)
+            name = info.filename.removesuffix('.npy')
+            if np.prod(shape) == 0:
+                arrays[name] = np.empty(shape, dtype=dtype)
+            else:
+                arrays[name] = np.memmap(path, dtype=dtype, mode='r', offset=f.tell(), 
+                                         shape=shape, order='F' if fortran_order else 'C')
+    return arrays
+
+
+def arrays_to_frame(arrays, name):
+    # Rebuilds a DataFrame of the solution from the arrays of 
+    # open_solution_arrays, as load_json would have read it.
+    frame = {}
+    for column in arrays[f'{name}/columns']:
+        values = arrays[f'{name}/{column}']
+        categories = arrays.get(f'{name}/{column}/categories')
+        if categories is not None and categories.size == 0:
+            values = np.full(len(values), None, dtype=object)
+        elif categories is not None:
+            values = np.where(values < 0, None, categories.astype(object)[values])
+        elif np.issubdtype(values.dtype, np.integer):
+            values = values.astype(np.int64)
+        else:
+            values = np.array(values)
+        frame[str(column)] = values
+    return pd.DataFrame(frame, columns=[str(c) for c in arrays[f'{name}/columns']])
+
+
+def demand_to_map(demands: list[Demand]) -> dict[int, dict[ServerGeneration, dict[Sensitivity, int]]]:
+    # Maps time_step -> server_generation -> latency_sensitivity -> demand.
+    demand_map = {}
+    for d in demands:
+        demand_map.setdefault(d.time_step, {})[d.server_generation] = {
+            sen: d.get_latency(sen) for sen in Sensitivity
+        }
+    return demand_map
+
+
+def sp_to_map(selling_prices: list[SellingPrices]) -> dict[ServerGeneration, dict[Sensitivity, int]]:
+    # Maps server_generation -> latency_sensitivity -> selling price.
+    sp_map = {}
+    for sp in selling_prices:
+        sp_map.setdefault(sp.server_generation, {})[sp.latency_sensitivity] = sp.selling_price
+    return sp_map
+
+
 def load_problem_data(path=None):
+    # Copies of the demand, datacenters, servers, selling prices and 
+    # elasticity DataFrames. The csv files are only parsed once per data 
+    # directory, see problem_data.py.
+    from problem_data import load_data
     if path is None:
         path = './data/'
-
-    # LOAD DEMAND
-    p = abspath(join(path, 'demand.csv'))
-    demand = pd.read_csv(p)    
-    
-    # LOAD DATACENTERS DATA
-    p = abspath(join(path, 'datacenters.csv'))
-    datacenters = pd.read_csv(p)
-    
-    # LOAD SERVERS DATA
-    p = abspath(join(path, 'servers.csv'))
-    servers = pd.read_csv(p)
-    
-    # LOAD SELLING PRICES DATA
-    p = abspath(join(path, 'selling_prices.csv'))
-    selling_prices = pd.read_csv(p)
-
-    # LOAD ELASTICITY DATA
-    p = abspath(join(path, 'price_elasticity_of_demand.csv'))
-    elasticity = pd.read_csv(p)
-    return demand, datacenters, servers, selling_prices, elasticity
+    return load_data(path).frames()
 
 
 if __name__ == '__main__':